@@ -0,0 +1,412 @@
+"""Offline crawl benchmark.
+
+Serves synthetic merchant sites built from the repo's HTML pages on a local HTTP server,
+stubs the OpenAI endpoint, and times extract_text_from_website or the full
+/check_compliance path against them.
+
+    python benchmark.py --mode extract --sites 12 --output before.json
+    python benchmark.py --mode check --sites 12 --latency-ms 80 --compare before.json
+
+The fixture server doubles as an HTTP proxy: sites are named http://www.bench-site-N.test
+and both requests and Chrome are pointed at the server through HTTP_PROXY and
+CHROME_EXTRA_ARGS, so no DNS or outbound network access is needed.
+"""
+import os
+import sys
+import json
+import glob
+import time
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+import statistics
+from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SITE_DOMAIN = "bench-site-{index}.test"
+
+PRIVACY_WORDING = (
+    "<section><h2>SMS Privacy</h2><p>We will not sell or share your information with third parties or affiliates "
+    "for marketing purposes. Your phone number and consent will remain confidential.</p><p>We collect your name, "
+    "email address and phone number when you place an order, use it to send order updates, and store it securely "
+    "for as long as your account is active.</p></section>"
+)
+TERMS_WORDING = (
+    "<section><h2>SMS Terms</h2><p>By opting in you agree to receive order updates and appointment reminders by "
+    "text message. Message frequency varies. Message and data rates may apply. Reply STOP to cancel at any time. "
+    "Reply HELP for help or contact support@example.com.</p></section>"
+)
+FOOTER = (
+    '<footer><a href="/">Home</a> | <a href="/privacy-policy">Privacy Policy</a> | '
+    '<a href="/terms-and-conditions">Terms &amp; Conditions</a></footer>'
+)
+# Sites cycle through these so the rule engine, snippet prompts and full prompts all get exercised.
+PROFILES = ["compliant", "terms_only", "none"]
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def inject(html, snippet):
+    lower = html.lower()
+    position = lower.rfind("</body>")
+    if position == -1:
+        return html + snippet
+    return html[:position] + snippet + html[position:]
+
+
+class FixtureSites:
+    """Synthetic sites: a heavy homepage linking to privacy and terms pages, each built from a repo HTML file."""
+
+    def __init__(self, fixture_files, site_count, seed=0):
+        rng = random.Random(seed)
+        self.fixtures = {}
+        for path in fixture_files:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                self.fixtures[os.path.basename(path)] = f.read()
+        names = sorted(self.fixtures)
+        self.sites = {}
+        for index in range(1, site_count + 1):
+            profile = PROFILES[(index - 1) % len(PROFILES)]
+            home, privacy, terms = (rng.choice(names) for _ in range(3))
+            pages = {
+                "/": inject(self.fixtures[home], FOOTER),
+                "/privacy-policy": inject(self.fixtures[privacy], (PRIVACY_WORDING if profile == "compliant" else "") + FOOTER),
+                "/terms-and-conditions": inject(self.fixtures[terms], (TERMS_WORDING if profile != "none" else "") + FOOTER),
+            }
+            self.sites[f"www.{SITE_DOMAIN.format(index=index)}"] = {"profile": profile, "pages": pages}
+
+    def urls(self):
+        return [f"http://{host}" for host in self.sites]
+
+    def site(self, host):
+        host = host.split(":")[0].lower()
+        return self.sites.get(host) or self.sites.get(f"www.{host}")
+
+    def page(self, host, path):
+        site = self.site(host)
+        if site is None:
+            return None
+        return site["pages"].get(path.rstrip("/") or "/")
+
+
+def stub_completion(prompt):
+    """A well-formed compliance answer for both the single-prompt and chunked response schemas."""
+    finding = {"status": "not_found", "statement": "", "url": "", "detected_candidates": [], "rejection_reason": "benchmark stub"}
+    analysis = {
+        "privacy_policy": {"sms_consent_statement": finding, "data_usage_explanation": finding},
+        "terms_conditions": {"message_types_specified": finding, "mandatory_disclosures": finding},
+        "overall_compliance": "non_compliant",
+        "recommendations": [],
+    }
+    findings = {name: finding for name in ("sms_consent_statement", "data_usage_explanation", "message_types_specified", "mandatory_disclosures")}
+    return json.dumps({"json": {"compliance_analysis": analysis, "findings": findings}})
+
+
+class BenchmarkServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, sites, latency_ms, jitter_ms, llm_latency_ms, sitemaps):
+        super().__init__(address, BenchmarkHandler)
+        self.sites = sites
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.llm_latency_ms = llm_latency_ms
+        self.sitemaps = sitemaps
+        self.lock = threading.Lock()
+        self.counters = {"page_requests": 0, "page_bytes": 0, "not_found": 0, "llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def count(self, **amounts):
+        with self.lock:
+            for name, amount in amounts.items():
+                self.counters[name] += amount
+
+
+class BenchmarkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def target(self):
+        # Proxied requests carry an absolute URL; direct ones only a path and a Host header.
+        parts = urlsplit(self.path)
+        host = parts.netloc or self.headers.get("Host", "")
+        return host, parts.path or "/"
+
+    def send_body(self, status, body, content_type="text/html; charset=utf-8", head=False):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(data)
+
+    def serve_site(self, head=False):
+        server = self.server
+        delay = server.latency_ms + random.uniform(0, server.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000)
+        host, path = self.target()
+        site = server.sites.site(host)
+        if site is not None and path == "/robots.txt" and server.sitemaps:
+            return self.send_body(200, f"User-agent: *\nSitemap: http://{host}/sitemap.xml\n", "text/plain", head)
+        if site is not None and path == "/sitemap.xml" and server.sitemaps:
+            entries = "".join(f"<url><loc>http://{host}{page}</loc></url>" for page in site["pages"])
+            xml = f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'
+            return self.send_body(200, xml, "application/xml", head)
+        page = server.sites.page(host, path)
+        if page is None:
+            server.count(not_found=1)
+            return self.send_body(404, "<html><body>Not found</body></html>", head=head)
+        server.count(page_requests=1, page_bytes=len(page))
+        self.send_body(200, page, head=head)
+
+    def do_HEAD(self):
+        self.serve_site(head=True)
+
+    def do_GET(self):
+        self.serve_site()
+
+    def do_POST(self):
+        host, path = self.target()
+        length = int(self.headers.get("Content-Length", "0"))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if not path.endswith("/chat/completions"):
+            return self.send_body(404, "{}", "application/json")
+        prompt = "".join(message.get("content", "") for message in payload.get("messages", []))
+        if self.server.llm_latency_ms:
+            time.sleep(self.server.llm_latency_ms / 1000)
+        content = stub_completion(prompt)
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4}
+        self.server.count(llm_calls=1, **usage)
+        body = {"id": "bench", "object": "chat.completion", "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}], "usage": usage}
+        self.send_body(200, json.dumps(body), "application/json")
+
+
+class RssSampler:
+    """Samples the resident memory of every Chrome process below this one (crawl workers included)."""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.samples = []
+        self.running = False
+
+    def chrome_rss_mb(self):
+        total = 0
+        for child in psutil.Process().children(recursive=True):
+            try:
+                if "chrom" in child.name().lower():
+                    total += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self._run, name="rss-sampler", daemon=True).start()
+
+    def stop(self):
+        self.running = False
+
+    def _run(self):
+        while self.running:
+            self.samples.append(self.chrome_rss_mb())
+            time.sleep(self.interval)
+
+    def summary(self):
+        if not self.samples:
+            return {"peak_mb": 0.0, "mean_mb": 0.0}
+        return {"peak_mb": round(max(self.samples), 1), "mean_mb": round(statistics.mean(self.samples), 1)}
+
+
+def configure_environment(args, proxy_url, cache_dir):
+    """Point main.py at the fixture server. Must run before main is imported (crawl workers inherit it too)."""
+    os.environ["HTTP_PROXY"] = os.environ["http_proxy"] = proxy_url
+    os.environ["NO_PROXY"] = os.environ["no_proxy"] = "127.0.0.1,localhost"
+    os.environ["CHROME_EXTRA_ARGS"] = f"--proxy-server={proxy_url}"
+    os.environ["OPENAI_API_BASE"] = f"{proxy_url}/v1"
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    # Every SQLite store goes to the temp dir so a run never touches production state.
+    os.environ["COMPLIANCE_CACHE_PATH"] = os.path.join(cache_dir, "compliance_cache.sqlite3")
+    os.environ["MONITOR_DB_PATH"] = os.path.join(cache_dir, "compliance_monitor.sqlite3")
+    os.environ["MONITOR_INTERVAL_HOURS"] = "0"  # no scheduled monitoring runs competing with the benchmark
+    os.environ["CRAWL_WORKER_PROCESSES"] = str(args.workers)
+    if args.browser_only:
+        os.environ["FETCH_HTTP_TIER"] = "0"
+    for item in args.env:
+        name, _, value = item.partition("=")
+        os.environ[name] = value
+
+
+def run_extract(main, metrics, urls, concurrency):
+    def one(url):
+        started = time.monotonic()
+        with metrics.request_trace() as trace:
+            _, source_urls = main.crawl_site(url)
+        return {"url": url, "seconds": time.monotonic() - started, "pages": len(source_urls), "timings": trace.summary()}
+
+    main.warm_driver_pool()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(one, urls))
+    finally:
+        main.close_driver_pool()
+
+
+def run_check(main, urls, concurrency, port):
+    import requests
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    server.install_signal_handlers = lambda: None
+    thread = threading.Thread(target=server.run, name="benchmark-api", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.1)
+
+    def one(url):
+        started = time.monotonic()
+        response = requests.get(
+            f"http://127.0.0.1:{port}/check_compliance",
+            params={"website_url": url, "refresh": "true", "timings": "true", "wait_timeout": 3600},
+            timeout=3600,
+        )
+        body = response.json() if response.headers.get("Content-Type", "").startswith("application/json") else {}
+        timings = body.get("timings") or {}
+        pages = sum(value for key, value in (timings.get("counters") or {}).items() if key.startswith("pages_fetched"))
+        return {"url": url, "seconds": time.monotonic() - started, "status": response.status_code, "pages": pages, "timings": timings}
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(one, urls))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=30)
+
+
+def summarize(args, results, elapsed, server, rss):
+    latencies = [result["seconds"] for result in results]
+    pages = sum(result["pages"] for result in results)
+    stages = {}
+    for result in results:
+        for stage, entry in (result["timings"].get("stages") or {}).items():
+            stages[stage] = stages.get(stage, 0.0) + entry["seconds"]
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "mode": args.mode,
+        "config": {
+            "sites": args.sites, "concurrency": args.concurrency, "workers": args.workers, "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms, "llm_latency_ms": args.llm_latency_ms, "sitemaps": args.sitemaps,
+            "browser_only": args.browser_only, "env": args.env,
+        },
+        "sites": len(results),
+        "failed": sum(1 for result in results if result.get("status", 200) != 200 or not result["pages"]),
+        "elapsed_seconds": round(elapsed, 3),
+        "pages": pages,
+        "pages_per_second": round(pages / elapsed, 3) if elapsed else 0.0,
+        "latency_p50_seconds": round(percentile(latencies, 0.5), 3),
+        "latency_p95_seconds": round(percentile(latencies, 0.95), 3),
+        "chrome_rss": rss.summary(),
+        "tokens": {"prompt": server.counters["prompt_tokens"], "completion": server.counters["completion_tokens"], "llm_calls": server.counters["llm_calls"]},
+        "server": dict(server.counters),
+        "stage_seconds_per_site": {stage: round(total / len(results), 3) for stage, total in sorted(stages.items())} if results else {},
+    }
+
+
+COMPARED = [
+    ("pages_per_second", True),
+    ("latency_p50_seconds", False),
+    ("latency_p95_seconds", False),
+    ("elapsed_seconds", False),
+]
+
+
+def compare(report, baseline):
+    rows = [(name, baseline.get(name, 0), report.get(name, 0), higher_is_better) for name, higher_is_better in COMPARED]
+    rows.append(("chrome_rss_peak_mb", baseline["chrome_rss"]["peak_mb"], report["chrome_rss"]["peak_mb"], False))
+    rows.append(("prompt_tokens", baseline["tokens"]["prompt"], report["tokens"]["prompt"], False))
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} ({baseline.get('mode')}):")
+    for name, before, after, higher_is_better in rows:
+        change = (after - before) / before * 100 if before else 0.0
+        better = (change > 0) == higher_is_better if change else None
+        verdict = "" if better is None else (" better" if better else " worse")
+        print(f"  {name:24} {before:>12} -> {after:>12}  ({change:+.1f}%{verdict})")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline crawl benchmark against synthetic fixture sites.")
+    parser.add_argument("--mode", choices=["extract", "check"], default="extract", help="extract_text_from_website only, or the full /check_compliance path")
+    parser.add_argument("--sites", type=int, default=9)
+    parser.add_argument("--concurrency", type=int, default=3, help="sites checked at once")
+    parser.add_argument("--workers", type=int, default=0, help="CRAWL_WORKER_PROCESSES for the run (0 = crawl in-process)")
+    parser.add_argument("--latency-ms", type=float, default=50, help="added to every fixture response")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="random extra latency per response")
+    parser.add_argument("--llm-latency-ms", type=float, default=500, help="OpenAI stub response time")
+    parser.add_argument("--sitemaps", action="store_true", help="serve robots.txt and sitemap.xml so discovery finds the policy pages")
+    parser.add_argument("--browser-only", action="store_true", help="disable the plain HTTP tier so every page goes through Chrome")
+    parser.add_argument("--fixtures", default=os.path.join(REPO_DIR, "*.html"), help="glob of HTML files to build sites from")
+    parser.add_argument("--port", type=int, default=8765, help="fixture server port (the API uses port + 1 in check mode)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--env", action="append", default=[], help="extra KEY=VALUE settings for main.py, repeatable")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="previous JSON report to compare against")
+    return parser.parse_args(argv)
+
+
+def main_cli(argv=None):
+    args = parse_args(argv)
+    fixture_files = sorted(glob.glob(args.fixtures))
+    if not fixture_files:
+        sys.exit(f"No fixture files match {args.fixtures}")
+
+    sites = FixtureSites(fixture_files, args.sites, args.seed)
+    server = BenchmarkServer(("127.0.0.1", args.port), sites, args.latency_ms, args.jitter_ms, args.llm_latency_ms, args.sitemaps)
+    threading.Thread(target=server.serve_forever, name="fixture-server", daemon=True).start()
+    cache_dir = tempfile.mkdtemp(prefix="compliance-bench-")
+    configure_environment(args, f"http://127.0.0.1:{args.port}", cache_dir)
+
+    import main
+    import metrics
+
+    rss = RssSampler()
+    rss.start()
+    started = time.monotonic()
+    try:
+        if args.mode == "extract":
+            results = run_extract(main, metrics, sites.urls(), args.concurrency)
+        else:
+            results = run_check(main, sites.urls(), args.concurrency, args.port + 1)
+    finally:
+        rss.stop()
+        server.shutdown()
+    elapsed = time.monotonic() - started
+
+    report = summarize(args, results, elapsed, server, rss)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main_cli()
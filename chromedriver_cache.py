@@ -0,0 +1,82 @@
+import os
+import re
+import time
+import fcntl
+import shutil
+import logging
+import subprocess
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+cache_enabled = os.environ.get("CHROMEDRIVER_CACHE", "1") != "0"
+cache_dir = os.environ.get("CHROMEDRIVER_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "compliance-chromedriver"))
+
+_lock = Lock()
+_patched_path = None
+patch_stats = {"patched": 0, "reused": 0, "failures": 0, "patch_seconds": 0.0}
+
+
+def chrome_major_version(chrome_binary):
+    try:
+        output = subprocess.run([chrome_binary, "--version"], capture_output=True, text=True, timeout=15).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r"(\d+)\.\d+", output)
+    return int(match.group(1)) if match else None
+
+
+def patch_into_cache(uc, target, version, source_binary):
+    staging = f"{target}.{os.getpid()}.tmp"
+    if source_binary and os.path.exists(source_binary):
+        shutil.copy2(source_binary, staging)
+        uc.Patcher(executable_path=staging, version_main=version or 0).patch_exe()
+    else:
+        # No local chromedriver: let undetected-chromedriver download a matching one, then keep it.
+        patcher = uc.Patcher(version_main=version or 0)
+        patcher.auto()
+        shutil.copy2(patcher.executable_path, staging)
+    os.chmod(staging, 0o755)
+    os.replace(staging, target)
+
+
+def patched_chromedriver(chrome_binary, source_binary=None):
+    """Path of a chromedriver patched by undetected-chromedriver for this Chrome's major version.
+
+    The binary is patched once into `cache_dir` and reused by every later launch, in this and
+    other processes (a file lock serialises crawl workers booting together). Returns None when
+    patching fails, in which case uc.Chrome falls back to patching on its own.
+    """
+    global _patched_path
+    with _lock:
+        if _patched_path and os.path.exists(_patched_path):
+            return _patched_path
+
+        import undetected_chromedriver as uc
+
+        version = chrome_major_version(chrome_binary)
+        target = os.path.join(cache_dir, f"chromedriver-{version or 'default'}")
+        started = time.monotonic()
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(f"{target}.lock", "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                if os.path.exists(target) and uc.Patcher(executable_path=target).is_binary_patched(target):
+                    patch_stats["reused"] += 1
+                    logger.info(f"Reusing cached patched chromedriver: {target}")
+                else:
+                    patch_into_cache(uc, target, version, source_binary)
+                    patch_stats["patched"] += 1
+                    patch_stats["patch_seconds"] = round(time.monotonic() - started, 3)
+                    logger.info(f"Patched chromedriver for Chrome {version} into {target} in {patch_stats['patch_seconds']}s")
+        except Exception as e:
+            patch_stats["failures"] += 1
+            logger.warning(f"Could not prepare a cached chromedriver, uc will patch per launch: {e}")
+            return None
+
+        _patched_path = target
+        return target
+
+
+def chromedriver_cache_stats():
+    return {"enabled": cache_enabled, "path": _patched_path, **patch_stats}
@@ -0,0 +1,303 @@
+import os
+import json
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from progress import emit as emit_progress
+from prompt_builder import SHARED_HEADER, PAGE_HEADER, estimate_tokens, find_shared_lines, page_lines
+
+logger = logging.getLogger(__name__)
+
+chunked_mode = os.environ.get("CHUNKED_ANALYSIS", "auto")  # auto | always | off
+chunk_threshold_tokens = int(os.environ.get("CHUNKED_ANALYSIS_THRESHOLD", "60000"))
+chunk_max_tokens = int(os.environ.get("CHUNK_MAX_TOKENS", "12000"))
+chunk_retries = int(os.environ.get("CHUNK_RETRIES", "1"))  # extra attempts per chunked-analysis call before it is skipped
+
+SECTIONS = {
+    "privacy_policy": {
+        "sms_consent_statement": (
+            "Explicit statement that SMS consent data / phone numbers will not be shared with or sold to third "
+            "parties or used for marketing purposes (e.g. \"We will not sell or share your information with third "
+            "parties or affiliates for marketing purposes.\", \"Your phone number and consent will remain confidential.\")."
+        ),
+        "data_usage_explanation": "Clear explanation of how consumer data is collected, used, and stored.",
+    },
+    "terms_conditions": {
+        "message_types_specified": "Description of the SMS messages users will receive.",
+        "mandatory_disclosures": (
+            "All of: message frequency (\"Message frequency varies\"), data rates (\"Message and data rates may "
+            "apply\"), opt-out instructions (\"Reply STOP to cancel\" or variations) and help instructions "
+            "(\"Reply HELP for help\" or a support contact)."
+        ),
+    },
+}
+
+RECOMMENDATIONS = {
+    "sms_consent_statement": "Add a privacy policy statement that SMS opt-in data and consent will not be shared with third parties or used for marketing.",
+    "data_usage_explanation": "Explain in the privacy policy how consumer data is collected, used and stored.",
+    "message_types_specified": "Describe in the terms the types of SMS messages users will receive.",
+    "mandatory_disclosures": "Add message frequency, 'message and data rates may apply', 'reply STOP to opt out' and 'reply HELP for help' disclosures to the terms.",
+}
+
+
+def should_chunk(corpus):
+    if chunked_mode == "always":
+        return True
+    return chunked_mode == "auto" and estimate_tokens(corpus) > chunk_threshold_tokens
+
+
+def split_into_chunks(source_urls, max_tokens=None):
+    """Split page texts into prompt chunks of at most ~max_tokens, each line tagged with its page header."""
+    max_tokens = max_tokens or chunk_max_tokens
+    pages = {url: page_lines(text) for url, text in source_urls.items()}
+    shared = find_shared_lines(pages)
+    units = []
+    emitted = set()
+    for lines in pages.values():
+        for line in lines:
+            if line in shared and line not in emitted:
+                emitted.add(line)
+                units.append((SHARED_HEADER, line))
+    for url, lines in pages.items():
+        header = PAGE_HEADER.format(url=url)
+        units.extend((header, line) for line in lines if line not in shared)
+
+    chunks = []
+    current, current_header, current_tokens = [], None, 0
+    max_chars = max_tokens * 4
+    for header, line in units:
+        for piece in (line[i:i + max_chars] for i in range(0, len(line), max_chars)):
+            piece_tokens = estimate_tokens(piece) + 1
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current, current_header, current_tokens = [], None, 0
+            if header != current_header:
+                current.append(header)
+                current_header = header
+                current_tokens += estimate_tokens(header) + 1
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+# Parts a requirement can be satisfied by across different statements or pages.
+SUB_ELEMENTS = {
+    "data_usage_explanation": ["collected", "used", "stored"],
+    "mandatory_disclosures": ["frequency", "data_rates", "opt_out", "help"],
+}
+MAX_CANDIDATES_PER_CATEGORY = 25
+MAX_CANDIDATE_CHARS = 500
+
+
+CATEGORIES = {name: (section, description) for section, categories in SECTIONS.items() for name, description in categories.items()}
+
+
+def requirement_line(name):
+    section, description = CATEGORIES[name]
+    parts = f" Its parts: {', '.join(SUB_ELEMENTS[name])}." if name in SUB_ELEMENTS else ""
+    return f"**{name}** ({section}): {description}{parts}"
+
+
+def candidate_prompt(chunk, urls, name):
+    schema = [{"statement": "exact sentence from the excerpt", "url": "URL where found", "covers": SUB_ELEMENTS.get(name, [name])}]
+    return f"""
+    Extract SMS compliance evidence for ONE requirement from this excerpt of a website. It is one part of a larger
+    site: other parts are analysed separately and a final step decides compliance, so do NOT judge whether the
+    requirement is met here.
+
+    **Requirement:** {requirement_line(name)}
+
+    - List each statement that addresses any part of the requirement, even partially or in different wording,
+      and each statement that contradicts it.
+    - "covers" names the parts a statement addresses.
+    - Quote statements verbatim. Use an empty list when nothing relevant is in the excerpt.
+    - The URL must be one of: {json.dumps(urls)}
+
+    **Response Format:**
+    {json.dumps({"json": {"candidates": schema}}, indent=2)}
+
+    Each page starts with a "=== PAGE: <url> ===" line; lines under "=== SHARED ACROSS PAGES ===" appear on most pages.
+    {chunk}
+    """
+
+
+def decide_prompt(name, candidates, urls):
+    schema = {
+        "status": "found/not_found",
+        "statement": "the statement(s) that satisfy the requirement, joined if its parts are spread out",
+        "url": "URL of the main statement",
+        "detected_candidates": ["candidate statements considered, even if rejected"],
+        "rejection_reason": "If not found, explain what is missing",
+    }
+    return f"""
+    Decide whether a whole website meets ONE TCR SMS compliance requirement, from the candidate statements
+    extracted from all of its pages.
+
+    **Requirement:** {requirement_line(name)}
+
+    - A requirement with several parts is met when the candidates together cover every part, even if the parts come
+      from different statements or pages.
+    - A statement contradicting the requirement (e.g. data shared with partners for marketing) means it is not met.
+    - The URL must be one of: {json.dumps(urls)}
+
+    **Candidate statements:**
+    {json.dumps(candidates, indent=2)}
+
+    **Response Format:**
+    {json.dumps({"json": {"finding": schema}}, indent=2)}
+    """
+
+
+def ask(llm_client, api_key, model, prompt, tokens):
+    """One LLM call, retried `chunk_retries` times on any failure (transport errors and unusable JSON alike)."""
+    payload = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": "You are an AI that checks website compliance for SMS regulations. Respond **only** in JSON format containing 'json' in a key."},
+            {"role": "user", "content": prompt},
+        ],
+        "response_format": {"type": "json_object"},
+    }
+    for attempt in range(chunk_retries + 1):
+        try:
+            response_data, _ = llm_client.chat_completion(payload, api_key, tokens)
+            return json.loads(response_data["choices"][0]["message"]["content"]).get("json", {})
+        except Exception as e:
+            if attempt == chunk_retries:
+                raise
+            logger.warning(f"Chunked analysis call failed ({e}), retrying")
+
+
+def extract_candidates(llm_client, api_key, model, chunk, urls, name):
+    """Map step: [{"statement", "url", "covers"}] for one requirement found in one chunk."""
+    candidates = ask(llm_client, api_key, model, candidate_prompt(chunk, urls, name), estimate_tokens(chunk)).get("candidates")
+    if not isinstance(candidates, list):
+        raise ValueError("response has no candidates list")
+    return candidates
+
+
+def decide(llm_client, api_key, model, name, candidates, urls):
+    """Reduce step for one requirement: its finding over the candidates from every chunk."""
+    prompt = decide_prompt(name, candidates, urls)
+    finding = ask(llm_client, api_key, model, prompt, estimate_tokens(prompt)).get("finding")
+    if not isinstance(finding, dict):
+        raise ValueError("response has no finding object")
+    considered = [c for c in finding.get("detected_candidates") or [] if c]
+    finding["detected_candidates"] = considered + [c["statement"] for c in candidates if c["statement"] not in considered]
+    return finding
+
+
+def union_candidates(per_chunk):
+    """One requirement's candidates from every chunk, in chunk order, de-duplicated by statement."""
+    entries, known = [], set()
+    for candidates in per_chunk:
+        for entry in candidates or []:
+            if not isinstance(entry, dict):
+                continue
+            statement = str(entry.get("statement") or "").strip()[:MAX_CANDIDATE_CHARS]
+            if statement and statement not in known and len(entries) < MAX_CANDIDATES_PER_CATEGORY:
+                known.add(statement)
+                entries.append({"statement": statement, "url": entry.get("url", ""), "covers": entry.get("covers") or []})
+    return entries
+
+
+def merge_findings(partials):
+    """Deterministically merge partial {category: finding} maps (earlier "found" wins) into the compliance_analysis schema."""
+    analysis = {}
+    recommendations = []
+    found_count = 0
+    for section, categories in SECTIONS.items():
+        analysis[section] = {}
+        for category in categories:
+            merged = {"status": "not_found", "statement": "", "url": "", "detected_candidates": [], "rejection_reason": ""}
+            for findings in partials:
+                entry = findings.get(category) or {}
+                for candidate in entry.get("detected_candidates") or []:
+                    if candidate and candidate not in merged["detected_candidates"]:
+                        merged["detected_candidates"].append(candidate)
+                if entry.get("status") == "found" and merged["status"] != "found":
+                    merged.update(status="found", statement=entry.get("statement", ""), url=entry.get("url", ""), rejection_reason="")
+                elif merged["status"] != "found" and not merged["rejection_reason"] and entry.get("rejection_reason"):
+                    merged["rejection_reason"] = entry["rejection_reason"]
+            if merged["status"] == "found":
+                found_count += 1
+            else:
+                recommendations.append(RECOMMENDATIONS[category])
+            analysis[section][category] = merged
+
+    total = sum(len(categories) for categories in SECTIONS.values())
+    if found_count == total:
+        analysis["overall_compliance"] = "compliant"
+    elif found_count:
+        analysis["overall_compliance"] = "partially_compliant"
+    else:
+        analysis["overall_compliance"] = "non_compliant"
+    analysis["recommendations"] = recommendations
+    return {"json": {"compliance_analysis": analysis}, "analysis_source": "chunked"}
+
+
+def analyse_in_chunks(source_urls, llm_client, api_key, model):
+    """Map: extract each requirement's candidate statements from every chunk, one sub-prompt per (chunk, requirement),
+    all in parallel. Reduce: decide each requirement in its own call over the union of its candidates, so a
+    requirement whose parts are split across chunks can still be found. The per-requirement findings are combined
+    with merge_findings.
+
+    A call that still fails after its retries is skipped and listed under "failed_steps"; a requirement it could
+    have affected that ends up not found says so in its rejection_reason. Only when every map call fails is the
+    result an error.
+    """
+    chunks = split_into_chunks(source_urls)
+    urls = list(source_urls)
+    logger.info(f"Chunked analysis: {len(chunks)} chunks x {len(CATEGORIES)} requirements, up to {len(chunks) * len(CATEGORIES) + len(CATEGORIES)} LLM calls")
+
+    per_chunk = {name: [None] * len(chunks) for name in CATEGORIES}
+    failed_steps = []
+    with ThreadPoolExecutor(max_workers=max(1, llm_client.max_concurrency)) as executor:
+        futures = {
+            executor.submit(contextvars.copy_context().run, extract_candidates, llm_client, api_key, model, chunk, urls, name): (index, name)
+            for index, chunk in enumerate(chunks)
+            for name in CATEGORIES
+        }
+        for future in as_completed(futures):
+            index, name = futures[future]
+            try:
+                per_chunk[name][index] = future.result()
+                emit_progress("partial_findings", source="chunk", chunk=index, candidates={name: len(per_chunk[name][index])})
+            except Exception as e:
+                logger.error(f"Chunk {index} candidate extraction for {name} failed: {e}")
+                failed_steps.append({"step": "extract", "chunk": index, "category": name, "error": str(e)})
+
+        if len(failed_steps) == len(futures):
+            return {"error": f"AI processing failed for all {len(chunks)} chunks."}
+
+        unions = {name: union_candidates(per_chunk[name]) for name in CATEGORIES}
+        decisions = {
+            executor.submit(contextvars.copy_context().run, decide, llm_client, api_key, model, name, unions[name], urls): name
+            for name in CATEGORIES
+            if unions[name]
+        }
+        findings = {}
+        for future in as_completed(decisions):
+            name = decisions[future]
+            try:
+                findings[name] = future.result()
+            except Exception as e:
+                logger.error(f"Chunked analysis decision for {name} failed: {e}")
+                failed_steps.append({"step": "decide", "chunk": None, "category": name, "error": str(e)})
+                findings[name] = {"status": "not_found", "detected_candidates": [c["statement"] for c in unions[name]]}
+
+    failed_steps.sort(key=lambda step: (list(CATEGORIES).index(step["category"]), step["step"], step["chunk"] or 0))
+    for step in failed_steps:
+        finding = findings.setdefault(step["category"], {"status": "not_found"})
+        if finding.get("status") != "found":
+            where = f"chunk {step['chunk']}" if step["step"] == "extract" else "the final decision"
+            note = f"Not fully analysed: {where} failed ({step['error']})."
+            finding["rejection_reason"] = " ".join(filter(None, [finding.get("rejection_reason"), note]))
+
+    result = merge_findings([{name: findings[name]} for name in CATEGORIES if name in findings])
+    if failed_steps:
+        result["failed_steps"] = failed_steps
+    return result
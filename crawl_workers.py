@@ -0,0 +1,312 @@
+import os
+import time
+import queue
+import logging
+import itertools
+import multiprocessing
+from threading import Thread, Lock, Event
+from concurrent.futures import Future
+
+import psutil
+
+import metrics
+from progress import progress_listener, current_listener
+
+logger = logging.getLogger(__name__)
+
+
+def usable_cpus():
+    """CPUs this process may run on; unlike os.cpu_count() this honours affinity masks and cpusets."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+def plan_workers(value, driver_cap, drivers_per_worker):
+    """(processes, drivers per process) for CRAWL_WORKER_PROCESSES within the global DRIVER_POOL_SIZE cap.
+
+    `value` is "0" (crawl inside the API process), "auto" (one per usable CPU) or an explicit count.
+    Processes times drivers per process never exceeds `driver_cap`, so moving crawls out of the
+    API process cannot multiply the number of Chromes.
+    """
+    processes = usable_cpus() if value == "auto" else max(0, int(value))
+    if not processes:
+        return 0, 0
+    capped = min(processes, max(1, driver_cap))
+    per_worker = max(1, min(drivers_per_worker, driver_cap // capped))
+    if (capped, per_worker) != (processes, drivers_per_worker):
+        logger.warning(
+            f"CRAWL_WORKER_PROCESSES={value} x CRAWL_WORKER_DRIVERS={drivers_per_worker} exceeds the {driver_cap}-browser cap; "
+            f"using {capped} process(es) x {per_worker} driver(s)"
+        )
+    return capped, per_worker
+
+
+# Work a crawl worker can run: task kind -> function in crawler taking one URL.
+WORKER_TASKS = {"crawl": "extract_text_from_website", "render": "render_in_browser"}
+
+
+def process_tree(pid):
+    """The process and everything it started (Chrome and chromedriver run as its children), or [] if it is gone."""
+    try:
+        parent = psutil.Process(pid)
+        return [parent] + parent.children(recursive=True)
+    except psutil.Error:
+        return []
+
+
+def kill_processes(processes, timeout=5):
+    """SIGKILL and reap; a SIGTERMed worker never reaches the finally that closes its drivers."""
+    for process in processes:
+        try:
+            process.kill()
+        except psutil.Error:
+            pass
+    psutil.wait_procs(processes, timeout=timeout)
+
+
+class CrawlWorkerError(Exception):
+    def __init__(self, status_code, detail, observations=()):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.observations = observations
+
+
+def worker_main(worker_id, tasks, results, drivers_per_worker, warm_drivers):
+    # Each worker owns its own driver pool. Only the crawl path is imported, not the app and its stores.
+    os.environ["DRIVER_POOL_SIZE"] = str(drivers_per_worker)
+    logging.basicConfig(level=logging.INFO)
+    import crawler
+
+    crawler.driver_pool.warm_up(warm_drivers)
+    results.put(("ready", worker_id, None, None))
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            task_id, kind, url = task
+            results.put(("started", worker_id, task_id, None))
+            # Stage timings are shipped back with the result and replayed into the API process' metrics.
+            def forward(event, data, task_id=task_id):
+                results.put(("progress", worker_id, task_id, (event, data)))
+
+            with metrics.request_trace() as trace, progress_listener(forward):
+                try:
+                    outcome = ("ok", getattr(crawler, WORKER_TASKS[kind])(url))
+                except Exception as e:
+                    outcome = ("error", (getattr(e, "status_code", 500), getattr(e, "detail", None) or str(e)))
+            results.put(("done", worker_id, task_id, outcome + (trace.observations,)))
+    finally:
+        crawler.driver_pool.close()
+
+
+class CrawlWorkerPool:
+    """Runs crawls (and single-page browser renders) in separate processes that each own their Chrome drivers.
+
+    All workers pull from one shared task queue, so an idle worker always takes the next
+    crawl. A monitor thread restarts workers that exit or exceed `task_timeout` and
+    re-queues the task they were holding (once) before failing it.
+    """
+
+    def __init__(self, processes, drivers_per_worker=2, warm_drivers=1, task_timeout=300, max_attempts=2):
+        self.processes = processes
+        self.drivers_per_worker = drivers_per_worker
+        self.warm_drivers = warm_drivers
+        self.task_timeout = task_timeout
+        self.max_attempts = max_attempts
+
+        self.context = multiprocessing.get_context("spawn")
+        self.tasks = self.context.Queue()
+        self.results = self.context.Queue()
+        self.workers = {}
+        self.spawned_at = {}
+        self.browsers = {}  # worker_id -> its last seen child processes, killed if the worker dies without them
+        self.fast_failures = {}
+        self.respawn_at = {}  # worker_id -> monotonic time a backed-off worker may be spawned again
+        self.assigned = {}
+        self.ready = set()
+        self.all_ready = Event()
+        self.pending = {}
+        self.ids = itertools.count()
+        self.lock = Lock()
+        self.running = False
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "requeued": 0, "restarts": 0}
+
+    def start(self):
+        self.running = True
+        for worker_id in range(self.processes):
+            self._spawn(worker_id)
+        Thread(target=self._collect, name="crawl-results", daemon=True).start()
+        Thread(target=self._monitor, name="crawl-monitor", daemon=True).start()
+        logger.info(f"Started {self.processes} crawl worker process(es)")
+
+    def stop(self):
+        self.running = False
+        for _ in self.workers:
+            self.tasks.put(None)
+        for process in list(self.workers.values()):
+            process.join(timeout=10)
+            if process.is_alive():
+                self._kill_worker(process)
+
+    def wait_ready(self, timeout=None):
+        """Block until every worker has warmed its drivers once."""
+        return self.all_ready.wait(timeout)
+
+    def submit(self, website_url, on_progress=None, kind="crawl"):
+        future = Future()
+        task_id = future.task_id = next(self.ids)
+        with self.lock:
+            self.pending[task_id] = {"url": website_url, "kind": kind, "future": future, "attempts": 1, "on_progress": on_progress}
+            self.counters["submitted"] += 1
+        self.tasks.put((task_id, kind, website_url))
+        return future
+
+    def extract(self, website_url):
+        """Blocking helper with the same return value as extract_text_from_website."""
+        return self.run("crawl", website_url)
+
+    def render(self, url):
+        """Blocking helper with the same return value as render_in_browser: (document or None, tier)."""
+        return self.run("render", url)
+
+    def run(self, kind, url):
+        """Run one task in a worker and wait for it.
+
+        The worker's stage timings are replayed into this process' metrics and the caller's request trace.
+        """
+        future = self.submit(url, on_progress=current_listener(), kind=kind)
+        try:
+            value, observations = future.result(timeout=self.task_timeout * self.max_attempts + 30)
+        except CrawlWorkerError as e:
+            metrics.replay(e.observations)
+            raise
+        finally:
+            # Already gone once the worker answered; after a timeout a late answer is simply dropped.
+            with self.lock:
+                self.pending.pop(future.task_id, None)
+        metrics.replay(observations)
+        return value
+
+    def stats(self):
+        with self.lock:
+            return {
+                "processes": self.processes,
+                "alive": sum(1 for process in self.workers.values() if process.is_alive()),
+                "ready": len(self.ready),
+                "busy": len(self.assigned),
+                "pending": len(self.pending),
+                **self.counters,
+            }
+
+    def _spawn(self, worker_id):
+        process = self.context.Process(
+            target=worker_main,
+            args=(worker_id, self.tasks, self.results, self.drivers_per_worker, self.warm_drivers),
+            name=f"crawl-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        self.workers[worker_id] = process
+        self.spawned_at[worker_id] = time.monotonic()
+
+    def _collect(self):
+        while self.running:
+            try:
+                kind, worker_id, task_id, outcome = self.results.get(timeout=1)
+            except queue.Empty:
+                continue
+            if kind == "progress":
+                with self.lock:
+                    task = self.pending.get(task_id)
+                if task is not None and task["on_progress"] is not None:
+                    event, data = outcome
+                    task["on_progress"](event, data)
+                continue
+            with self.lock:
+                if kind == "ready":
+                    logger.info(f"Crawl worker {worker_id} ready")
+                    self.ready.add(worker_id)
+                    if len(self.ready) >= self.processes:
+                        self.all_ready.set()
+                elif kind == "started":
+                    self.assigned[worker_id] = (task_id, time.monotonic())
+                elif kind == "done":
+                    if self.assigned.get(worker_id, (None,))[0] == task_id:
+                        del self.assigned[worker_id]
+                    task = self.pending.pop(task_id, None)
+                    if task is None:
+                        continue
+                    status, value, observations = outcome
+                    if status == "ok":
+                        self.counters["completed"] += 1
+                        task["future"].set_result((value, observations))
+                    else:
+                        self.counters["failed"] += 1
+                        task["future"].set_exception(CrawlWorkerError(*value, observations=observations))
+
+    def _monitor(self):
+        while self.running:
+            time.sleep(1)
+            now = time.monotonic()
+            for worker_id, process in list(self.workers.items()):
+                if worker_id in self.respawn_at:
+                    if self.running and now >= self.respawn_at[worker_id]:
+                        del self.respawn_at[worker_id]
+                        self._spawn(worker_id)
+                    continue
+                with self.lock:
+                    task_id, started_at = self.assigned.get(worker_id, (None, None))
+                hung = started_at is not None and now - started_at > self.task_timeout
+                if process.is_alive() and not hung:
+                    self.browsers[worker_id] = process_tree(process.pid)[1:]
+                    continue
+                if hung:
+                    logger.error(f"Crawl worker {worker_id} exceeded {self.task_timeout}s on one site, restarting it")
+                    self._kill_worker(process)
+                else:
+                    logger.error(f"Crawl worker {worker_id} exited with code {process.exitcode}, restarting it")
+                # Browsers of a crashed worker are reparented, so only the last snapshot can still find them.
+                kill_processes([child for child in self.browsers.pop(worker_id, []) if child.is_running()])
+                with self.lock:
+                    self.assigned.pop(worker_id, None)
+                    self.ready.discard(worker_id)
+                    self.counters["restarts"] += 1
+                    if task_id is not None:
+                        self._retry_or_fail(task_id)
+                if self.running:
+                    # Back off when a worker keeps dying right after start (e.g. Chrome missing). The deadline is
+                    # per worker, so the others keep being watched while this one waits.
+                    if now - self.spawned_at[worker_id] < 30:
+                        self.fast_failures[worker_id] = self.fast_failures.get(worker_id, 0) + 1
+                        self.respawn_at[worker_id] = now + min(60, 2 ** self.fast_failures[worker_id])
+                    else:
+                        self.fast_failures[worker_id] = 0
+                        self._spawn(worker_id)
+
+    def _kill_worker(self, process):
+        """Kill a worker together with its Chrome and chromedriver processes, so restarts stay within the driver cap."""
+        try:
+            psutil.Process(process.pid).suspend()  # no new browsers between listing the children and killing them
+        except psutil.Error:
+            pass
+        browsers = process_tree(process.pid)[1:]
+        process.kill()  # through multiprocessing, which has to reap the worker itself
+        process.join(timeout=5)
+        kill_processes(browsers)
+
+    def _retry_or_fail(self, task_id):
+        task = self.pending.get(task_id)
+        if task is None:
+            return
+        if task["attempts"] < self.max_attempts:
+            task["attempts"] += 1
+            self.counters["requeued"] += 1
+            self.tasks.put((task_id, task["kind"], task["url"]))
+        else:
+            del self.pending[task_id]
+            self.counters["failed"] += 1
+            task["future"].set_exception(CrawlWorkerError(502, "Crawl worker crashed while loading the site."))
@@ -0,0 +1,345 @@
+"""The crawl path: Chrome drivers, page loading and the policy-page crawl.
+
+Imported by main.py and by the crawl worker processes, so importing it must not create the
+app, the result/monitor stores or the job queues.
+"""
+import os
+import logging
+import requests
+import contextvars
+from urllib.parse import urljoin
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from fastapi import HTTPException
+from driver_pool import DriverPool, DriverPoolTimeout
+from readiness import page_ready_max_wait, install_readiness_probe, wait_for_page_ready
+from resource_blocking import enable_performance_log, enable_network_domain, apply_resource_blocking, page_load_report
+from frontier import CrawlFrontier, canonicalize_url
+from discovery import discovery_enabled, discover_policy_pages
+from chromedriver_cache import cache_enabled as chromedriver_cache_enabled, patched_chromedriver
+import metrics
+from progress import emit as emit_progress
+from extraction import extract_page
+from fetcher import BOT_PROTECTION_MARKERS, http_session, http_tier_enabled, fetch_static, browser_required_reason, record_tier
+
+logger = logging.getLogger(__name__)
+
+# Function to get Chrome binary
+def get_chrome_binary():
+    chrome_binary = os.environ.get("CHROME_BIN", "/opt/render/chromium/chrome-linux64/chrome")
+    if not os.path.exists(chrome_binary):
+        raise FileNotFoundError("Chrome binary not found! Check installation.")
+    return chrome_binary
+
+# Function to get ChromeDriver binary
+def get_chromedriver_binary():
+    chromedriver_binary = os.environ.get("CHROMEDRIVER_BIN", "/opt/render/chromedriver/chromedriver-linux64/chromedriver")
+    if not os.path.exists(chromedriver_binary):
+        raise FileNotFoundError("ChromeDriver binary not found! Check installation.")
+    return chromedriver_binary
+
+# Driver Pool settings
+pool_size = int(os.environ.get("DRIVER_POOL_SIZE", "5"))
+pool_warm_size = int(os.environ.get("DRIVER_POOL_WARM", "2"))  # browsers started at app startup
+pool_acquire_timeout = float(os.environ.get("DRIVER_POOL_ACQUIRE_TIMEOUT", "60"))
+driver_max_page_loads = int(os.environ.get("DRIVER_MAX_PAGE_LOADS", "50"))
+driver_max_rss_mb = int(os.environ.get("DRIVER_MAX_RSS_MB", "1024"))
+
+def initialize_driver():
+    import undetected_chromedriver as uc  # deferred: selenium and uc are only needed once a browser starts
+
+    options = uc.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_argument("--disable-infobars")
+    options.add_argument(
+        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    )
+    for argument in os.environ.get("CHROME_EXTRA_ARGS", "").split():
+        options.add_argument(argument)
+    enable_performance_log(options)
+
+    chrome_binary = get_chrome_binary()
+    logger.info(f"Using Chrome binary: {chrome_binary}")
+
+    driver_options = {}
+    if chromedriver_cache_enabled:
+        driver_path = patched_chromedriver(chrome_binary, os.environ.get("CHROMEDRIVER_BIN"))
+        if driver_path:
+            driver_options["driver_executable_path"] = driver_path
+
+    try:
+        with metrics.timed("driver_launch"):
+            driver = uc.Chrome(
+                options=options,
+                browser_executable_path=chrome_binary,
+                use_subprocess=True,
+                **driver_options
+            )
+            install_readiness_probe(driver)
+            enable_network_domain(driver)
+        return driver
+    except Exception as e:
+        logger.error(f"Failed to start Undetected ChromeDriver: {e}")
+        raise HTTPException(status_code=500, detail="Failed to start browser session. Check server configuration.")
+        
+driver_pool = DriverPool(
+    initialize_driver,
+    size=pool_size,
+    acquire_timeout=pool_acquire_timeout,
+    max_page_loads=driver_max_page_loads,
+    max_rss_mb=driver_max_rss_mb,
+)
+
+def get_driver_from_pool(timeout=None):
+    try:
+        with metrics.timed("driver_acquire"):
+            return driver_pool.acquire(timeout)
+    except DriverPoolTimeout as e:
+        logger.error(f"Driver pool exhausted: {e}")
+        raise HTTPException(status_code=503, detail="All browser sessions are busy. Try again shortly.")
+
+def return_driver_to_pool(driver, page_loads=1):
+    driver_pool.release(driver, page_loads)
+
+# Function to enforce www. on website URL
+def enforce_www(website_url):
+    if "www." not in website_url:
+        website_url = website_url.replace("https://", "https://www.", 1) if website_url.startswith(
+            "https://"
+        ) else f"https://www.{website_url}"
+    return website_url
+
+# Crawl Settings
+crawl_concurrency = int(os.environ.get("CRAWL_CONCURRENCY", "3"))  # pages loaded in parallel per check
+crawl_max_pages = int(os.environ.get("CRAWL_MAX_PAGES", "8"))  # pages scraped per check, homepage included
+crawl_time_budget = float(os.environ.get("CRAWL_TIME_BUDGET", "60"))  # seconds before no new pages are started
+policy_keywords = ["privacy", "terms", "legal", "sms"]
+
+class CrawlSession:
+    """Per-crawl page cache; each URL is rendered at most once, on up to max_concurrency pooled drivers."""
+
+    def __init__(self, max_concurrency=crawl_concurrency):
+        self.executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency))
+        self.pages = {}
+        self.tiers = {}
+        self.lock = Lock()
+
+    def fetch(self, url):
+        with self.lock:
+            if url not in self.pages:
+                # Run in the caller's context so page timings land in its request trace.
+                self.pages[url] = self.executor.submit(contextvars.copy_context().run, self._load, url)
+            return self.pages[url]
+
+    def get(self, url):
+        return self.fetch(url).result()
+
+    def _load(self, url):
+        document, self.tiers[url] = load_page(url)
+        return document
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+def load_page(url):
+    """Serve a page over plain HTTP when possible, escalating to headless Chrome only when it looks JS-rendered.
+
+    Returns (extracted page or None, tier).
+    """
+    reason = "http tier disabled"
+    if http_tier_enabled:
+        with metrics.timed("http_fetch"):
+            html, reason = fetch_static(url)
+        if html is not None:
+            with metrics.timed("parse"):
+                document = extract_page(html)
+            reason = browser_required_reason(html, document.text)
+            if reason is None:
+                logger.info(f"Served by http tier: {url}")
+                record_tier("http")
+                metrics.count("pages_fetched", tier="http")
+                emit_progress("page_loaded", url=url, tier="http")
+                return document, "http"
+
+    logger.info(f"Escalating to browser tier ({reason}): {url}")
+    record_tier("browser", reason)
+    return render_in_browser(url, reason)
+
+def render_in_browser(url, reason=None):
+    """Load one page in headless Chrome from the driver pool. Returns (extracted page or None, "browser")."""
+    driver = get_driver_from_pool()
+    try:
+        document = fetch_page(driver, url)
+    finally:
+        return_driver_to_pool(driver)
+    metrics.count("pages_fetched" if document is not None else "page_failures", tier="browser")
+    emit_progress("page_loaded" if document is not None else "page_failed", url=url, tier="browser", escalation_reason=reason)
+    return document, "browser"
+
+def find_policy_links(document, page_url, match_link_text=True):
+    """(url, link text) for every link whose text or href mentions a policy keyword."""
+    links = []
+    for href, text in document.links:
+        try:
+            href = href.strip()
+            if href.startswith(("mailto:", "tel:", "javascript:")):
+                continue
+
+            link_text = text.lower() if match_link_text else ""
+            if any(keyword in link_text or keyword in href.lower() for keyword in policy_keywords):
+                links.append((urljoin(page_url, href), link_text))
+        except Exception as e:
+            logger.error(f"Error processing link: {e}")
+            continue
+    return links
+
+def seed_from_homepage(crawl, frontier, base_url, original_base_url):
+    """Render the homepage and queue its policy links. Returns False when the homepage could not be loaded."""
+    document = crawl.get(base_url)
+    if document is None:
+        return False
+    emit_progress("homepage_loaded", url=base_url)
+
+    seeds = [base_url]
+    non_www_privacy_url = f"{base_url.replace('www.', '', 1)}/privacy-policy/"
+    if "www." not in original_base_url:
+        try:
+            with metrics.timed("probe"):
+                response = http_session.get(non_www_privacy_url, timeout=10)
+            logger.info(f"Response status: {response.status_code}")
+            if response.status_code == 200:
+                seeds = [non_www_privacy_url]
+        except requests.exceptions.RequestException:
+            pass
+    for seed in seeds:
+        frontier.add_seed(seed)
+
+    for url, link_text in find_policy_links(document, base_url):
+        frontier.add(url, link_text, depth=1)
+    emit_progress("policy_links_discovered", source="homepage", count=frontier.queued())
+
+    www_privacy_url = f"{base_url}/privacy-policy/"
+    probe_url = non_www_privacy_url if "www." not in original_base_url else www_privacy_url
+    if not frontier.contains(probe_url):
+        try:
+            with metrics.timed("probe"):
+                response = http_session.head(probe_url, allow_redirects=False, timeout=10)
+            if response.status_code == 200:
+                frontier.add(probe_url, "privacy policy", depth=1)
+        except requests.exceptions.RequestException:
+            pass
+    return True
+
+def crawl_frontier(crawl, frontier, max_concurrency):
+    """Crawl the best-scoring candidates in parallel until the page or time budget runs out.
+
+    Policy links found on first-level pages join the frontier as they are discovered.
+    """
+    while True:
+        batch = frontier.take(max_concurrency)
+        if not batch:
+            return
+        futures = {crawl.fetch(url): (url, depth) for url, depth in batch}
+        for future in as_completed(futures):
+            url, depth = futures[future]
+            sub_document = future.result()
+            if sub_document is None or depth > 1:
+                continue
+            for sub_url, _ in find_policy_links(sub_document, url, match_link_text=False):
+                frontier.add(sub_url, depth=depth + 1)
+
+def extract_text_from_website(base_url, max_concurrency=crawl_concurrency, max_pages=crawl_max_pages, time_budget=crawl_time_budget):
+    original_base_url = base_url
+    base_url = canonicalize_url(enforce_www(base_url))
+    logger.info(f"Checking compliance for: {base_url}")
+    crawl = CrawlSession(max_concurrency)
+    frontier = CrawlFrontier(base_url, max_pages=max_pages, time_budget=time_budget)
+    extracted_text = ""
+    source_urls = {}
+
+    try:
+        with metrics.timed("discovery"):
+            discovered = discover_policy_pages(base_url) if discovery_enabled else []
+        for url in discovered:
+            frontier.add(url, depth=1)
+
+        used_discovery = frontier.queued() > 0
+        if used_discovery:
+            emit_progress("policy_links_discovered", source="sitemaps_and_probes", count=frontier.queued())
+            logger.info(f"Found {frontier.queued()} policy pages via robots.txt/sitemaps/probes, skipping homepage render.")
+        elif not seed_from_homepage(crawl, frontier, base_url, original_base_url):
+            return "", {}
+
+        crawl_frontier(crawl, frontier, max_concurrency)
+
+        if used_discovery and not any(crawl.get(page) is not None for page in frontier.selected):
+            logger.warning(f"No discovered page could be loaded for {base_url}, falling back to the homepage.")
+            if not seed_from_homepage(crawl, frontier, base_url, original_base_url):
+                return "", {}
+            crawl_frontier(crawl, frontier, max_concurrency)
+
+        logger.info(f"Crawl frontier for {base_url}: {frontier.summary()}")
+        logger.info(f"pages_to_check before scraping: {frontier.selected}")
+
+        for page in frontier.selected:
+            logger.info(f"Scraping page: {page}")
+            document = crawl.get(page)
+            if document is None:
+                continue
+            page_text = document.text
+            extracted_text += page_text + "\n"
+            source_urls[page] = page_text
+            emit_progress("page_scraped", url=page, chars=len(page_text), tier=crawl.tiers.get(page))
+
+        if len(extracted_text) < 100:
+            logger.warning(f"Extracted text from {base_url} appears too short, might have missed content.")
+        emit_progress("crawl_finished", pages=len(source_urls), chars=len(extracted_text))
+
+        return extracted_text.strip(), source_urls
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to extract text from {base_url}: {e}")
+        return "", {}
+
+    finally:
+        crawl.close()
+
+def fetch_page(driver, url, max_wait=page_ready_max_wait):
+    try:
+        logger.info(f"Loading page: {url}")
+        driver.set_page_load_timeout(60)
+        apply_resource_blocking(driver, url)
+        with metrics.timed("page_load"):
+            driver.get(url)
+
+        settle_seconds, settled = wait_for_page_ready(driver, max_wait)
+        metrics.observe_stage("page_settle", settle_seconds)
+        logger.info(f"Page {'settled' if settled else 'hit readiness ceiling'} after {settle_seconds:.2f}s: {url}")
+        load_report = page_load_report(driver)
+        logger.info(
+            f"Page load report for {url}: {load_report['load_ms']} ms, {load_report['bytes_transferred']} bytes, "
+            f"{load_report['blocked_requests']} blocked (~{load_report['est_bytes_saved']} bytes saved)"
+        )
+        emit_progress("page_rendered", url=url, settle_seconds=round(settle_seconds, 3), bytes_transferred=load_report["bytes_transferred"])
+
+        page_source = driver.page_source
+        lower_text = page_source.lower()
+
+        if any(marker in lower_text for marker in BOT_PROTECTION_MARKERS):
+            logger.warning(f"Bot protection detected on page: {url}")
+            metrics.count("bot_protection_hits")
+            emit_progress("bot_protection", url=url)
+            return None
+
+        with metrics.timed("parse"):
+            return extract_page(page_source)
+
+    except Exception as e:
+        logger.error(f"Failed to fetch page {url}: {e}")
+        return None
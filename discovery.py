@@ -0,0 +1,133 @@
+import os
+import gzip
+import logging
+import requests
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin, urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+from fetcher import http_session
+
+logger = logging.getLogger(__name__)
+
+POLICY_URL_KEYWORDS = ["privacy", "terms", "sms", "legal", "messaging", "text-message", "opt-in", "conditions"]
+DEFAULT_PROBE_PATHS = (
+    "/privacy,/privacy-policy,/terms,/terms-of-service,/terms-and-conditions,/terms-of-use,"
+    "/sms-terms,/sms-policy,/sms-terms-and-conditions,/messaging-terms,/text-messaging-terms,/legal"
+)
+
+discovery_enabled = os.environ.get("POLICY_DISCOVERY", "1") != "0"
+probe_paths = [path.strip() for path in os.environ.get("POLICY_PROBE_PATHS", DEFAULT_PROBE_PATHS).split(",") if path.strip()]
+max_sitemaps = int(os.environ.get("SITEMAP_MAX_FILES", "10"))
+max_sitemap_urls = int(os.environ.get("SITEMAP_MAX_URLS", "50000"))
+discovery_timeout = (5, 10)
+
+probe_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("POLICY_PROBE_CONCURRENCY", "8")), thread_name_prefix="policy-probe")
+
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def is_policy_url(url):
+    path = urlparse(url).path.lower()
+    return any(keyword in path for keyword in POLICY_URL_KEYWORDS)
+
+
+def robots_sitemaps(base_url):
+    try:
+        response = http_session.get(urljoin(base_url, "/robots.txt"), timeout=discovery_timeout)
+    except requests.exceptions.RequestException:
+        return []
+    if response.status_code != 200:
+        return []
+    return [
+        line.split(":", 1)[1].strip()
+        for line in response.text.splitlines()
+        if line.lower().startswith("sitemap:") and line.split(":", 1)[1].strip()
+    ]
+
+
+def iter_sitemap(sitemap_url):
+    """Stream-parse one sitemap (plain or gzip), yielding ("sitemap", loc) and ("url", loc) entries."""
+    try:
+        response = http_session.get(sitemap_url, timeout=discovery_timeout, stream=True)
+    except requests.exceptions.RequestException as e:
+        logger.info(f"Sitemap fetch failed for {sitemap_url}: {e}")
+        return
+    with response:
+        if response.status_code != 200:
+            return
+        response.raw.decode_content = True
+        stream = response.raw
+        content_type = response.headers.get("Content-Type", "").lower()
+        if sitemap_url.lower().endswith(".gz") or "gzip" in content_type:
+            stream = gzip.GzipFile(fileobj=response.raw)
+        try:
+            for _, element in ET.iterparse(stream, events=("end",)):
+                name = local_name(element.tag)
+                if name in ("sitemap", "url"):
+                    loc = next((child.text for child in element if local_name(child.tag) == "loc" and child.text), None)
+                    if loc:
+                        yield name, loc.strip()
+                    element.clear()
+        except (ET.ParseError, OSError, EOFError) as e:
+            logger.info(f"Stopped parsing sitemap {sitemap_url}: {e}")
+
+
+def sitemap_policy_urls(base_url):
+    queue = robots_sitemaps(base_url) or [urljoin(base_url, "/sitemap.xml"), urljoin(base_url, "/sitemap_index.xml")]
+    visited = set()
+    found = []
+    urls_seen = 0
+    while queue and len(visited) < max_sitemaps and urls_seen < max_sitemap_urls:
+        sitemap_url = queue.pop(0)
+        if sitemap_url in visited:
+            continue
+        visited.add(sitemap_url)
+        for kind, loc in iter_sitemap(sitemap_url):
+            if kind == "sitemap":
+                # Page/post sitemaps are where policy pages live; product and media sitemaps go last.
+                if is_policy_url(loc) or "page" in loc.lower():
+                    queue.insert(0, loc)
+                else:
+                    queue.append(loc)
+                continue
+            urls_seen += 1
+            if is_policy_url(loc):
+                found.append(loc)
+            if urls_seen >= max_sitemap_urls:
+                break
+    return found
+
+
+def probe_path(url):
+    try:
+        response = http_session.head(url, allow_redirects=True, timeout=discovery_timeout)
+        if response.status_code in (403, 405):
+            response = http_session.get(url, allow_redirects=True, timeout=discovery_timeout, stream=True)
+            response.close()
+    except requests.exceptions.RequestException:
+        return None
+    if response.status_code == 200 and is_policy_url(response.url):
+        return response.url
+    return None
+
+
+def probe_policy_paths(base_url):
+    urls = [urljoin(base_url, path) for path in probe_paths]
+    return [url for url in probe_executor.map(probe_path, urls) if url]
+
+
+def discover_policy_pages(base_url):
+    """Policy page URLs found through robots.txt, sitemaps and common-path probes, without a browser."""
+    sitemap_future = probe_executor.submit(sitemap_policy_urls, base_url)
+    probed = probe_policy_paths(base_url)
+    try:
+        from_sitemaps = sitemap_future.result()
+    except Exception as e:
+        logger.warning(f"Sitemap discovery failed for {base_url}: {e}")
+        from_sitemaps = []
+    found = list(dict.fromkeys(from_sitemaps + probed))
+    logger.info(f"Discovery for {base_url}: {len(from_sitemaps)} from sitemaps, {len(probed)} from path probes")
+    return found
@@ -0,0 +1,227 @@
+import time
+import logging
+import psutil
+from threading import Condition
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+class DriverPoolTimeout(Exception):
+    """Raised when no driver could be leased before the acquire timeout."""
+
+
+class DriverPool:
+    """Bounded pool of Chrome drivers with liveness probes and recycling.
+
+    At most `size` drivers exist at once. A lease blocks until a driver is idle or a
+    slot is free; drivers are probed before every lease and recycled after
+    `max_page_loads` page loads or once Chrome's RSS exceeds `max_rss_mb`.
+    """
+
+    def __init__(self, factory, size=5, acquire_timeout=60, max_page_loads=50, max_rss_mb=1024, probe_timeout=5):
+        self.factory = factory
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.max_page_loads = max_page_loads
+        self.max_rss_mb = max_rss_mb
+        self.probe_timeout = probe_timeout
+
+        self.cond = Condition()
+        self.idle = []
+        self.page_loads = {}
+        self.total = 0
+        self.leased = 0
+        self.closed = False
+
+        self.probe_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="driver-probe")
+        self.counters = {
+            "created": 0,
+            "create_failures": 0,
+            "acquired": 0,
+            "timeouts": 0,
+            "probe_failures": 0,
+            "recycled": 0,
+        }
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.launch_total = 0.0
+        self.launch_max = 0.0
+
+    def acquire(self, timeout=None):
+        timeout = self.acquire_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        driver = None
+        with self.cond:
+            while True:
+                if self.closed:
+                    raise DriverPoolTimeout("Driver pool is closed.")
+                if self.idle:
+                    driver = self.idle.pop()
+                    break
+                if self.total < self.size:
+                    self.total += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.counters["timeouts"] += 1
+                    raise DriverPoolTimeout(f"No browser available within {timeout}s ({self.size} in use).")
+                self.cond.wait(remaining)
+            self.leased += 1
+
+        if driver is None:
+            driver = self._create_leased()
+        elif not self.is_alive(driver):
+            logger.warning("Pooled driver failed liveness probe, replacing it.")
+            with self.cond:
+                self.counters["probe_failures"] += 1
+            self._quit(driver)
+            driver = self._create_leased()
+
+        waited = time.monotonic() - started
+        with self.cond:
+            self.counters["acquired"] += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        return driver
+
+    def release(self, driver, page_loads=1):
+        key = id(driver)
+        with self.cond:
+            self.page_loads[key] = self.page_loads.get(key, 0) + page_loads
+            uses = self.page_loads[key]
+
+        reason = None
+        if uses >= self.max_page_loads:
+            reason = f"{uses} page loads"
+        else:
+            rss_mb = self.rss_mb(driver)
+            if rss_mb is not None and rss_mb > self.max_rss_mb:
+                reason = f"RSS {rss_mb:.0f} MB"
+
+        if reason or self.closed:
+            if reason:
+                logger.info(f"Recycling driver after {reason}.")
+            self._retire(driver, counter="recycled" if reason else None)
+            return
+
+        with self.cond:
+            self.leased -= 1
+            self.idle.append(driver)
+            self.cond.notify()
+
+    def discard(self, driver):
+        """Drop a leased driver that is known to be broken."""
+        self._retire(driver, counter="probe_failures")
+
+    def warm_up(self, count):
+        drivers = []
+        for _ in range(min(count, self.size)):
+            try:
+                drivers.append(self.acquire(timeout=0))
+            except DriverPoolTimeout:
+                break
+            except Exception as e:
+                logger.error(f"Driver warm-up failed: {e}")
+                break
+        for driver in drivers:
+            self.release(driver, page_loads=0)
+        logger.info(f"Driver pool warmed with {len(drivers)} browser(s).")
+        return len(drivers)
+
+    def is_alive(self, driver):
+        try:
+            future = self.probe_executor.submit(driver.execute_script, "return 1")
+            return future.result(timeout=self.probe_timeout) == 1
+        except FutureTimeoutError:
+            logger.warning("Driver liveness probe timed out.")
+            return False
+        except Exception:
+            return False
+
+    def rss_mb(self, driver):
+        pid = getattr(driver, "browser_pid", None)
+        if pid is None:
+            service = getattr(driver, "service", None)
+            process = getattr(service, "process", None)
+            pid = getattr(process, "pid", None)
+        if pid is None:
+            return None
+        try:
+            process = psutil.Process(pid)
+            rss = process.memory_info().rss
+            for child in process.children(recursive=True):
+                try:
+                    rss += child.memory_info().rss
+                except psutil.Error:
+                    continue
+            return rss / (1024 * 1024)
+        except psutil.Error:
+            return None
+
+    def stats(self):
+        with self.cond:
+            acquired = self.counters["acquired"]
+            created = self.counters["created"]
+            return {
+                "size": self.size,
+                "total": self.total,
+                "idle": len(self.idle),
+                "leased": self.leased,
+                "occupancy": round(self.leased / self.size, 3) if self.size else 0.0,
+                "avg_wait_ms": round(self.wait_total / acquired * 1000, 1) if acquired else 0.0,
+                "max_wait_ms": round(self.wait_max * 1000, 1),
+                "avg_launch_ms": round(self.launch_total / created * 1000, 1) if created else 0.0,
+                "max_launch_ms": round(self.launch_max * 1000, 1),
+                **self.counters,
+            }
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            drivers, self.idle = self.idle, []
+            self.total -= len(drivers)
+            self.cond.notify_all()
+        for driver in drivers:
+            self._quit(driver)
+        self.probe_executor.shutdown(wait=False)
+
+    def _create_leased(self):
+        started = time.monotonic()
+        try:
+            driver = self.factory()
+        except Exception:
+            with self.cond:
+                self.counters["create_failures"] += 1
+                self.total -= 1
+                self.leased -= 1
+                self.cond.notify()
+            raise
+        launched = time.monotonic() - started
+        with self.cond:
+            self.counters["created"] += 1
+            self.page_loads[id(driver)] = 0
+            self.launch_total += launched
+            self.launch_max = max(self.launch_max, launched)
+        logger.info(f"Launched a browser in {launched:.2f}s")
+        return driver
+
+    def _retire(self, driver, counter=None):
+        self._quit(driver)
+        # The counter moves in the same critical section as total/leased, so stats() never sees one without the other.
+        with self.cond:
+            if counter:
+                self.counters[counter] += 1
+            self.total -= 1
+            self.leased -= 1
+            self.cond.notify()
+
+    def _quit(self, driver):
+        with self.cond:
+            self.page_loads.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"Error while quitting driver: {e}")
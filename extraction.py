@@ -0,0 +1,213 @@
+import os
+import re
+import logging
+from html.parser import HTMLParser
+
+logger = logging.getLogger(__name__)
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# Text inside these is never visible. Links inside them are ignored too.
+INVISIBLE_TAGS = {"script", "style", "noscript", "template", "head", "svg", "iframe", "object", "canvas"}
+# Visible but noise for compliance analysis: text is dropped, links are still collected (footer navs link to policies).
+NOISE_TAGS = {"nav"}
+# Dropped only in main-content mode: SMS terms and opt-in disclosures often sit in sidebars, opt-in modals and form widgets.
+MAIN_CONTENT_NOISE_TAGS = {"aside", "button", "select", "dialog"}
+# Consent banners are recognised only on banner-like containers, never on page structure: themes put
+# classes like "cookies-not-set" on <body> and policy pages have <section id="cookie-policy">.
+BANNER_TAGS = {"div", "aside", "dialog"}
+# Whole id/class tokens set by consent managers (OneTrust, Cookiebot, TrustArc, Osano, Cookie Notice, ...).
+CONSENT_TOKEN_PATTERN = re.compile(
+    r"(?:cookie|cookies|gdpr|consent|privacy|cmp)[-_]?(?:banner|bar|notice|popup|dialog|modal|overlay|notification|consent|law-info-bar)"
+    r"|onetrust-(?:banner-sdk|consent-sdk|pc-sdk)|cybotcookiebotdialog|truste-consent-track|truste_box_overlay"
+    r"|osano-cm-(?:window|dialog)|cc-(?:window|banner)|moove_gdpr_cookie_info_bar",
+    re.IGNORECASE,
+)
+CONSENT_WORD = re.compile(r"(?:^|[-_])(?:cookies?|consent|gdpr)(?:$|[-_])", re.IGNORECASE)
+FIXED_POSITION = re.compile(r"position\s*:\s*(?:fixed|sticky)", re.IGNORECASE)
+BLOCK_TAGS = {
+    "address", "article", "blockquote", "body", "br", "caption", "dd", "details", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "html", "label",
+    "legend", "li", "main", "ol", "p", "pre", "section", "summary", "table", "tbody", "td", "tfoot", "th", "thead",
+    "title", "tr", "ul",
+}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+WHITESPACE = re.compile(r"\s+")
+
+extraction_backend = os.environ.get("EXTRACTION_BACKEND", "auto")  # auto | lxml | html.parser | bs4
+main_content_mode = os.environ.get("EXTRACTION_MAIN_CONTENT", "0") == "1"
+main_content_min_chars = int(os.environ.get("EXTRACTION_MAIN_MIN_CHARS", "500"))
+
+
+class Page:
+    """Visible text (one line per block element) and (href, link text) pairs of one HTML document."""
+
+    def __init__(self, text, links, backend):
+        self.text = text
+        self.links = links
+        self.backend = backend
+
+    def __repr__(self):
+        return f"Page({len(self.text)} chars, {len(self.links)} links, {self.backend})"
+
+
+def is_consent_banner(tag, attrib):
+    """A div/aside/dialog whose id or class is a consent-manager token, or a fixed one named after cookies/consent."""
+    if tag not in BANNER_TAGS:
+        return False
+    tokens = f"{attrib.get('id') or ''} {attrib.get('class') or ''}".split()
+    if any(CONSENT_TOKEN_PATTERN.fullmatch(token) for token in tokens):
+        return True
+    return bool(FIXED_POSITION.search(attrib.get("style") or "")) and any(CONSENT_WORD.search(token) for token in tokens)
+
+
+class TextCollector:
+    """Parser-agnostic event sink: start/end/data calls in, a Page out of close().
+
+    Used directly as an lxml parser target and driven by StdlibParser for html.parser.
+    """
+
+    def __init__(self, backend, main_content=False):
+        self.backend = backend
+        self.main_content = main_content
+        self.stack = []  # (tag, invisible, noise, in_main)
+        self.lines = []  # (text, in_main)
+        self.buffer = []
+        self.links = []
+        self.link = None
+
+    def state(self):
+        return self.stack[-1][1:] if self.stack else (False, False, False)
+
+    def flush(self):
+        if self.buffer:
+            line = WHITESPACE.sub(" ", "".join(self.buffer)).strip()
+            if line:
+                self.lines.append((line, self.state()[2]))
+            self.buffer = []
+
+    def start(self, tag, attrib):
+        if not isinstance(tag, str):
+            return
+        tag = tag.lower()
+        if tag in BLOCK_TAGS:
+            self.flush()
+        if tag in VOID_TAGS:
+            return
+        invisible, noise, in_main = self.state()
+        self.stack.append((
+            tag,
+            invisible or tag in INVISIBLE_TAGS,
+            noise or tag in NOISE_TAGS or attrib.get("role") == "navigation" or is_consent_banner(tag, attrib)
+            or (self.main_content and tag in MAIN_CONTENT_NOISE_TAGS),
+            in_main or tag in ("main", "article") or attrib.get("role") == "main",
+        ))
+        if tag == "a" and attrib.get("href") and not invisible:
+            self.link = (attrib["href"], [])
+
+    def end(self, tag):
+        if not isinstance(tag, str):
+            return
+        tag = tag.lower()
+        if tag in VOID_TAGS or not any(entry[0] == tag for entry in self.stack):
+            return
+        if tag in BLOCK_TAGS:
+            self.flush()
+        # Close anything left open inside this element, the way browsers recover from bad markup.
+        while self.stack:
+            closed = self.stack.pop()[0]
+            if closed == "a" and self.link is not None:
+                href, parts = self.link
+                self.links.append((href, WHITESPACE.sub(" ", "".join(parts)).strip()))
+                self.link = None
+            if closed == tag:
+                break
+
+    def data(self, text):
+        invisible, noise, _ = self.state()
+        if invisible:
+            return
+        if self.link is not None:
+            self.link[1].append(text)
+        if not noise:
+            self.buffer.append(text)
+
+    def close(self):
+        self.flush()
+        lines = [line for line, _ in self.lines]
+        if self.main_content:
+            main_lines = [line for line, in_main in self.lines if in_main]
+            if sum(len(line) for line in main_lines) >= main_content_min_chars:
+                lines = main_lines
+        return Page("\n".join(lines), self.links, self.backend)
+
+
+class StdlibParser(HTMLParser):
+    def __init__(self, collector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, {name: value or "" for name, value in attrs})
+
+    def handle_startendtag(self, tag, attrs):
+        self.collector.start(tag, {name: value or "" for name, value in attrs})
+        if tag not in VOID_TAGS:
+            self.collector.end(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+def extract_with_lxml(html, main_content):
+    collector = TextCollector("lxml", main_content)
+    parser = etree.HTMLParser(target=collector, remove_comments=True)
+    try:
+        parser.feed(html)
+        return parser.close()
+    except etree.LxmlError:
+        return collector.close()
+
+
+def extract_with_stdlib(html, main_content):
+    collector = TextCollector("html.parser", main_content)
+    parser = StdlibParser(collector)
+    parser.feed(html)
+    parser.close()
+    return collector.close()
+
+
+def extract_with_bs4(html, main_content=False):
+    """The original BeautifulSoup path: two extra tree walks, no noise removal. Kept for comparison."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    links = [(link["href"].strip(), link.get_text(strip=True)) for link in soup.find_all("a", href=True)]
+    return Page(soup.get_text(separator="\n", strip=True), links, "bs4")
+
+
+BACKENDS = {"lxml": extract_with_lxml, "html.parser": extract_with_stdlib, "bs4": extract_with_bs4}
+
+
+def resolve_backend(name=extraction_backend):
+    if name == "auto":
+        return "lxml" if etree is not None else "html.parser"
+    if name == "lxml" and etree is None:
+        logger.warning("EXTRACTION_BACKEND=lxml but lxml is not installed; using html.parser")
+        return "html.parser"
+    return name
+
+
+active_backend = resolve_backend()
+
+
+def extract_page(html, backend=None, main_content=None):
+    """Parse once and return the page's visible text and links."""
+    backend = resolve_backend(backend) if backend else active_backend
+    return BACKENDS[backend](html, main_content_mode if main_content is None else main_content)
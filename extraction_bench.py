@@ -0,0 +1,75 @@
+"""Micro-benchmark of the HTML extraction backends against the original BeautifulSoup path.
+
+    python extraction_bench.py                       # every *.html file in the repo
+    python extraction_bench.py --repeat 20 page.html
+
+For each file and backend it reports the median time to get links and visible text, throughput,
+and how much of the BeautifulSoup text each backend keeps (noise removal makes this < 100%).
+"""
+import os
+import glob
+import time
+import argparse
+import statistics
+
+from extraction import BACKENDS, etree
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def available_backends():
+    backends = ["bs4", "html.parser"]
+    if etree is not None:
+        backends.append("lxml")
+    try:
+        import bs4  # noqa: F401
+    except ImportError:
+        backends.remove("bs4")
+    return backends
+
+
+def time_backend(backend, html, repeat, main_content):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        page = BACKENDS[backend](html, main_content)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), page
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HTML extraction backends.")
+    parser.add_argument("files", nargs="*", help="HTML files (default: the repo's *.html)")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--main-content", action="store_true", help="benchmark main-content mode")
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(REPO_DIR, "*.html")))
+    backends = available_backends()
+    totals = {backend: 0.0 for backend in backends}
+    total_bytes = 0
+
+    print(f"{'file':40} {'KB':>7} " + " ".join(f"{backend + ' ms':>14}" for backend in backends) + "  text kept vs bs4")
+    for path in files:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            html = f.read()
+        total_bytes += len(html.encode("utf-8"))
+        results = {backend: time_backend(backend, html, args.repeat, args.main_content) for backend in backends}
+        for backend, (seconds, _) in results.items():
+            totals[backend] += seconds
+        kept = ""
+        if "bs4" in results:
+            reference = len(results["bs4"][1].text) or 1
+            kept = " ".join(f"{backend}={len(page.text) / reference:.0%}" for backend, (_, page) in results.items() if backend != "bs4")
+        timings = " ".join(f"{seconds * 1000:>14.2f}" for seconds, _ in results.values())
+        print(f"{os.path.basename(path)[:40]:40} {len(html) / 1024:>7.1f} {timings}  {kept}")
+
+    megabytes = total_bytes / (1024 * 1024)
+    print()
+    for backend in backends:
+        speedup = f", {totals['bs4'] / totals[backend]:.1f}x vs bs4" if "bs4" in totals and backend != "bs4" and totals[backend] else ""
+        print(f"{backend:12} {totals[backend] * 1000:9.1f} ms total, {megabytes / totals[backend]:6.1f} MB/s{speedup}")
+
+
+if __name__ == "__main__":
+    main()
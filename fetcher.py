@@ -0,0 +1,107 @@
+import os
+import re
+import logging
+import requests
+from threading import Lock
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli  # noqa: F401  (lets urllib3 decode "br" responses)
+    accept_encoding = "gzip, deflate, br"
+except ImportError:
+    accept_encoding = "gzip, deflate"
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+BOT_PROTECTION_MARKERS = ["verify you are human", "enable javascript and cookies"]
+SPA_SHELL_PATTERN = re.compile(
+    r'<div[^>]+id=["\'](?:root|app|__next|__nuxt|svelte)["\'][^>]*>\s*</div>|ng-version=|data-reactroot',
+    re.IGNORECASE,
+)
+JS_REQUIRED_PATTERN = re.compile(r"<noscript[^>]*>[^<]*(?:enable|requires?|turn on)\s+javascript", re.IGNORECASE)
+
+http_tier_enabled = os.environ.get("FETCH_HTTP_TIER", "1") != "0"
+static_min_text_chars = int(os.environ.get("STATIC_MIN_TEXT_CHARS", "200"))
+http_timeout = (float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5")), float(os.environ.get("HTTP_READ_TIMEOUT", "15")))
+
+
+def create_http_session(pool_maxsize=32):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "User-Agent": USER_AGENT,
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Encoding": accept_encoding,
+        "Accept-Language": "en-US,en;q=0.9",
+    })
+    return session
+
+
+http_session = create_http_session()
+
+tier_counts = {"http": 0, "browser": 0}
+escalation_reasons = {}
+stats_lock = Lock()
+
+
+def record_tier(tier, reason=None):
+    with stats_lock:
+        tier_counts[tier] = tier_counts.get(tier, 0) + 1
+        if reason:
+            escalation_reasons[reason] = escalation_reasons.get(reason, 0) + 1
+
+
+def tier_stats():
+    with stats_lock:
+        return {"served": dict(tier_counts), "escalations": dict(escalation_reasons)}
+
+
+def fetch_static(url):
+    """Fetch a page over plain HTTP. Returns (html, None) or (None, reason to escalate)."""
+    try:
+        response = http_session.get(url, timeout=http_timeout, allow_redirects=True)
+    except requests.exceptions.RequestException as e:
+        logger.info(f"HTTP tier failed for {url}: {e}")
+        return None, "request error"
+
+    if response.status_code != 200:
+        return None, f"status {response.status_code}"
+    content_type = response.headers.get("Content-Type", "")
+    if content_type and "html" not in content_type.lower():
+        return None, "not html"
+    return response.text, None
+
+
+def fetch_conditional(url, etag=None, last_modified=None):
+    """Conditional GET. Returns (status_code, html or None, etag, last_modified); status 0 on request errors."""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    try:
+        response = http_session.get(url, headers=headers, timeout=http_timeout, allow_redirects=True)
+    except requests.exceptions.RequestException as e:
+        logger.info(f"Conditional fetch failed for {url}: {e}")
+        return 0, None, etag, last_modified
+    if response.status_code == 304:
+        return 304, None, etag, last_modified
+    html = response.text if response.status_code == 200 else None
+    return response.status_code, html, response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+
+def browser_required_reason(html, visible_text):
+    """Return why a statically fetched page needs a real browser, or None if it is usable as-is."""
+    lower_html = html.lower()
+    if any(marker in lower_html for marker in BOT_PROTECTION_MARKERS):
+        return "bot protection"
+    if len(visible_text) < static_min_text_chars:
+        if SPA_SHELL_PATTERN.search(html):
+            return "spa shell"
+        if JS_REQUIRED_PATTERN.search(html):
+            return "javascript required"
+        return "empty body"
+    return None
@@ -0,0 +1,133 @@
+import time
+import heapq
+import logging
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+# Exact names only: prefixes like "ref" or "source" would also strip real parameters (referrer_id, sourceId).
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "_ga", "_gl", "ref", "source"}
+TRACKING_PARAM_PREFIXES = ("utm_",)
+
+# Weights for words in link text; path segments score at PATH_WEIGHT of the same table.
+LINK_KEYWORD_WEIGHTS = [
+    ("sms", 10),
+    ("text messag", 9),
+    ("messaging", 8),
+    ("mobile terms", 8),
+    ("opt-in", 6),
+    ("privacy policy", 6),
+    ("privacy", 5),
+    ("terms of service", 6),
+    ("terms and conditions", 6),
+    ("terms & conditions", 6),
+    ("terms of use", 5),
+    ("terms", 4),
+    ("legal", 2),
+    ("cookie", -4),
+    ("accessibility", -4),
+    ("notices", -1),
+]
+PATH_WEIGHT = 0.8
+DEPTH_PENALTY = 1.5
+
+
+def canonicalize_url(url):
+    """Normalise scheme/host case, default ports, trailing slashes, fragments and tracking parameters."""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower() or "https"
+    netloc = parsed.netloc.lower()
+    if (scheme == "https" and netloc.endswith(":443")) or (scheme == "http" and netloc.endswith(":80")):
+        netloc = netloc.rsplit(":", 1)[0]
+    path = parsed.path or "/"
+    while "//" in path:
+        path = path.replace("//", "/")
+    path = path.rstrip("/")
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+    ))
+    return urlunparse((scheme, netloc, path, "", query, ""))
+
+
+def site_host(url):
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def page_key(canonical_url):
+    """De-duplication key: http/https and www/non-www variants of a page are the same page."""
+    key = canonical_url.replace("://www.", "://", 1)
+    return "https://" + key[len("http://"):] if key.startswith("http://") else key
+
+
+def score_link(url, link_text=""):
+    text = link_text.lower()
+    path = urlparse(url).path.lower().replace("-", " ").replace("_", " ")
+    score = 0.0
+    for keyword, weight in LINK_KEYWORD_WEIGHTS:
+        if keyword in text:
+            score += weight
+        if keyword.replace("-", " ") in path:
+            score += weight * PATH_WEIGHT
+    return score
+
+
+class CrawlFrontier:
+    """Priority queue of candidate policy pages for one check, bounded by a page and time budget.
+
+    Seeds are always crawled; other candidates are canonicalized, de-duplicated, scored by
+    link text and path, and handed out best-first until max_pages or time_budget is used up.
+    """
+
+    def __init__(self, base_url, max_pages=8, time_budget=60):
+        self.host = site_host(base_url)
+        self.max_pages = max_pages
+        self.deadline = time.monotonic() + time_budget
+        self.heap = []
+        self.seen = set()
+        self.selected = []
+        self.counter = 0
+
+    def add_seed(self, url):
+        canonical = canonicalize_url(url)
+        if page_key(canonical) not in self.seen:
+            self.seen.add(page_key(canonical))
+            self.selected.append(canonical)
+        return canonical
+
+    def add(self, url, link_text="", depth=1):
+        canonical = canonicalize_url(url)
+        if page_key(canonical) in self.seen or site_host(canonical) != self.host:
+            return False
+        score = score_link(canonical, link_text) - DEPTH_PENALTY * (depth - 1)
+        if score <= 0:
+            return False
+        self.seen.add(page_key(canonical))
+        self.counter += 1
+        heapq.heappush(self.heap, (-score, self.counter, canonical, depth))
+        return True
+
+    def queued(self):
+        return len(self.heap)
+
+    def contains(self, url):
+        return page_key(canonicalize_url(url)) in self.seen
+
+    def budget_left(self):
+        return len(self.selected) < self.max_pages and time.monotonic() < self.deadline
+
+    def take(self, count):
+        batch = []
+        while self.heap and len(batch) < count and self.budget_left():
+            _, _, url, depth = heapq.heappop(self.heap)
+            self.selected.append(url)
+            batch.append((url, depth))
+        return batch
+
+    def summary(self):
+        return {
+            "selected": len(self.selected),
+            "left_in_queue": len(self.heap),
+            "budget_exhausted": bool(self.heap) and not self.budget_left(),
+        }
@@ -0,0 +1,152 @@
+import time
+import uuid
+import queue
+import logging
+from threading import Thread, Lock
+from concurrent.futures import Future
+
+import metrics
+from progress import ProgressLog, progress_listener, emit
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue is at its admission limit."""
+
+
+class Job:
+    def __init__(self, website_url, refresh=False):
+        self.id = uuid.uuid4().hex
+        self.website_url = website_url
+        self.refresh = refresh
+        self.status = "queued"
+        self.result = None
+        self.cache_status = None
+        self.error = None
+        self.status_code = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.timings = None
+        self.progress = ProgressLog()
+        self.future = Future()
+
+    def to_dict(self, include_result=True):
+        data = {
+            "job_id": self.id,
+            "website_url": self.website_url,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == "failed":
+            data["error"] = self.error
+            data["status_code"] = self.status_code
+        if self.status == "done" and include_result:
+            data["result"] = self.result
+            data["cache_status"] = self.cache_status
+        if self.timings is not None:
+            data["timings"] = self.timings
+        return data
+
+
+class JobManager:
+    """Local work queue for compliance checks served by a fixed number of worker threads.
+
+    `handler(website_url, refresh)` must return (result, cache_status). Submissions are
+    refused with JobQueueFull once `max_pending` jobs are waiting; finished jobs are
+    kept for `retention` seconds so their results can be polled.
+    """
+
+    def __init__(self, handler, workers=2, max_pending=50, retention=3600):
+        self.handler = handler
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retention = retention
+        self.queue = queue.Queue()
+        self.jobs = {}
+        self.lock = Lock()
+        self.threads = []
+        self.running = 0
+        self.counters = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0}
+
+    def start(self):
+        for index in range(self.workers):
+            thread = Thread(target=self._work, name=f"compliance-worker-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        logger.info(f"Started {self.workers} compliance worker(s).")
+
+    def stop(self):
+        for _ in self.threads:
+            self.queue.put(None)
+        self.threads = []
+
+    def submit(self, website_url, refresh=False):
+        with self.lock:
+            self._prune()
+            if self.queue.qsize() >= self.max_pending:
+                self.counters["rejected"] += 1
+                raise JobQueueFull(f"{self.queue.qsize()} checks already queued.")
+            job = Job(website_url, refresh)
+            job.progress.publish("queued", {"job_id": job.id, "website_url": website_url})
+            self.jobs[job.id] = job
+            self.counters["submitted"] += 1
+        self.queue.put(job)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "queued": self.queue.qsize(),
+                "running": self.running,
+                "max_pending": self.max_pending,
+                "tracked_jobs": len(self.jobs),
+                **self.counters,
+            }
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            with self.lock:
+                self.running += 1
+            job.status = "running"
+            job.started_at = time.time()
+            trace = None
+            try:
+                with metrics.request_trace() as trace, progress_listener(job.progress.publish):
+                    emit("started", website_url=job.website_url)
+                    job.result, job.cache_status = self.handler(job.website_url, job.refresh)
+                job.status = "done"
+                outcome = "completed"
+                metrics.count("checks", outcome=job.cache_status)
+            except Exception as e:
+                job.error = getattr(e, "detail", None) or str(e)
+                job.status_code = getattr(e, "status_code", 500)
+                job.status = "failed"
+                outcome = "failed"
+                logger.error(f"Compliance job {job.id} for {job.website_url} failed: {job.error}")
+                metrics.count("checks", outcome="failed")
+            job.finished_at = time.time()
+            if trace is not None:
+                job.timings = trace.summary()
+            job.progress.close()
+            with self.lock:
+                self.running -= 1
+                self.counters[outcome] += 1
+            job.future.set_result(job)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self.jobs.items() if job.finished_at and job.finished_at < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
@@ -0,0 +1,193 @@
+import os
+import time
+import random
+import logging
+import requests
+from email.utils import parsedate_to_datetime
+from threading import Lock, BoundedSemaphore
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Refills `per_minute` units evenly over a minute; acquire() blocks until enough units are available."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = Lock()
+
+    def acquire(self, amount=1):
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def retry_after_seconds(response):
+    """Delay requested by the server through retry-after-ms or Retry-After (seconds or HTTP date)."""
+    if response is None:
+        return None
+    retry_after_ms = response.headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = response.headers.get("Retry-After")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMClient:
+    """Shared OpenAI chat client: pooled keep-alive connections, timeouts, jittered retries and rate limits.
+
+    Requests-per-minute and tokens-per-minute are enforced process-wide with token buckets,
+    and at most `max_concurrency` calls are in flight at once.
+    """
+
+    def __init__(self, base_url="https://api.openai.com/v1", connect_timeout=10, read_timeout=180,
+                 max_retries=5, backoff_base=1.0, backoff_max=60.0,
+                 requests_per_minute=500, tokens_per_minute=200000, max_concurrency=4):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.slots = BoundedSemaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(max_concurrency, 4))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.lock = Lock()
+        self.totals = {
+            "calls": 0,
+            "failures": 0,
+            "retries": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "latency_seconds": 0.0,
+            "rate_limit_wait_seconds": 0.0,
+        }
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def chat_completion(self, payload, api_key, estimated_tokens=0):
+        """POST a chat completion. Returns (response_data, call_stats); raises requests exceptions once retries run out."""
+        headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        url = f"{self.base_url}/chat/completions"
+        call_stats = {"attempts": 0, "latency_seconds": 0.0, "rate_limit_wait_seconds": 0.0}
+
+        with self.slots:
+            for attempt in range(self.max_retries + 1):
+                call_stats["rate_limit_wait_seconds"] += self.request_bucket.acquire(1)
+                call_stats["rate_limit_wait_seconds"] += self.token_bucket.acquire(estimated_tokens)
+                call_stats["attempts"] += 1
+                started = time.monotonic()
+                response = None
+                try:
+                    response = self.session.post(url, headers=headers, json=payload, timeout=self.timeout)
+                    retryable = response.status_code in RETRYABLE_STATUS
+                    error = None
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    retryable, error = True, e
+                call_stats["latency_seconds"] += time.monotonic() - started
+
+                if retryable and attempt < self.max_retries:
+                    delay = retry_after_seconds(response)
+                    delay = self.backoff(attempt) if delay is None else min(delay, self.backoff_max)
+                    reason = f"status {response.status_code}" if response is not None else str(error)
+                    logger.warning(f"OpenAI call failed ({reason}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                    self.record(retried=True)
+                    time.sleep(delay)
+                    continue
+
+                if error is not None:
+                    self.record(failed=True)
+                    raise error
+                try:
+                    response.raise_for_status()
+                except requests.exceptions.HTTPError:
+                    self.record(failed=True)
+                    raise
+                break
+
+        data = response.json()
+        usage = data.get("usage") or {}
+        call_stats["prompt_tokens"] = usage.get("prompt_tokens", 0)
+        call_stats["completion_tokens"] = usage.get("completion_tokens", 0)
+        self.record(call_stats=call_stats)
+        metrics.observe_stage("llm_call", call_stats["latency_seconds"])
+        metrics.observe_stage("llm_rate_limit_wait", call_stats["rate_limit_wait_seconds"])
+        metrics.count("llm_calls")
+        metrics.count("llm_tokens", call_stats["prompt_tokens"], kind="prompt")
+        metrics.count("llm_tokens", call_stats["completion_tokens"], kind="completion")
+        logger.info(
+            f"OpenAI call took {call_stats['latency_seconds']:.2f}s over {call_stats['attempts']} attempt(s), "
+            f"{call_stats['prompt_tokens']} prompt + {call_stats['completion_tokens']} completion tokens"
+        )
+        return data, call_stats
+
+    def record(self, call_stats=None, retried=False, failed=False):
+        with self.lock:
+            if retried:
+                self.totals["retries"] += 1
+            if failed:
+                self.totals["failures"] += 1
+            if call_stats:
+                self.totals["calls"] += 1
+                self.totals["prompt_tokens"] += call_stats["prompt_tokens"]
+                self.totals["completion_tokens"] += call_stats["completion_tokens"]
+                self.totals["latency_seconds"] += call_stats["latency_seconds"]
+                self.totals["rate_limit_wait_seconds"] += call_stats["rate_limit_wait_seconds"]
+
+    def stats(self):
+        with self.lock:
+            calls = self.totals["calls"]
+            return {
+                "max_concurrency": self.max_concurrency,
+                **self.totals,
+                "avg_latency_seconds": round(self.totals["latency_seconds"] / calls, 3) if calls else 0.0,
+            }
+
+
+def create_llm_client():
+    return LLMClient(
+        base_url=os.environ.get("OPENAI_API_BASE", "https://api.openai.com/v1"),
+        connect_timeout=float(os.environ.get("OPENAI_CONNECT_TIMEOUT", "10")),
+        read_timeout=float(os.environ.get("OPENAI_READ_TIMEOUT", "180")),
+        max_retries=int(os.environ.get("OPENAI_MAX_RETRIES", "5")),
+        requests_per_minute=int(os.environ.get("OPENAI_RPM", "500")),
+        tokens_per_minute=int(os.environ.get("OPENAI_TPM", "200000")),
+        max_concurrency=int(os.environ.get("OPENAI_MAX_CONCURRENCY", "4")),
+    )
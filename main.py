@@ -1,18 +1,37 @@
 import os
+import asyncio
 import time
 import json
+import psutil
 import requests
 import logging
-import undetected_chromedriver as uc
-from urllib.parse import urljoin, urlparse
-from fastapi import FastAPI, Query, HTTPException, Response
+from datetime import datetime, timedelta
+from fastapi import FastAPI, Query, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-from threading import Lock
+from fastapi.concurrency import run_in_threadpool
+from threading import Thread
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from readiness import readiness_stats
+from result_cache import ComplianceCache, hash_page_texts
+from prompt_builder import build_page_corpus, estimate_tokens, prompt_stats
+from rules import screen_compliance, all_high_confidence, build_rule_result, build_snippet_corpus, build_hint_block, screen_findings, record_outcome, rule_stats
+from jobs import JobManager, JobQueueFull
+from singleflight import SingleFlight
+from resource_blocking import blocking_stats
+from frontier import canonicalize_url
+from discovery import discovery_enabled, discover_policy_pages
+from llm_client import create_llm_client
+from chunked_analysis import should_chunk, analyse_in_chunks
+from crawl_workers import CrawlWorkerPool, CrawlWorkerError, plan_workers
+from chromedriver_cache import chromedriver_cache_stats
+import metrics
+from progress import emit as emit_progress
+from extraction import extract_page
+from monitoring import MonitorStore, ComplianceMonitor
+from oncall import OnCallDirectory, etag_for, etag_matches
+from fetcher import browser_required_reason, record_tier, tier_stats
+from crawler import pool_size, pool_warm_size, driver_pool, get_chromedriver_binary, enforce_www, extract_text_from_website, render_in_browser
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
@@ -35,315 +54,124 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Function to get Chrome binary
-def get_chrome_binary():
-    chrome_binary = os.environ.get("CHROME_BIN", "/opt/render/chromium/chrome-linux64/chrome")
-    if not os.path.exists(chrome_binary):
-        raise FileNotFoundError("Chrome binary not found! Check installation.")
-    return chrome_binary
-
-# Function to get ChromeDriver binary
-def get_chromedriver_binary():
-    chromedriver_binary = os.environ.get("CHROMEDRIVER_BIN", "/opt/render/chromedriver/chromedriver-linux64/chromedriver")
-    if not os.path.exists(chromedriver_binary):
-        raise FileNotFoundError("ChromeDriver binary not found! Check installation.")
-    return chromedriver_binary
-
-# Driver Pool
-driver_pool = []
-pool_lock = Lock()
-pool_size = 5  # adjust as needed.
-
-def initialize_driver():
-    options = uc.ChromeOptions()
-    options.add_argument("--headless=new")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--disable-infobars")
-    options.add_argument(
-        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    )
-
-    chrome_binary = get_chrome_binary()
-    logger.info(f"Using Chrome binary: {chrome_binary}")
-
-    try:
-        driver = uc.Chrome(
-            options=options,
-            browser_executable_path=chrome_binary,
-            use_subprocess=True
-        )
-        return driver
-    except Exception as e:
-        logger.error(f"Failed to start Undetected ChromeDriver: {e}")
-        raise HTTPException(status_code=500, detail="Failed to start browser session. Check server configuration.")
-        
-def get_driver_from_pool():
-    with pool_lock:
-        if driver_pool:
-            return driver_pool.pop()
-        if len(driver_pool) < pool_size:
-            return initialize_driver()
-        else:
-            return initialize_driver()
-
-def return_driver_to_pool(driver):
-    with pool_lock:
-        driver_pool.append(driver)
-
-# Function to enforce www. on website URL
-def enforce_www(website_url):
-    if "www." not in website_url:
-        website_url = website_url.replace("https://", "https://www.", 1) if website_url.startswith(
-            "https://"
-        ) else f"https://www.{website_url}"
-    return website_url
-
-def extract_text_from_website(base_url):
-    original_base_url = base_url
-    base_url = enforce_www(base_url)
-    logger.info(f"Checking compliance for: {base_url}")
-    driver = get_driver_from_pool()
-    extracted_text = ""
-    pages_to_check = [base_url]
-    base_domain = urlparse(base_url).netloc
-    source_urls = {}
-
-    try:
-        soup = fetch_page(driver, base_url)
-        if soup is None:
-            return "", {}
-
-        non_www_privacy_url = f"{base_url.replace('www.', '')}/privacy-policy/"
-        if "www." not in original_base_url:
-            try:
-                headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/91.0'}
-                response = requests.get(non_www_privacy_url, headers=headers, timeout=10)
-                logger.info(f"Response status: {response.status_code}")
-                if response.status_code == 200:
-                    pages_to_check = [non_www_privacy_url]
-                time.sleep(2)
-            except requests.exceptions.RequestException:
-                pass
-
-        logger.info(f"pages_to_check before link parsing: {pages_to_check}")
-
-        for link in soup.find_all("a", href=True):
-            try:
-                href = link["href"].strip()
-                if href.startswith("mailto:"):
-                    continue
-                parsed_href = urlparse(urljoin(base_url, href))
-                if parsed_href.netloc and parsed_href.netloc != base_domain:
-                    continue
-
-                link_text = link.get_text(strip=True).lower()
-                if any(keyword in link_text or keyword in href.lower() for keyword in ["privacy", "terms", "legal"]):
-                    absolute_url = urljoin(base_url, href)
-                    pages_to_check.append(absolute_url)
-
-                    sub_soup = fetch_page(driver, absolute_url)
-                    if sub_soup is None:
-                        continue
-
-                    for sub_link in sub_soup.find_all("a", href=True):
-                        sub_href = sub_link["href"].strip()
-                        if sub_href.startswith("mailto:"):
-                            continue
-                        parsed_sub_href = urlparse(urljoin(absolute_url, sub_href))
-                        if parsed_sub_href.netloc and parsed_sub_href.netloc != base_domain:
-                            continue
-                        if any(keyword in sub_href.lower() for keyword in ["privacy", "terms", "legal"]):
-                            pages_to_check.append(urljoin(absolute_url, sub_href))
-            except Exception as e:
-                logger.error(f"Error processing link: {e}")
-                continue
-
-        logger.info(f"pages_to_check after link parsing: {pages_to_check}")
-
-        www_privacy_url = f"{base_url}/privacy-policy/"
-        if "www." not in original_base_url:
-            if non_www_privacy_url not in pages_to_check:
-                try:
-                    response = requests.head(non_www_privacy_url, allow_redirects=False, timeout=10)
-                    if response.status_code == 200:
-                        pages_to_check.append(non_www_privacy_url)
-                except requests.exceptions.RequestException:
-                    pass
-        else:
-            try:
-                response = requests.head(www_privacy_url, allow_redirects=False, timeout=10)
-                if response.status_code == 200 and www_privacy_url not in pages_to_check:
-                    pages_to_check.append(www_privacy_url)
-            except requests.exceptions.RequestException:
-                pass
-
-        logger.info(f"pages_to_check before scraping: {pages_to_check}")
-
-        for page in set(pages_to_check):
-            logger.info(f"Scraping page: {page}")
-            soup = fetch_page(driver, page)
-            if soup is None:
-                continue
-            page_text = soup.get_text(separator="\n", strip=True)
-            extracted_text += page_text + "\n"
-            source_urls[page] = page_text
-
-        if len(extracted_text) < 100:
-            logger.warning(f"Extracted text from {base_url} appears too short, might have missed content.")
-
-        return extracted_text.strip(), source_urls
-
-    except Exception as e:
-        logger.error(f"Failed to extract text from {base_url}: {e}")
-        return "", {}
-
-    finally:
-        return_driver_to_pool(driver)
-
-def fetch_page(driver, url, max_wait=30):
-    try:
-        logger.info(f"Loading page: {url}")
-        driver.set_page_load_timeout(60)
-        driver.get(url)
-
-        WebDriverWait(driver, max_wait).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(3)
+# Crawl worker processes; each owns its drivers. 0 (default) crawls inside the API process with crawler.driver_pool.
+# Workers share the DRIVER_POOL_SIZE browser cap: processes x drivers per process never exceeds it.
+crawl_worker_processes, crawl_worker_drivers = plan_workers(
+    os.environ.get("CRAWL_WORKER_PROCESSES", "0"), pool_size, int(os.environ.get("CRAWL_WORKER_DRIVERS", "2"))
+)
+crawl_workers = CrawlWorkerPool(
+    crawl_worker_processes,
+    drivers_per_worker=crawl_worker_drivers,
+    warm_drivers=int(os.environ.get("CRAWL_WORKER_WARM", "1")),
+    task_timeout=float(os.environ.get("CRAWL_TASK_TIMEOUT", "300")),
+) if crawl_worker_processes else None
+
+# Seconds since the process started, for time-to-ready reporting
+process_started_at = psutil.Process().create_time()
+startup_stats = {"imported_after_seconds": round(time.time() - process_started_at, 3), "serving_after_seconds": None, "warm_after_seconds": None}
+
+def warm_in_background():
+    if crawl_workers is not None:
+        crawl_workers.wait_ready()
+    else:
+        driver_pool.warm_up(pool_warm_size)
+    startup_stats["warm_after_seconds"] = round(time.time() - process_started_at, 3)
+    logger.info(f"Browsers warm {startup_stats['warm_after_seconds']}s after process start")
+
+@app.on_event("startup")
+def warm_driver_pool():
+    # Requests are accepted straight away; a pool miss before warm-up finishes just launches a driver on demand.
+    if crawl_workers is not None:
+        crawl_workers.start()
+    Thread(target=warm_in_background, name="driver-warm-up", daemon=True).start()
+    startup_stats["serving_after_seconds"] = round(time.time() - process_started_at, 3)
+
+@app.on_event("shutdown")
+def close_driver_pool():
+    if crawl_workers is not None:
+        crawl_workers.stop()
+    driver_pool.close()
+
+# Result Cache
+compliance_cache = ComplianceCache(
+    os.environ.get("COMPLIANCE_CACHE_PATH", "compliance_cache.sqlite3"),
+    ttl=float(os.environ.get("COMPLIANCE_CACHE_TTL", str(6 * 3600))),
+    content_ttl=float(os.environ.get("COMPLIANCE_CONTENT_TTL", str(30 * 86400))),
+    memory_size=int(os.environ.get("COMPLIANCE_CACHE_MEMORY_SIZE", "256")),
+)
 
-        page_source = driver.page_source
-        lower_text = page_source.lower()
+compliance_wait_timeout = float(os.environ.get("COMPLIANCE_WAIT_TIMEOUT", "180"))  # GET /check_compliance wait before returning a job id
 
-        if "verify you are human" in lower_text or "enable javascript and cookies" in lower_text:
-            logger.warning(f"Bot protection detected on page: {url}")
-            return None
+batch_max_urls = int(os.environ.get("BATCH_MAX_URLS", "1000"))
+batch_max_in_flight = int(os.environ.get("BATCH_MAX_IN_FLIGHT", "10"))  # per batch; the job workers bound actual concurrency
 
-        return BeautifulSoup(page_source, "html.parser")
+site_checks = SingleFlight()
 
-    except Exception as e:
-        logger.error(f"Failed to fetch page {url}: {e}")
-        return None
+def normalize_site_url(website_url):
+    """Canonical form of a site URL (after enforce_www) used to key cached and in-flight checks."""
+    return canonicalize_url(enforce_www(website_url.strip()))
 
+def crawl_site(website_url):
+    """extract_text_from_website, run on a crawl worker process when those are enabled."""
+    if crawl_workers is None:
+        with metrics.timed("crawl"):
+            return extract_text_from_website(website_url)
     try:
-        soup = fetch_page(base_url)
-        if soup is None:
-            return "", {}
-
-        # Explicitly check non-www privacy policy first
-        non_www_privacy_url = f"{base_url.replace('www.', '')}/privacy-policy/"
-        if "www." not in original_base_url:
-            try:
-                headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-                response = requests.get(non_www_privacy_url, allow_redirects=True, timeout=10, headers=headers)
-                logger.info(f"Response status: {response.status_code}")
-                logger.info(f"Response headers: {response.headers}")
-                if response.status_code == 200:
-                    pages_to_check = [non_www_privacy_url]  # Start ONLY with this page
-                    logger.info(f"Forced pages_to_check: {pages_to_check}")  # Log forced URLs
-                time.sleep(2) #Add delay.
-            except requests.exceptions.RequestException:
-                pass
-
-        logger.info(f"pages_to_check before link parsing: {pages_to_check}")
-
-        for link in soup.find_all("a", href=True):
-            try:  # Add a try block here
-                href = link["href"].strip()
-                if href.startswith("mailto:"):
-                    continue
-                parsed_href = urlparse(urljoin(base_url, href))
-                if parsed_href.netloc and parsed_href.netloc != base_domain:
-                    continue
-
-                link_text = link.get_text(strip=True).lower()
-                if any(keyword in link_text or keyword in href.lower() for keyword in ["privacy", "terms", "legal"]):
-                    absolute_url = urljoin(base_url, href)
-                    pages_to_check.append(absolute_url)
-
-                    sub_soup = fetch_page(absolute_url)
-                    if sub_soup is None:
-                        continue
-
-                    for sub_link in sub_soup.find_all("a", href=True):
-                        sub_href = sub_link["href"].strip()
-                        if sub_href.startswith("mailto:"):
-                            continue
-                        parsed_sub_href = urlparse(urljoin(absolute_url, sub_href))
-                        if parsed_sub_href.netloc and parsed_sub_href != base_domain:
-                            continue
-                        if any(keyword in sub_href.lower() for keyword in ["privacy", "terms", "legal"]):
-                            pages_to_check.append(urljoin(absolute_url, sub_href))
-            except Exception as e:  # Add except block
-                logger.error(f"Error processing link: {e}")
-                continue
-
-        logger.info(f"pages_to_check after link parsing: {pages_to_check}")
-
-        www_privacy_url = f"{base_url}/privacy-policy/"
-
-        if "www." not in original_base_url:
-            if non_www_privacy_url not in pages_to_check:
-                try:
-                    response = requests.head(non_www_privacy_url, allow_redirects=False, timeout=10)
-                    if response.status_code == 200:
-                        pages_to_check.append(non_www_privacy_url)
-                except requests.exceptions.RequestException:
-                    pass
-        else:
-            try:
-                response = requests.head(www_privacy_url, allow_redirects=False, timeout=10)
-                if response.status_code == 200:
-                    if www_privacy_url not in pages_to_check:
-                        pages_to_check.append(www_privacy_url)
-            except requests.exceptions.RequestException:
-                pass
-
-        logger.info(f"pages_to_check before scraping: {pages_to_check}")
-
-        for page in set(pages_to_check):
-            logger.info(f"Scraping page: {page}")
-            soup = fetch_page(page)
-            if soup is None:
-                continue
-            page_text = soup.get_text(separator="\n", strip=True)
-            extracted_text += page_text + "\n"
-            source_urls[page] = page_text
-
-        if len(extracted_text) < 100:
-            logger.warning(f"Extracted text from {base_url} appears too short, might have missed content.")
-
-        return extracted_text.strip(), source_urls
-
-    except Exception as e:
-        logger.error(f"Failed to extract text from {base_url}: {e}")
-        return "", {}
-
-    finally:
-        return_driver_to_pool(driver)
-
-# Function to check compliance using OpenAI API
-
+        with metrics.timed("crawl"):
+            return crawl_workers.extract(website_url)
+    except CrawlWorkerError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except FutureTimeoutError:
+        raise HTTPException(status_code=504, detail="Timed out waiting for a crawl worker.")
+
+# Shared OpenAI client (pooled connections, timeouts, retries, RPM/TPM limits)
+llm_client = create_llm_client()
+compliance_model = os.environ.get("OPENAI_MODEL", "o3-mini")
+
+# Rule engine: "hints" sends only matched snippets when every category matched with high confidence and otherwise
+# the full text with the candidates as hints, "short_circuit" (opt-in) skips the LLM on a full high-confidence match,
+# "off" disables it
+rule_engine_mode = os.environ.get("RULE_ENGINE_MODE", "hints")
 
 # Function to check compliance using OpenAI API
 def check_compliance(text, source_urls, max_retries=3):
     """Function to check compliance using OpenAI API."""
+    with metrics.timed("rule_screen"):
+        screen = screen_compliance(source_urls or {"": text}) if rule_engine_mode != "off" else None
+    if screen:
+        emit_progress("partial_findings", source="rules", findings=screen_findings(screen))
+    if screen and rule_engine_mode == "short_circuit" and all_high_confidence(screen):
+        logger.info("Rule engine matched every category with high confidence; skipping LLM call.")
+        record_outcome("short_circuit")
+        return build_rule_result(screen)
+
     openai_api_key = os.getenv("OPENAI_API_KEY")
     if not openai_api_key:
         logger.error("Missing OpenAI API key.")
         return {"error": "Missing API key."}
 
-    headers = {
-        "Authorization": f"Bearer {openai_api_key}",
-        "Content-Type": "application/json"
-    }
+    # Snippets alone are only trusted when every category matched with high confidence; anything weaker gets the
+    # full text so statements the templates missed can still be found.
+    prompt_mode = "snippets" if screen and all_high_confidence(screen) else "full"
+    if prompt_mode == "snippets":
+        logger.info("Rule engine matched every category with high confidence; sending only matched snippets to the LLM.")
+        record_outcome("snippets")
+        with metrics.timed("prompt_build"):
+            corpus = build_snippet_corpus(screen)
+    else:
+        record_outcome("full")
+        with metrics.timed("prompt_build"):
+            corpus, _ = build_page_corpus(source_urls) if source_urls else (text, None)
+        if source_urls and should_chunk(corpus):
+            logger.info("Site text exceeds the single-prompt threshold; using chunked analysis.")
+            emit_progress("llm_request_sent", mode="chunked", model=compliance_model)
+            return analyse_in_chunks(source_urls, llm_client, openai_api_key, compliance_model)
+        hints = build_hint_block(screen) if screen else ""
+        if hints:
+            corpus = f"{corpus}\n\n{hints}"
 
     payload = {
-        "model": "o3-mini",
+        "model": compliance_model,
         "messages": [
             {
                 "role": "system",
@@ -432,13 +260,13 @@ def check_compliance(text, source_urls, max_retries=3):
                     **🚨 Important:**
                     - **Do NOT assume these statements are only in Privacy Policies or Terms & Conditions. Check all extracted pages.**
                     - **Match compliance wording even if phrased differently (e.g., "We will not share your data" vs. "Your consent remains confidential").**
-                    - **If any statement is detected, return BOTH the found statement and its URL from the following list:** {json.dumps(source_urls)}
+                    - **If any statement is detected, return BOTH the found statement and its URL from the following list:** {json.dumps(list(source_urls))}
                     - **If multiple compliant statements exist, return ALL of them.**
                     - **If AI is unsure, double-check all extracted text before marking a category as "not found."**
                     - **Recheck the following terms before making a final determination:** ["message frequency", "reply STOP", "data sharing", "consent protection", "HELP for support"].
 
-                    Here is the extracted website text:
-                    {text}
+                    Here is the extracted website text. Each page starts with a "=== PAGE: <url> ===" line; lines repeated across most pages (headers, navigation, footers) are listed once under "=== SHARED ACROSS PAGES ===" and apply to every page:
+                    {corpus}
                     """
             }
         ],
@@ -447,11 +275,13 @@ def check_compliance(text, source_urls, max_retries=3):
 
     logging.info(f"Sending OpenAI request with payload: {json.dumps(payload, indent=2)}")
 
+    estimated_tokens = estimate_tokens(payload["messages"][1]["content"])
     for attempt in range(max_retries):
         try:
-            response = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload)
-            response.raise_for_status()
-            response_data = response.json()
+            emit_progress("llm_request_sent", mode=prompt_mode,
+                          model=compliance_model, estimated_tokens=estimated_tokens, attempt=attempt + 1)
+            response_data, call_stats = llm_client.chat_completion(payload, openai_api_key, estimated_tokens)
+            emit_progress("llm_response_received", seconds=round(call_stats["latency_seconds"], 3))
             logging.info(f"OpenAI API Response: {json.dumps(response_data, indent=2)}")
 
             if "choices" in response_data and response_data["choices"]:
@@ -481,25 +311,269 @@ def check_compliance(text, source_urls, max_retries=3):
             logging.error(f"Request error occurred: {req_err}")
             return {"error": "AI processing failed due to request issue."}
 
-@app.get("/check_compliance")
-def check_website_compliance(website_url: str = Query(..., title="Website URL", description="URL of the website to check")):
-    logger.info(f"Checking compliance for: {website_url}")
-
-    extracted_text, source_urls = extract_text_from_website(website_url)  # get source_urls
+def run_compliance_check(website_url, refresh=False):
+    """Crawl and analyse a site, serving cached verdicts when possible. Returns (result, cache_status)."""
+    cache_key = normalize_site_url(website_url)
+    if not refresh:
+        cached_result = compliance_cache.get_fresh(cache_key)
+        if cached_result is not None:
+            logger.info(f"Compliance cache hit for: {cache_key}")
+            emit_progress("cache_hit", cache_status="hit")
+            return cached_result, "hit"
+
+    # Concurrent checks of the same site share one crawl and one LLM analysis.
+    flight_key = f"{cache_key} (refresh)" if refresh else cache_key
+    return site_checks.do(flight_key, analyse_site, website_url, cache_key, refresh)
+
+def cacheable(compliance_result):
+    """Errors and chunked analyses with skipped calls are returned but not cached, so the next check retries them."""
+    return "error" not in compliance_result and not compliance_result.get("failed_steps")
+
+def analyse_site(website_url, cache_key, refresh=False):
+    extracted_text, source_urls = crawl_site(website_url)  # get source_urls
     if not extracted_text:
         raise HTTPException(status_code=400, detail="Failed to extract text from website.")
 
-    compliance_result = check_compliance(extracted_text, source_urls)  # pass source_urls to check_compliance
-
+    content_hash = hash_page_texts(source_urls)
+    if not refresh:
+        cached_result = compliance_cache.get_by_content(cache_key, content_hash)
+        if cached_result is not None:
+            logger.info(f"Page content unchanged for {cache_key}, reusing stored verdict.")
+            emit_progress("cache_hit", cache_status="content-hit")
+            compliance_cache.put(cache_key, cached_result, content_hash)
+            return cached_result, "content-hit"
+
+    with metrics.timed("analysis"):
+        compliance_result = check_compliance(extracted_text, source_urls)  # pass source_urls to check_compliance
+    if cacheable(compliance_result):
+        compliance_cache.put(cache_key, compliance_result, content_hash)
+    return compliance_result, "miss"
+
+def compliance_response(compliance_result, cache_status, timings=None):
+    if timings is not None:
+        compliance_result = {**compliance_result, "timings": timings}
     response = Response(content=json.dumps(compliance_result), media_type="application/json")
+    response.headers["X-Cache"] = cache_status
     response.headers["Access-Control-Allow-Origin"] = "*"
     response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
     response.headers["Access-Control-Allow-Headers"] = "*"
-    response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
-    response.headers["Access-Control-Allow-Headers"] = "*"
-
     return response
-    
+
+def submit_compliance_job(website_url, refresh):
+    try:
+        return compliance_jobs.submit(website_url, refresh)
+    except JobQueueFull as e:
+        logger.warning(f"Rejecting compliance check for {website_url}: {e}")
+        raise HTTPException(status_code=429, detail="Too many compliance checks queued. Try again later.", headers={"Retry-After": "30"})
+
+def job_accepted_response(job):
+    content = job.to_dict()
+    content["status_url"] = f"/check_compliance/jobs/{job.id}"
+    return JSONResponse(status_code=202, content=content, headers={"Location": content["status_url"]})
+
+compliance_jobs = JobManager(
+    run_compliance_check,
+    workers=int(os.environ.get("COMPLIANCE_WORKERS", "2")),
+    max_pending=int(os.environ.get("COMPLIANCE_MAX_PENDING", "50")),
+    retention=float(os.environ.get("COMPLIANCE_JOB_RETENTION", "3600")),
+)
+
+@app.get("/check_compliance")
+async def check_website_compliance(
+    website_url: str = Query(..., title="Website URL", description="URL of the website to check"),
+    refresh: bool = Query(False, description="Bypass the result cache and re-run the full check"),
+    wait_timeout: float = Query(compliance_wait_timeout, ge=0, description="Seconds to wait before returning the job id instead"),
+    timings: bool = Query(False, description="Include a per-stage timing breakdown in the response"),
+):
+    logger.info(f"Checking compliance for: {website_url}")
+
+    if not refresh:
+        started = time.monotonic()
+        # SQLite read behind a lock shared with writer threads: keep it off the event loop.
+        cached_result = await run_in_threadpool(compliance_cache.get_fresh, normalize_site_url(website_url))
+        if cached_result is not None:
+            metrics.count("checks", outcome="hit")
+            elapsed = {"total_seconds": round(time.monotonic() - started, 3), "stages": {}, "counters": {}}
+            return compliance_response(cached_result, "hit", elapsed if timings else None)
+
+    job = submit_compliance_job(website_url, refresh)
+    try:
+        await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job.future)), wait_timeout)
+    except asyncio.TimeoutError:
+        logger.info(f"Compliance check for {website_url} still running after {wait_timeout}s, returning job {job.id}")
+        return job_accepted_response(job)
+
+    if job.status == "failed":
+        raise HTTPException(status_code=job.status_code, detail=job.error)
+    return compliance_response(job.result, job.cache_status, job.timings if timings else None)
+
+@app.post("/check_compliance/jobs")
+def create_compliance_job(
+    website_url: str = Query(..., title="Website URL", description="URL of the website to check"),
+    refresh: bool = Query(False, description="Bypass the result cache and re-run the full check"),
+):
+    job = submit_compliance_job(website_url, refresh)
+    return job_accepted_response(job)
+
+@app.get("/check_compliance/jobs/{job_id}")
+def get_compliance_job(job_id: str):
+    job = compliance_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job id.")
+    return job.to_dict()
+
+def sse_event(event, data, event_id=None):
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_job_progress(job, cursor=0):
+    """Replay the job's progress events from `cursor`, then follow it live and finish with a result or error event."""
+    while True:
+        events, closed = await job.progress.read_async(cursor, 15)
+        for item in events:
+            yield sse_event(item["event"], item["data"], cursor)
+            cursor += 1
+        if closed:
+            break
+        if not events:
+            yield ": keep-alive\n\n"
+
+    if job.status == "done":
+        yield sse_event("result", {"job_id": job.id, "cache_status": job.cache_status, "result": job.result})
+    else:
+        yield sse_event("error", {"job_id": job.id, "status_code": job.status_code, "error": job.error})
+
+def progress_response(events):
+    return StreamingResponse(events, media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+        "Access-Control-Allow-Origin": "*",
+    })
+
+async def cached_result_events(cached_result):
+    yield sse_event("result", {"cache_status": "hit", "result": cached_result})
+
+@app.get("/check_compliance/stream")
+def stream_compliance_check(
+    website_url: str = Query(..., title="Website URL", description="URL of the website to check"),
+    refresh: bool = Query(False, description="Bypass the result cache and re-run the full check"),
+):
+    """Run a check and report its stages as Server-Sent Events; the final "result" event carries the usual JSON."""
+    if not refresh:
+        cached_result = compliance_cache.get_fresh(normalize_site_url(website_url))
+        if cached_result is not None:
+            metrics.count("checks", outcome="hit")
+            return progress_response(cached_result_events(cached_result))
+
+    job = submit_compliance_job(website_url, refresh)
+    return progress_response(stream_job_progress(job))
+
+@app.get("/check_compliance/jobs/{job_id}/events")
+def stream_compliance_job(job_id: str, request: Request):
+    """Progress stream for an existing job; honours Last-Event-ID so clients can reconnect without losing events."""
+    job = compliance_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job id.")
+    last_event_id = request.headers.get("last-event-id", "")
+    cursor = int(last_event_id) + 1 if last_event_id.isdigit() else 0
+    return progress_response(stream_job_progress(job, cursor))
+
+def parse_batch_urls(raw_text):
+    """One URL per line; CSV rows use their first column. Blank lines, comments and header rows are skipped."""
+    urls = []
+    for line in raw_text.splitlines():
+        value = line.split(",", 1)[0].strip().strip('"')
+        if not value or value.startswith("#") or value.lower() in ("url", "website_url", "website"):
+            continue
+        urls.append(value)
+    return urls
+
+async def read_batch_request(request):
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None:
+            raise HTTPException(status_code=400, detail="Upload a file field named 'file'.")
+        urls = parse_batch_urls((await upload.read()).decode("utf-8", errors="replace"))
+        refresh = str(form.get("refresh", "false")).lower() == "true"
+    elif content_type.startswith("text/plain"):
+        urls = parse_batch_urls((await request.body()).decode("utf-8", errors="replace"))
+        refresh = request.query_params.get("refresh", "false").lower() == "true"
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON list of URLs or {\"urls\": [...]}.")
+        if isinstance(body, dict):
+            urls, refresh = body.get("urls") or [], bool(body.get("refresh", False))
+        else:
+            urls, refresh = body if isinstance(body, list) else [], False
+        urls = [str(url).strip() for url in urls if str(url).strip()]
+
+    if not urls:
+        raise HTTPException(status_code=400, detail="No URLs supplied.")
+    if len(urls) > batch_max_urls:
+        raise HTTPException(status_code=413, detail=f"Batches are limited to {batch_max_urls} URLs.")
+    return urls, refresh
+
+async def stream_batch_results(urls, refresh):
+    started = time.monotonic()
+    remaining = list(enumerate(urls))
+    remaining.reverse()
+    pending = {}
+    summary = {"total": len(urls), "succeeded": 0, "failed": 0, "cache_hits": 0, "errors": {}}
+
+    while remaining or pending:
+        while remaining and len(pending) < batch_max_in_flight:
+            index, url = remaining[-1]
+            try:
+                job = compliance_jobs.submit(url, refresh)
+            except JobQueueFull:
+                break
+            remaining.pop()
+            pending[asyncio.wrap_future(job.future)] = (index, time.monotonic())
+
+        if not pending:
+            await asyncio.sleep(1)  # queue full with nothing of ours in flight; wait for capacity
+            continue
+
+        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            index, submitted_at = pending.pop(future)
+            job = future.result()
+            line = {
+                "index": index,
+                "website_url": job.website_url,
+                "status": job.status,
+                "elapsed_seconds": round(time.monotonic() - submitted_at, 3),
+            }
+            if job.status == "done":
+                summary["succeeded"] += 1
+                if job.cache_status != "miss":
+                    summary["cache_hits"] += 1
+                line["cache_status"] = job.cache_status
+                line["result"] = job.result
+            else:
+                summary["failed"] += 1
+                summary["errors"][str(job.status_code)] = summary["errors"].get(str(job.status_code), 0) + 1
+                line["status_code"] = job.status_code
+                line["error"] = job.error
+            yield json.dumps(line) + "\n"
+
+    elapsed = time.monotonic() - started
+    summary["elapsed_seconds"] = round(elapsed, 3)
+    summary["sites_per_minute"] = round(len(urls) / elapsed * 60, 2) if elapsed else 0.0
+    logger.info(f"Batch of {len(urls)} finished: {summary}")
+    yield json.dumps({"summary": summary}) + "\n"
+
+@app.post("/check_compliance/batch")
+async def check_compliance_batch(request: Request):
+    """Check many sites; each result is streamed as an NDJSON line when it finishes, followed by a summary line."""
+    urls, refresh = await read_batch_request(request)
+    logger.info(f"Starting compliance batch of {len(urls)} URLs")
+    return StreamingResponse(stream_batch_results(urls, refresh), media_type="application/x-ndjson")
+
 @app.options("/check_compliance")
 def options_check_compliance():
     """Handle CORS preflight requests explicitly"""
@@ -511,6 +585,194 @@ def options_check_compliance():
     response.headers["Access-Control-Allow-Headers"] = "*"
     return response
 
+def render_monitored_page(url, html):
+    """Chrome render for monitoring; `html` is the body its conditional GET already fetched, so no second HTTP fetch.
+
+    Runs in a crawl worker process when those are enabled, like every other browser load.
+    """
+    reason = browser_required_reason(html, extract_page(html).text) if html else None
+    record_tier("browser", reason or "stored browser tier")
+    if crawl_workers is None:
+        return render_in_browser(url, reason)
+    try:
+        return crawl_workers.render(url)
+    except (CrawlWorkerError, FutureTimeoutError) as e:
+        logger.error(f"Crawl worker render failed for {url}: {e}")
+        return None, "browser"
+
+def store_monitored_verdict(cache_key, result, source_urls):
+    if cacheable(result):
+        compliance_cache.put(cache_key, result, hash_page_texts(source_urls))
+
+compliance_monitor = ComplianceMonitor(
+    MonitorStore(os.environ.get("MONITOR_DB_PATH", "compliance_monitor.sqlite3")),
+    crawl=crawl_site,
+    analyse=check_compliance,
+    render=render_monitored_page,
+    normalize=normalize_site_url,
+    discover=discover_policy_pages if discovery_enabled else None,
+    on_verdict=store_monitored_verdict,
+    interval=float(os.environ.get("MONITOR_INTERVAL_HOURS", "168")) * 3600,  # 0 disables the schedule
+    concurrency=int(os.environ.get("MONITOR_CONCURRENCY", "4")),
+)
+
+def start_monitor_run(keys=None):
+    if compliance_monitor.running():
+        raise HTTPException(status_code=409, detail="A monitoring run is already in progress.")
+    Thread(target=compliance_monitor.run, args=(keys,), name="compliance-monitor-run", daemon=True).start()
+
+@app.post("/monitor/sites")
+async def add_monitored_sites(request: Request):
+    """Register sites for monitoring (same body formats as /check_compliance/batch). Baselines are built on the next run."""
+    urls, _ = await read_batch_request(request)
+    added = compliance_monitor.add_sites(urls)
+    return {"added": added, "already_monitored": len(urls) - added}
+
+@app.get("/monitor/sites")
+def list_monitored_sites():
+    return compliance_monitor.store.sites()
+
+@app.delete("/monitor/sites")
+def remove_monitored_site(website_url: str = Query(..., title="Website URL")):
+    if not compliance_monitor.remove_site(website_url):
+        raise HTTPException(status_code=404, detail="Site is not monitored.")
+    return {"removed": website_url}
+
+@app.get("/monitor/sites/verdict")
+def monitored_site_verdict(website_url: str = Query(..., title="Website URL")):
+    site = compliance_monitor.verdict(website_url)
+    if site is None:
+        raise HTTPException(status_code=404, detail="Site is not monitored.")
+    return site
+
+@app.post("/monitor/run")
+def run_monitoring(
+    website_url: str = Query(None, description="Re-check only this monitored site"),
+    all_sites: bool = Query(False, description="Re-check every site, not just those due"),
+):
+    """Start a monitoring run in the background; results appear under /monitor/runs."""
+    keys = None
+    if website_url:
+        keys = [normalize_site_url(website_url)]
+    elif all_sites:
+        keys = [site["key"] for site in compliance_monitor.store.sites()]
+    start_monitor_run(keys)
+    return JSONResponse(status_code=202, content={"status": "started", "runs_url": "/monitor/runs"})
+
+@app.get("/monitor/runs")
+def list_monitor_runs(limit: int = Query(10, ge=1, le=100)):
+    return compliance_monitor.store.runs(limit)
+
+oncall_directory = OnCallDirectory()
+
+def etag_response(request, payload, etag=None, max_age=0):
+    """JSON (or raw bytes) with an ETag; a matching If-None-Match gets an empty 304 instead."""
+    etag = etag or etag_for(payload)
+    headers = {"ETag": etag, "Cache-Control": f"max-age={max_age}, must-revalidate" if max_age else "no-cache", "Access-Control-Allow-Origin": "*"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    content = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+    return Response(content=content, media_type="application/json", headers=headers)
+
+def oncall_query(query, *args):
+    try:
+        return query(*args)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown calendar. Known: {', '.join(oncall_directory.calendars)}")
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+def parse_oncall_time(value, field):
+    try:
+        return oncall_directory.parse_when(value)
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"{field} must be an ISO 8601 date or datetime.")
+
+@app.get("/oncall/now")
+def oncall_now(request: Request, calendar: str = Query(None, description="Calendar name (default: the first configured)")):
+    """Who is on shift right now. The ETag only changes when the on-call set does."""
+    result = oncall_query(oncall_directory.on_call_at, calendar, oncall_directory.now())
+    stable = {key: value for key, value in result.items() if key != "at"}
+    max_age = 0
+    if result["changes_at"]:
+        max_age = max(0, min(300, int(datetime.fromisoformat(result["changes_at"]).timestamp() - time.time())))
+    return etag_response(request, result, etag=etag_for(stable), max_age=max_age)
+
+@app.get("/oncall/at")
+def oncall_at(request: Request, when: str = Query(..., description="ISO datetime; naive values use ONCALL_TIMEZONE"), calendar: str = Query(None)):
+    return etag_response(request, oncall_query(oncall_directory.on_call_at, calendar, parse_oncall_time(when, "when")))
+
+@app.get("/oncall/range")
+def oncall_range(request: Request, start: str = Query(...), end: str = Query(...), calendar: str = Query(None)):
+    """Every shift overlapping [start, end), at most 92 days."""
+    start_at, end_at = parse_oncall_time(start, "start"), parse_oncall_time(end, "end")
+    if not start_at < end_at <= start_at + timedelta(days=92):
+        raise HTTPException(status_code=422, detail="end must be after start and at most 92 days later.")
+    return etag_response(request, oncall_query(oncall_directory.shifts_between, calendar, start_at, end_at))
+
+@app.get("/oncall/engineers/{engineer}/shifts")
+def oncall_engineer_shifts(request: Request, engineer: str, month: str = Query(..., description="YYYY-MM"), calendar: str = Query(None)):
+    """An engineer's shifts in a month; `engineer` is an email address or full name."""
+    try:
+        result = oncall_query(oncall_directory.engineer_month, calendar, engineer, month)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="month must be YYYY-MM.")
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"No shifts for {engineer} in this calendar.")
+    return etag_response(request, result)
+
+@app.get("/oncall/data")
+def oncall_raw_data(request: Request, calendar: str = Query(None)):
+    """The calendar file as stored, for the existing NOC pages; revalidate with If-None-Match."""
+    raw, etag = oncall_query(lambda name: oncall_directory.calendar(name).raw_data(), calendar)
+    return etag_response(request, raw, etag=etag)
+
+@app.on_event("startup")
+def start_compliance_workers():
+    compliance_jobs.start()
+    compliance_monitor.start()
+
+@app.on_event("shutdown")
+def stop_compliance_workers():
+    compliance_jobs.stop()
+    compliance_monitor.stop()
+
+metrics.register_gauges("compliance_driver_pool", "Chrome driver pool in the API process", driver_pool.stats, ("size", "total", "idle", "leased"))
+metrics.register_gauges("compliance_jobs", "Compliance job queue", compliance_jobs.stats, ("workers", "queued", "running"))
+if crawl_workers is not None:
+    metrics.register_gauges("compliance_crawl_workers", "Crawl worker processes", crawl_workers.stats, ("processes", "alive", "busy", "pending"))
+metrics.register_gauges("compliance_singleflight", "Coalesced site checks", site_checks.stats, ("in_flight",))
+
+@app.get("/ready")
+def readiness():
+    """200 once the warm browsers are up; until then checks still run but may pay for a driver launch."""
+    ready = startup_stats["warm_after_seconds"] is not None
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, **startup_stats})
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Stage histograms, counters and pool gauges in Prometheus text format."""
+    return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/stats")
+def service_stats():
+    return {
+        "startup": startup_stats,
+        "chromedriver_cache": chromedriver_cache_stats(),
+        "driver_pool": driver_pool.stats(),
+        "crawl_workers": crawl_workers.stats() if crawl_workers is not None else None,
+        "fetch_tiers": tier_stats(),
+        "page_readiness": readiness_stats(),
+        "resource_blocking": blocking_stats(),
+        "result_cache": compliance_cache.stats(),
+        "prompt": prompt_stats(),
+        "rule_engine": rule_stats(),
+        "llm": llm_client.stats(),
+        "jobs": compliance_jobs.stats(),
+        "coalescing": site_checks.stats(),
+        "oncall": oncall_directory.stats(),
+    }
+
 @app.get("/debug_chrome")
 def debug_chrome():
     try:
@@ -0,0 +1,186 @@
+import time
+import logging
+import contextvars
+from threading import Lock
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in labels) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.values = {}
+        self.lock = Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple((name, labels.get(name, "")) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=STAGE_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self.series = {}
+        self.lock = Lock()
+
+    def observe(self, value, **labels):
+        key = tuple((name, labels.get(name, "")) for name in self.labelnames)
+        with self.lock:
+            series = self.series.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, series in sorted(self.series.items()):
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    lines.append(f"{self.name}_bucket{format_labels(key + (('le', bound),))} {count}")
+                lines.append(f"{self.name}_bucket{format_labels(key + (('le', '+Inf'),))} {series['count']}")
+                lines.append(f"{self.name}_sum{format_labels(key)} {round(series['sum'], 6)}")
+                lines.append(f"{self.name}_count{format_labels(key)} {series['count']}")
+        return lines
+
+
+stage_seconds = Histogram("compliance_stage_seconds", "Time spent per pipeline stage.", ("stage",))
+COUNTERS = {
+    "pages_fetched": Counter("compliance_pages_fetched_total", "Pages loaded, by fetch tier.", ("tier",)),
+    "page_failures": Counter("compliance_page_failures_total", "Page loads that returned no content, by fetch tier.", ("tier",)),
+    "bot_protection_hits": Counter("compliance_bot_protection_hits_total", "Pages rejected because of bot-protection markers."),
+    "llm_calls": Counter("compliance_llm_calls_total", "Completed OpenAI calls."),
+    "llm_tokens": Counter("compliance_llm_tokens_total", "OpenAI tokens used, by kind.", ("kind",)),
+    "checks": Counter("compliance_checks_total", "Compliance checks, by cache status or failure.", ("outcome",)),
+}
+gauges = []
+
+_current_trace = contextvars.ContextVar("request_trace", default=None)
+
+
+class RequestTrace:
+    """Stage timings and counter increments recorded while handling one check.
+
+    `observations` can be shipped to another process and replayed there with replay().
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.observations = []
+        self.lock = Lock()
+
+    def add(self, observation):
+        with self.lock:
+            self.observations.append(observation)
+
+    def summary(self):
+        stages = {}
+        counts = {}
+        with self.lock:
+            for kind, name, value, labels in self.observations:
+                if kind == "stage":
+                    entry = stages.setdefault(name, {"count": 0, "seconds": 0.0})
+                    entry["count"] += 1
+                    entry["seconds"] += value
+                else:
+                    label = ",".join(str(v) for _, v in labels)
+                    key = f"{name}:{label}" if label else name
+                    counts[key] = counts.get(key, 0) + value
+        for entry in stages.values():
+            entry["seconds"] = round(entry["seconds"], 3)
+        return {"total_seconds": round(time.monotonic() - self.started, 3), "stages": stages, "counters": counts}
+
+
+@contextmanager
+def request_trace():
+    trace = RequestTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def observe_stage(stage, seconds):
+    stage_seconds.observe(seconds, stage=stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(("stage", stage, seconds, ()))
+
+
+@contextmanager
+def timed(stage):
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.monotonic() - started)
+
+
+def count(name, amount=1, **labels):
+    counter = COUNTERS[name]
+    counter.inc(amount, **labels)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(("counter", name, amount, tuple((label, labels.get(label, "")) for label in counter.labelnames)))
+
+
+def replay(observations):
+    """Record observations made in a crawl worker process as if they happened here."""
+    for kind, name, value, labels in observations:
+        if kind == "stage":
+            observe_stage(name, value)
+        else:
+            count(name, value, **dict(labels))
+
+
+def register_gauges(prefix, help_text, stats_fn, keys):
+    """Expose numeric fields of a stats() dict as gauges, read at scrape time."""
+    gauges.append((prefix, help_text, stats_fn, keys))
+
+
+def render_metrics():
+    lines = stage_seconds.render()
+    for counter in COUNTERS.values():
+        lines.extend(counter.render())
+    for prefix, help_text, stats_fn, keys in gauges:
+        try:
+            stats = stats_fn()
+        except Exception as e:
+            logger.warning(f"Could not read {prefix} gauges: {e}")
+            continue
+        if not stats:
+            continue
+        for key in keys:
+            name = f"{prefix}_{key}"
+            lines.append(f"# HELP {name} {help_text} ({key}).")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {stats.get(key, 0)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,477 @@
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import requests
+from threading import Thread, Lock, Event
+from concurrent.futures import ThreadPoolExecutor
+
+from fetcher import http_session, http_timeout, fetch_conditional, browser_required_reason
+from extraction import extract_page
+from prompt_builder import estimate_tokens, page_lines
+from chunked_analysis import SECTIONS, merge_findings
+from progress import progress_listener
+
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def normalize_statement(text):
+    return " ".join(text.lower().split())
+
+
+def flatten_findings(result):
+    """{category: finding} from a compliance result in the usual compliance_analysis shape."""
+    analysis = ((result or {}).get("json") or {}).get("compliance_analysis") or {}
+    return {
+        category: (analysis.get(section) or {}).get(category) or {}
+        for section, categories in SECTIONS.items()
+        for category in categories
+    }
+
+
+def diff_lines(old_text, new_text):
+    """(added, removed) lines between two page texts; order and duplicates don't matter for compliance."""
+    old_lines, new_lines = page_lines(old_text), page_lines(new_text)
+    old_set, new_set = set(old_lines), set(new_lines)
+    added = [line for line in dict.fromkeys(new_lines) if line not in old_set]
+    removed = [line for line in dict.fromkeys(old_lines) if line not in new_set]
+    return added, removed
+
+
+def finding_removed(finding, old_text, new_text):
+    """True if a stored statement disappeared from its page, False if it is still there, None if unknown.
+
+    LLM statements are often lightly paraphrased, so a statement found in neither version is unknown.
+    """
+    statement = normalize_statement(finding.get("statement") or "")
+    if not statement:
+        return None
+    if statement in normalize_statement(new_text):
+        return False
+    if statement in normalize_statement(old_text):
+        return True
+    return None
+
+
+class MonitorStore:
+    """SQLite store of monitored sites: their verdicts, policy pages, validators and page texts."""
+
+    def __init__(self, path):
+        self.lock = Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(
+            "CREATE TABLE IF NOT EXISTS monitored_sites ("
+            "key TEXT PRIMARY KEY, website_url TEXT NOT NULL, verdict TEXT, added_at REAL NOT NULL, "
+            "checked_at REAL, changed_at REAL, last_status TEXT, last_error TEXT);"
+            "CREATE TABLE IF NOT EXISTS monitored_pages ("
+            "site_key TEXT NOT NULL, url TEXT NOT NULL, etag TEXT, last_modified TEXT, text_hash TEXT NOT NULL, "
+            "text BLOB NOT NULL, tier TEXT, fetched_at REAL NOT NULL, PRIMARY KEY (site_key, url));"
+            "CREATE TABLE IF NOT EXISTS monitor_runs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, started_at REAL NOT NULL, finished_at REAL, summary TEXT);"
+        )
+        self.db.commit()
+
+    def add_site(self, key, website_url):
+        with self.lock:
+            cursor = self.db.execute(
+                "INSERT OR IGNORE INTO monitored_sites (key, website_url, added_at) VALUES (?, ?, ?)",
+                (key, website_url, time.time()),
+            )
+            self.db.commit()
+            return cursor.rowcount > 0
+
+    def remove_site(self, key):
+        with self.lock:
+            self.db.execute("DELETE FROM monitored_pages WHERE site_key = ?", (key,))
+            cursor = self.db.execute("DELETE FROM monitored_sites WHERE key = ?", (key,))
+            self.db.commit()
+            return cursor.rowcount > 0
+
+    def sites(self):
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT s.key, s.website_url, s.added_at, s.checked_at, s.changed_at, s.last_status, s.last_error, "
+                "json_extract(s.verdict, '$.json.compliance_analysis.overall_compliance'), COUNT(p.url) "
+                "FROM monitored_sites s LEFT JOIN monitored_pages p ON p.site_key = s.key GROUP BY s.key ORDER BY s.key"
+            ).fetchall()
+        names = ("key", "website_url", "added_at", "checked_at", "changed_at", "last_status", "last_error", "overall_compliance", "pages")
+        return [dict(zip(names, row)) for row in rows]
+
+    def site(self, key):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT website_url, verdict, checked_at, changed_at, last_status FROM monitored_sites WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "key": key,
+            "website_url": row[0],
+            "verdict": json.loads(row[1]) if row[1] else None,
+            "checked_at": row[2],
+            "changed_at": row[3],
+            "last_status": row[4],
+        }
+
+    def due_keys(self, checked_before):
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT key FROM monitored_sites WHERE checked_at IS NULL OR checked_at < ? ORDER BY checked_at IS NOT NULL, checked_at",
+                (checked_before,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def pages(self, key):
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT url, etag, last_modified, text_hash, text, tier FROM monitored_pages WHERE site_key = ?", (key,)
+            ).fetchall()
+        return {
+            url: {"etag": etag, "last_modified": last_modified, "text_hash": digest, "text": zlib.decompress(text).decode("utf-8"), "tier": tier}
+            for url, etag, last_modified, digest, text, tier in rows
+        }
+
+    def save_check(self, key, pages, verdict=None, changed=False, status="ok", error=None, removed_urls=()):
+        """Write page rows and the site's outcome in one transaction. `verdict` None keeps the stored one."""
+        now = time.time()
+        with self.lock:
+            for url, page in pages.items():
+                self.db.execute(
+                    "INSERT OR REPLACE INTO monitored_pages (site_key, url, etag, last_modified, text_hash, text, tier, fetched_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, url, page.get("etag"), page.get("last_modified"), text_hash(page["text"]),
+                     zlib.compress(page["text"].encode("utf-8")), page.get("tier"), now),
+                )
+            for url in removed_urls:
+                self.db.execute("DELETE FROM monitored_pages WHERE site_key = ? AND url = ?", (key, url))
+            if verdict is not None:
+                self.db.execute("UPDATE monitored_sites SET verdict = ? WHERE key = ?", (json.dumps(verdict), key))
+            if changed:
+                self.db.execute("UPDATE monitored_sites SET changed_at = ? WHERE key = ?", (now, key))
+            self.db.execute(
+                "UPDATE monitored_sites SET checked_at = ?, last_status = ?, last_error = ? WHERE key = ?",
+                (now, status, error, key),
+            )
+            self.db.commit()
+
+    def start_run(self):
+        with self.lock:
+            cursor = self.db.execute("INSERT INTO monitor_runs (started_at) VALUES (?)", (time.time(),))
+            self.db.commit()
+            return cursor.lastrowid
+
+    def finish_run(self, run_id, summary):
+        with self.lock:
+            self.db.execute(
+                "UPDATE monitor_runs SET finished_at = ?, summary = ? WHERE id = ?", (time.time(), json.dumps(summary), run_id)
+            )
+            self.db.commit()
+
+    def runs(self, limit=10):
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT id, started_at, finished_at, summary FROM monitor_runs ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [
+            {"run_id": run_id, "started_at": started_at, "finished_at": finished_at, "summary": json.loads(summary) if summary else None}
+            for run_id, started_at, finished_at, summary in rows
+        ]
+
+
+class ComplianceMonitor:
+    """Periodic re-verification of monitored sites that only re-analyses what changed.
+
+    The first check of a site is a full crawl and analysis (the baseline). Later checks
+    re-fetch the stored policy pages with conditional GETs, render in Chrome only pages
+    that need it, and send just the added lines of changed pages to `analyse`; the partial
+    verdict is merged into the stored one. A full re-analysis runs instead when a stored
+    finding may have been removed and that can't be confirmed from the page text, or when
+    the added lines bear on a category that is currently found.
+
+    `crawl(website_url)` -> (text, source_urls), `analyse(text, source_urls)` -> result,
+    `render(url, html)` -> (document or None, tier) renders a page whose body was just fetched,
+    `discover(base_url)` -> [urls],
+    `on_verdict(key, result, source_urls)` is called after every successful check.
+    """
+
+    def __init__(self, store, crawl, analyse, render, normalize, discover=None, on_verdict=None,
+                 interval=7 * 86400, concurrency=4):
+        self.store = store
+        self.crawl = crawl
+        self.analyse = analyse
+        self.render = render
+        self.normalize = normalize
+        self.discover = discover
+        self.on_verdict = on_verdict
+        self.interval = interval
+        self.concurrency = concurrency
+        self.run_lock = Lock()
+        self.stop_event = Event()
+        self.thread = None
+
+    def add_sites(self, urls):
+        added = 0
+        for url in urls:
+            added += self.store.add_site(self.normalize(url), url)
+        return added
+
+    def remove_site(self, website_url):
+        return self.store.remove_site(self.normalize(website_url))
+
+    def verdict(self, website_url):
+        return self.store.site(self.normalize(website_url))
+
+    def start(self):
+        if self.interval <= 0:
+            logger.info("Compliance monitoring schedule disabled.")
+            return
+        self.thread = Thread(target=self._schedule, name="compliance-monitor", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def running(self):
+        return self.run_lock.locked()
+
+    def run(self, keys=None):
+        """Check the given site keys (default: every site not checked within `interval`) and record a run summary."""
+        if not self.run_lock.acquire(blocking=False):
+            return None
+        try:
+            keys = keys if keys is not None else self.store.due_keys(time.time() - self.interval)
+            run_id = self.store.start_run()
+            started = time.monotonic()
+            with ThreadPoolExecutor(max_workers=max(1, self.concurrency), thread_name_prefix="monitor") as executor:
+                reports = list(executor.map(self._check_safely, keys))
+            summary = self.summarize(reports, time.monotonic() - started)
+            self.store.finish_run(run_id, summary)
+            logger.info(
+                f"Monitoring run {run_id}: {summary['sites']} sites, {len(summary['changed_sites'])} changed, "
+                f"{summary['pages_not_modified']} pages not modified, ~{summary['tokens_saved']} tokens saved"
+            )
+            return {"run_id": run_id, **summary}
+        finally:
+            self.run_lock.release()
+
+    def check_site(self, key):
+        site = self.store.site(key)
+        if site is None:
+            raise KeyError(key)
+        pages = self.store.pages(key)
+        if site["verdict"] is None or not pages:
+            return self._baseline(site)
+        return self._recheck(site, pages)
+
+    def _check_safely(self, key):
+        try:
+            return self.check_site(key)
+        except Exception as e:
+            error = getattr(e, "detail", None) or str(e)
+            logger.error(f"Monitoring check failed for {key}: {error}")
+            self.store.save_check(key, {}, status="error", error=error)
+            return {"key": key, "mode": "error", "error": error}
+
+    def _baseline(self, site):
+        tiers = {}
+
+        def record_tier(event, data):
+            if event == "page_loaded":
+                tiers[data["url"]] = data["tier"]
+
+        with progress_listener(record_tier):
+            text, source_urls = self.crawl(site["website_url"])
+        if not text:
+            raise RuntimeError("Failed to extract text from website.")
+        result = self.analyse(text, source_urls)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+
+        pages = {}
+        for url, page_text in source_urls.items():
+            etag, last_modified = self._validators(url)
+            pages[url] = {"text": page_text, "etag": etag, "last_modified": last_modified, "tier": tiers.get(url)}
+        self.store.save_check(site["key"], pages, verdict=result, changed=True)
+        if self.on_verdict:
+            self.on_verdict(site["key"], result, source_urls)
+        tokens = estimate_tokens(text)
+        return {
+            "key": site["key"], "mode": "baseline", "changed": True, "verdict_changed": True,
+            "pages_checked": len(pages), "tokens_sent": tokens, "tokens_full": tokens,
+        }
+
+    def _validators(self, url):
+        try:
+            response = http_session.head(url, allow_redirects=True, timeout=http_timeout)
+            return response.headers.get("ETag"), response.headers.get("Last-Modified")
+        except requests.exceptions.RequestException:
+            return None, None
+
+    def _recheck(self, site, pages):
+        key = site["key"]
+        report = {
+            "key": key, "mode": "incremental", "pages_checked": 0, "pages_not_modified": 0, "pages_unchanged": 0,
+            "pages_changed": 0, "pages_new": 0, "pages_removed": 0, "pages_unreachable": 0, "rendered": 0,
+            "renders_avoided": 0, "tokens_sent": 0,
+        }
+        urls = list(pages)
+        if self.discover:
+            try:
+                urls += [url for url in self.discover(site["website_url"]) if url not in pages]
+            except Exception as e:
+                logger.warning(f"Policy discovery failed for {key}: {e}")
+
+        current, updated, changed, removed = {}, {}, {}, []
+        for url in urls:
+            stored = pages.get(url)
+            report["pages_checked"] += 1
+            status, html, etag, last_modified = fetch_conditional(
+                url, stored and stored["etag"], stored and stored["last_modified"]
+            )
+            if status == 304:
+                report["pages_not_modified"] += 1
+                report["renders_avoided"] += stored["tier"] == "browser"
+                current[url] = stored["text"]
+                continue
+
+            tier = "http"
+            if status == 200 and html:
+                document = extract_page(html)
+                if (stored and stored["tier"] == "browser") or browser_required_reason(html, document.text):
+                    document, tier = self.render(url, html)
+                    report["rendered"] += 1
+                new_text = document.text if document is not None else None
+            elif status in (404, 410) and stored:
+                new_text = ""
+            else:
+                new_text = None
+
+            if new_text is None:
+                # Can't tell whether it changed; keep what we have and try again next run.
+                report["pages_unreachable"] += 1
+                if stored:
+                    current[url] = stored["text"]
+                continue
+
+            old_text = stored["text"] if stored else ""
+            if stored and text_hash(new_text) == stored["text_hash"]:
+                report["pages_unchanged"] += 1
+                report["renders_avoided"] += stored["tier"] == "browser" and tier == "http"
+                updated[url] = {"text": new_text, "etag": etag, "last_modified": last_modified, "tier": stored["tier"]}
+                current[url] = new_text
+                continue
+
+            changed[url] = (old_text, new_text)
+            if not new_text:
+                report["pages_removed"] += 1
+                removed.append(url)
+                continue
+            report["pages_new" if stored is None else "pages_changed"] += 1
+            updated[url] = {"text": new_text, "etag": etag, "last_modified": last_modified, "tier": tier}
+            current[url] = new_text
+
+        report["tokens_full"] = estimate_tokens("\n".join(current.values()))
+        if not changed:
+            self.store.save_check(key, updated)
+            if self.on_verdict:
+                self.on_verdict(key, site["verdict"], current)
+            return {**report, "changed": False, "verdict_changed": False}
+
+        result, report["analysis"], report["tokens_sent"] = self._reanalyse(site["verdict"], current, changed)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+
+        before = flatten_findings(site["verdict"])
+        after = flatten_findings(result)
+        changed_categories = [category for category in after if (before.get(category) or {}).get("status") != after[category].get("status")]
+        self.store.save_check(key, updated, verdict=result, changed=True, removed_urls=removed)
+        if self.on_verdict:
+            self.on_verdict(key, result, current)
+        return {**report, "changed": True, "verdict_changed": bool(changed_categories), "changed_categories": changed_categories}
+
+    def _reanalyse(self, verdict, current, changed):
+        """Returns (result, "diff" | "full", tokens sent)."""
+        stored = flatten_findings(verdict)
+        invalidated = {}
+        for category, finding in stored.items():
+            if finding.get("status") != "found":
+                continue
+            if finding.get("url") in changed:
+                old_text, new_text = changed[finding["url"]]
+                removed = finding_removed(finding, old_text, new_text)
+            elif finding.get("url") in current:
+                continue
+            else:
+                removed = None if any(diff_lines(old, new)[1] for old, new in changed.values()) else False
+            if removed is None:
+                return self._reanalyse_fully(current, "A stored finding may have been edited")
+            if removed:
+                invalidated[category] = finding["url"]
+
+        diff_sources = {}
+        for url, (old_text, new_text) in changed.items():
+            added, _ = diff_lines(old_text, new_text)
+            if added:
+                diff_sources[url] = "\n".join(added)
+        partial = {}
+        tokens = 0
+        if diff_sources:
+            diff_text = "\n".join(diff_sources.values())
+            tokens = estimate_tokens(diff_text)
+            partial = self.analyse(diff_text, diff_sources)
+            if "error" in partial:
+                return partial, "diff", tokens
+            # merge_findings keeps an earlier "found", so added lines can never overturn a stored finding
+            # (e.g. a new "we may share your number" next to the old no-sharing sentence). Judge those on the whole site.
+            contested = [
+                category for category, finding in flatten_findings(partial).items()
+                if stored[category].get("status") == "found" and category not in invalidated
+                and (finding.get("status") == "found" or finding.get("detected_candidates"))
+            ]
+            if contested:
+                return self._reanalyse_fully(current, f"Added lines touch found categories {contested}")
+
+        base = dict(stored)
+        for category, url in invalidated.items():
+            base[category] = {**stored[category], "status": "not_found", "statement": "", "url": "",
+                              "rejection_reason": f"Statement no longer present on {url}"}
+        result = merge_findings([base, flatten_findings(partial)])
+        result["analysis_source"] = "incremental"
+        return result, "diff", tokens
+
+    def _reanalyse_fully(self, current, reason):
+        full_text = "\n".join(current.values())
+        logger.info(f"{reason}; re-analysing the whole site.")
+        return self.analyse(full_text, current), "full", estimate_tokens(full_text)
+
+    def summarize(self, reports, elapsed):
+        totals = {name: 0 for name in (
+            "pages_checked", "pages_not_modified", "pages_unchanged", "pages_changed", "pages_new", "pages_removed",
+            "pages_unreachable", "rendered", "renders_avoided", "tokens_sent", "tokens_full",
+        )}
+        for report in reports:
+            for name in totals:
+                totals[name] += report.get(name, 0)
+        return {
+            "sites": len(reports),
+            "baselines": sum(1 for report in reports if report["mode"] == "baseline"),
+            "changed_sites": [report["key"] for report in reports if report.get("changed") and report["mode"] != "baseline"],
+            "verdict_changed_sites": [report["key"] for report in reports if report.get("verdict_changed") and report["mode"] != "baseline"],
+            "errors": {report["key"]: report["error"] for report in reports if report["mode"] == "error"},
+            "llm_analyses": {mode: sum(1 for report in reports if report.get("analysis") == mode) for mode in ("diff", "full")},
+            **totals,
+            "tokens_saved": totals["tokens_full"] - totals["tokens_sent"],
+            "elapsed_seconds": round(elapsed, 3),
+        }
+
+    def _schedule(self):
+        poll = min(3600, max(60, self.interval / 24))
+        while not self.stop_event.wait(poll):
+            if self.store.due_keys(time.time() - self.interval):
+                self.run()
@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from threading import Lock
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+calendar_files = os.environ.get("ONCALL_CALENDARS", "noc=noc-calendar-data.json,rotation=rotation-data.json")
+calendar_timezone = os.environ.get("ONCALL_TIMEZONE", "UTC")  # zone the schedule's HH:MM strings are written in
+reload_check_interval = float(os.environ.get("ONCALL_RELOAD_CHECK_SECONDS", "2"))  # how often the files are stat()ed
+
+DAY_KEYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")  # date.weekday() order
+SHIFT_ORDER = {"night": 0, "early": 1, "day": 2, "evening": 3}
+
+
+def parse_hours(hours):
+    """"HH:MM-HH:MM" -> (start, end) times, or None for "OFF". An end at or before the start is the next day."""
+    if not hours or hours.strip().upper() == "OFF":
+        return None
+    start, end = hours.split("-")
+    return dtime.fromisoformat(start.strip()), dtime.fromisoformat(end.strip())
+
+
+class ShiftIndex:
+    """Every shift of one calendar as a concrete interval, sorted by start.
+
+    Shifts overlap (the night shift runs into the early one), so a point query bisects for
+    the shifts that started within `max_duration` before it and keeps those not yet over.
+    """
+
+    def __init__(self, rotation, tz):
+        shifts = []
+        for date_key, assignments in rotation.items():
+            day = date.fromisoformat(date_key)
+            for shift_name, engineer in assignments.items():
+                hours = (engineer.get("schedule") or {}).get(DAY_KEYS[day.weekday()])
+                try:
+                    interval = parse_hours(hours)
+                except ValueError:
+                    logger.warning(f"Skipping {date_key} {shift_name}: unreadable hours {hours!r}")
+                    continue
+                if interval is None:
+                    continue
+                start = datetime.combine(day, interval[0], tzinfo=tz)
+                end = datetime.combine(day, interval[1], tzinfo=tz)
+                if end <= start:
+                    end = datetime.combine(day + timedelta(days=1), interval[1], tzinfo=tz)
+                shifts.append({
+                    "date": date_key,
+                    "shift": engineer.get("shift", shift_name),
+                    "name": engineer.get("name", ""),
+                    "email": engineer.get("email", ""),
+                    "hours": hours,
+                    "start": start.isoformat(),
+                    "end": end.isoformat(),
+                    "start_ts": start.timestamp(),
+                    "end_ts": end.timestamp(),
+                })
+        shifts.sort(key=lambda s: (s["start_ts"], SHIFT_ORDER.get(s["shift"], 99)))
+        self.shifts = shifts
+        self.starts = [s["start_ts"] for s in shifts]
+        self.max_duration = max((s["end_ts"] - s["start_ts"] for s in shifts), default=0)
+
+        self.engineers = {}  # lower-cased email and name -> (starts, shifts)
+        for shift in shifts:
+            for key in {shift["email"].lower(), shift["name"].lower()} - {""}:
+                starts, entries = self.engineers.setdefault(key, ([], []))
+                starts.append(shift["start_ts"])
+                entries.append(shift)
+
+    def overlapping(self, starts, shifts, start_ts, end_ts):
+        lo = bisect_left(starts, start_ts - self.max_duration)
+        hi = bisect_left(starts, end_ts)
+        return [s for s in shifts[lo:hi] if s["end_ts"] > start_ts]
+
+    def at(self, ts):
+        lo = bisect_left(self.starts, ts - self.max_duration)
+        hi = bisect_right(self.starts, ts)
+        return [s for s in self.shifts[lo:hi] if s["end_ts"] > ts]
+
+    def next_change(self, ts, current):
+        """When the on-call set next changes after `ts`: a current shift ending or the next one starting."""
+        upcoming = bisect_right(self.starts, ts)
+        candidates = [s["end_ts"] for s in current]
+        if upcoming < len(self.starts):
+            candidates.append(self.starts[upcoming])
+        return min(candidates, default=None)
+
+    def between(self, start_ts, end_ts):
+        return self.overlapping(self.starts, self.shifts, start_ts, end_ts)
+
+    def for_engineer(self, engineer, start_ts, end_ts):
+        entry = self.engineers.get(engineer.strip().lower())
+        if entry is None:
+            return None
+        return self.overlapping(entry[0], entry[1], start_ts, end_ts)
+
+
+class OnCallCalendar:
+    """One rotation JSON file, parsed into a ShiftIndex and re-parsed when the file changes on disk.
+
+    Accepts both layouts in the repo: {"rotation": {date: ...}, "engineers": [...]} and a bare
+    {date: ...} mapping. A file that fails to parse keeps the previous index in service.
+    """
+
+    def __init__(self, name, path, tz):
+        self.name = name
+        self.path = path
+        self.tz = tz
+        self.lock = Lock()
+        self.index = None
+        self.raw = b""
+        self.etag = None
+        self.signature = None
+        self.checked_at = 0.0
+        self.counters = {"reloads": 0, "reload_errors": 0, "last_reload_ms": 0.0}
+        self.last_error = None
+
+    def current(self):
+        """The up-to-date index; stat()s the file at most every `reload_check_interval` seconds."""
+        now = time.monotonic()
+        if self.index is not None and now - self.checked_at < reload_check_interval:
+            return self.index
+        with self.lock:
+            if self.index is None or now - self.checked_at >= reload_check_interval:
+                self.checked_at = now
+                self.reload_if_changed()
+        if self.index is None:
+            raise FileNotFoundError(f"On-call calendar {self.name} could not be loaded: {self.last_error}")
+        return self.index
+
+    def reload_if_changed(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            self.last_error = str(e)
+            return
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self.signature:
+            return
+        started = time.monotonic()
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            data = json.loads(raw)
+            rotation = data.get("rotation", data) if isinstance(data, dict) else {}
+            index = ShiftIndex(rotation, self.tz)
+        except (OSError, ValueError, AttributeError, TypeError) as e:
+            self.counters["reload_errors"] += 1
+            self.last_error = str(e)
+            self.signature = signature  # don't re-parse the same broken file on every request
+            logger.error(f"Keeping the previous {self.name} on-call index, {self.path} failed to load: {e}")
+            return
+        self.index, self.raw, self.signature, self.last_error = index, raw, signature, None
+        self.etag = f'"{hashlib.sha256(raw).hexdigest()[:32]}"'
+        self.counters["reloads"] += 1
+        self.counters["last_reload_ms"] = round((time.monotonic() - started) * 1000, 2)
+        logger.info(f"Loaded {len(index.shifts)} {self.name} shifts from {self.path} in {self.counters['last_reload_ms']}ms")
+
+    def raw_data(self):
+        self.current()
+        return self.raw, self.etag
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "shifts": len(self.index.shifts) if self.index else 0,
+            "etag": self.etag,
+            "last_error": self.last_error,
+            **self.counters,
+        }
+
+
+def public_shift(shift):
+    return {key: value for key, value in shift.items() if not key.endswith("_ts")}
+
+
+class OnCallDirectory:
+    """The configured calendars by name, with the query helpers the /oncall endpoints use."""
+
+    def __init__(self, spec=calendar_files, tz_name=calendar_timezone, base_dir=None):
+        self.tz = ZoneInfo(tz_name)
+        base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+        self.calendars = {}
+        for entry in filter(None, (part.strip() for part in spec.split(","))):
+            name, _, path = entry.partition("=")
+            path = path.strip() or name.strip()
+            self.calendars[name.strip()] = OnCallCalendar(name.strip(), os.path.join(base_dir, path), self.tz)
+        self.default = next(iter(self.calendars), None)
+
+    def calendar(self, name=None):
+        calendar = self.calendars.get(name or self.default)
+        if calendar is None:
+            raise KeyError(name)
+        return calendar
+
+    def parse_when(self, value):
+        """ISO date/datetime (naive values are in the calendar's timezone) -> aware datetime."""
+        moment = datetime.fromisoformat(value)
+        return moment.replace(tzinfo=self.tz) if moment.tzinfo is None else moment
+
+    def month_bounds(self, month):
+        first = datetime.strptime(month, "%Y-%m").replace(tzinfo=self.tz)
+        following = (first + timedelta(days=32)).replace(day=1)
+        return first, following
+
+    def on_call_at(self, name, moment):
+        index = self.calendar(name).current()
+        shifts = index.at(moment.timestamp())
+        changes_at = index.next_change(moment.timestamp(), shifts)
+        return {
+            "calendar": self.calendar(name).name,
+            "at": moment.isoformat(),
+            "on_call": [public_shift(s) for s in shifts],
+            "changes_at": datetime.fromtimestamp(changes_at, self.tz).isoformat() if changes_at is not None else None,
+        }
+
+    def shifts_between(self, name, start, end):
+        shifts = self.calendar(name).current().between(start.timestamp(), end.timestamp())
+        return {"calendar": self.calendar(name).name, "start": start.isoformat(), "end": end.isoformat(), "shifts": [public_shift(s) for s in shifts]}
+
+    def engineer_month(self, name, engineer, month):
+        start, end = self.month_bounds(month)
+        shifts = self.calendar(name).current().for_engineer(engineer, start.timestamp(), end.timestamp())
+        if shifts is None:
+            return None
+        return {"calendar": self.calendar(name).name, "engineer": engineer, "month": month, "shifts": [public_shift(s) for s in shifts]}
+
+    def now(self):
+        return datetime.now(timezone.utc).astimezone(self.tz)
+
+    def stats(self):
+        return {"timezone": str(self.tz), "calendars": {name: calendar.stats() for name, calendar in self.calendars.items()}}
+
+
+def etag_for(payload):
+    return f'"{hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match, etag):
+    """RFC 7232 weak comparison of an If-None-Match header against our ETag."""
+    if not if_none_match or not etag:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
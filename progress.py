@@ -0,0 +1,89 @@
+import time
+import asyncio
+import logging
+import contextvars
+from threading import Condition
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_listener = contextvars.ContextVar("progress_listener", default=None)
+
+
+@contextmanager
+def progress_listener(callback):
+    """Send every emit() made in this context (and contexts copied from it) to `callback(event, data)`."""
+    token = _listener.set(callback)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+
+def current_listener():
+    return _listener.get()
+
+
+def emit(event, **data):
+    """Report a progress event for the check running in this context. A no-op outside of one."""
+    callback = _listener.get()
+    if callback is None:
+        return
+    try:
+        callback(event, data)
+    except Exception as e:
+        logger.warning(f"Progress listener failed on {event}: {e}")
+
+
+class ProgressLog:
+    """Append-only event history for one job; readers wait for events past their cursor."""
+
+    def __init__(self):
+        self.events = []
+        self.closed = False
+        self.cond = Condition()
+        self.waiters = []  # (loop, asyncio.Event) of async readers
+
+    def publish(self, event, data):
+        with self.cond:
+            self.events.append({"event": event, "data": {**data, "at": round(time.time(), 3)}})
+            self.cond.notify_all()
+            self._wake_async_readers()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+            self._wake_async_readers()
+
+    def _wake_async_readers(self):
+        for loop, event in self.waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # loop already closed
+        self.waiters = []
+
+    def read(self, cursor, timeout):
+        """Events after `cursor` (waiting up to `timeout` for one), and whether the log is closed."""
+        with self.cond:
+            if cursor >= len(self.events) and not self.closed:
+                self.cond.wait(timeout)
+            return self.events[cursor:], self.closed
+
+    async def read_async(self, cursor, timeout):
+        """read() for event-loop callers: waits on an asyncio.Event set by publish(), holding no thread."""
+        event = asyncio.Event()
+        with self.cond:
+            if cursor < len(self.events) or self.closed:
+                return self.events[cursor:], self.closed
+            self.waiters.append((asyncio.get_running_loop(), event))
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self.cond:
+                self.waiters = [waiter for waiter in self.waiters if waiter[1] is not event]
+        with self.cond:
+            return self.events[cursor:], self.closed
@@ -0,0 +1,104 @@
+import math
+import json
+import logging
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+_token_encoding = None
+_encoding_loaded = False
+_encoding_lock = Lock()
+
+
+def token_encoding():
+    """tiktoken's encoder, loaded on first use (it may fetch its BPE file); None when unavailable."""
+    global _token_encoding, _encoding_loaded
+    if _encoding_loaded:
+        return _token_encoding
+    with _encoding_lock:
+        if not _encoding_loaded:
+            try:
+                import tiktoken
+                _token_encoding = tiktoken.get_encoding("o200k_base")
+            except Exception:
+                _token_encoding = None
+            _encoding_loaded = True
+    return _token_encoding
+
+SHARED_HEADER = "=== SHARED ACROSS PAGES ==="
+PAGE_HEADER = "=== PAGE: {url} ==="
+
+prompt_totals = {"prompts": 0, "tokens_before": 0, "tokens_after": 0}
+stats_lock = Lock()
+
+
+def estimate_tokens(text):
+    encoding = token_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def page_lines(page_text):
+    return [line.strip() for line in page_text.splitlines() if line.strip()]
+
+
+def find_shared_lines(pages, shared_ratio=0.6):
+    """Lines that appear on at least shared_ratio of the pages (and on at least two of them)."""
+    if len(pages) < 2:
+        return set()
+    seen_on = {}
+    for lines in pages.values():
+        for line in set(lines):
+            seen_on[line] = seen_on.get(line, 0) + 1
+    threshold = max(2, math.ceil(shared_ratio * len(pages)))
+    return {line for line, count in seen_on.items() if count >= threshold}
+
+
+def build_page_corpus(source_urls, shared_ratio=0.6):
+    """Render page texts for the prompt: each page once, tagged with its URL, with cross-page boilerplate emitted once.
+
+    Returns (corpus, stats).
+    """
+    pages = {url: page_lines(text) for url, text in source_urls.items()}
+    shared = find_shared_lines(pages, shared_ratio)
+
+    sections = []
+    if shared:
+        emitted = set()
+        shared_block = []
+        for lines in pages.values():
+            for line in lines:
+                if line in shared and line not in emitted:
+                    emitted.add(line)
+                    shared_block.append(line)
+        sections.append(SHARED_HEADER + "\n" + "\n".join(shared_block))
+
+    for url, lines in pages.items():
+        body = "\n".join(line for line in lines if line not in shared)
+        sections.append(PAGE_HEADER.format(url=url) + "\n" + body)
+
+    corpus = "\n\n".join(sections)
+    naive_tokens = estimate_tokens(json.dumps(source_urls) + "\n".join(source_urls.values()))
+    corpus_tokens = estimate_tokens(corpus)
+    stats = {
+        "pages": len(pages),
+        "shared_lines": len(shared),
+        "tokens_before": naive_tokens,
+        "tokens_after": corpus_tokens,
+    }
+    with stats_lock:
+        prompt_totals["prompts"] += 1
+        prompt_totals["tokens_before"] += naive_tokens
+        prompt_totals["tokens_after"] += corpus_tokens
+    logger.info(f"Prompt corpus: {len(pages)} pages, {len(shared)} shared lines, ~{naive_tokens} -> ~{corpus_tokens} tokens")
+    return corpus, stats
+
+
+def prompt_stats():
+    with stats_lock:
+        before = prompt_totals["tokens_before"]
+        return {
+            **prompt_totals,
+            "reduction": round(1 - prompt_totals["tokens_after"] / before, 3) if before else 0.0,
+        }
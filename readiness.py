@@ -0,0 +1,158 @@
+import os
+import time
+import logging
+from threading import Lock
+
+from resource_blocking import read_performance_log, cdp_events
+
+logger = logging.getLogger(__name__)
+
+page_ready_max_wait = float(os.environ.get("PAGE_READY_MAX_WAIT", "15"))
+page_quiet_ms = int(os.environ.get("PAGE_QUIET_MS", "500"))
+lazy_scroll_rounds = int(os.environ.get("PAGE_LAZY_SCROLL_ROUNDS", "3"))
+
+# Injected through CDP before any page script runs: records the time of the last DOM mutation.
+# It also counts fetch/XHR requests in flight, which is used only when the performance log (and so
+# CDP Network events) is unavailable: it cannot see requests made before it ran or from workers.
+READINESS_PROBE_JS = """
+(function () {
+    if (window.__readiness) { return; }
+    var state = {lastChange: performance.now(), inflight: 0};
+    window.__readiness = state;
+    var touch = function () { state.lastChange = performance.now(); };
+    new MutationObserver(touch).observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function () {
+            state.inflight++;
+            touch();
+            return originalFetch.apply(this, arguments).finally(function () { state.inflight--; touch(); });
+        };
+    }
+    var originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        state.inflight++;
+        touch();
+        this.addEventListener("loadend", function () { state.inflight--; touch(); });
+        return originalSend.apply(this, arguments);
+    };
+})();
+"""
+
+READINESS_STATE_JS = """
+var r = window.__readiness;
+return {
+    readyState: document.readyState,
+    quietMs: r ? performance.now() - r.lastChange : null,
+    inflight: r ? r.inflight : 0,
+    height: document.body ? document.body.scrollHeight : 0
+};
+"""
+
+# Scrolling counts as a change so lazy loaders get a full quiet period to react.
+SCROLL_JS = """
+window.scrollTo(0, document.body ? document.body.scrollHeight : 0);
+if (window.__readiness) { window.__readiness.lastChange = performance.now(); }
+"""
+
+settle_stats = {"pages": 0, "total_seconds": 0.0, "max_seconds": 0.0, "ceiling_hits": 0}
+stats_lock = Lock()
+
+
+def install_readiness_probe(driver):
+    """Register the probe to run on every new document in this driver."""
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": READINESS_PROBE_JS})
+    except Exception as e:
+        logger.warning(f"Could not install readiness probe via CDP: {e}")
+
+
+class NetworkActivity:
+    """Requests in flight for the current page, from CDP Network.requestWillBeSent/loadingFinished/loadingFailed.
+
+    The events come from Chrome's performance log, which records everything the page target does from
+    navigation on, so requests made before the readiness probe ran and those from dedicated workers and
+    same-process iframes are counted. Out-of-process iframes report on their own targets and are not seen.
+    """
+
+    def __init__(self):
+        self.inflight = set()
+        self.last_activity = time.monotonic()
+
+    def update(self, entries):
+        for method, params in cdp_events(entries):
+            if method == "Network.requestWillBeSent":
+                if params.get("type") == "EventSource":
+                    continue  # open for the life of the page
+                self.inflight.add(params.get("requestId"))
+            elif method in ("Network.loadingFinished", "Network.loadingFailed"):
+                self.inflight.discard(params.get("requestId"))
+            else:
+                continue
+            self.last_activity = time.monotonic()
+
+
+def wait_for_quiet(driver, deadline, quiet_ms=page_quiet_ms, poll_interval=0.1, network=None):
+    """Poll until the document is loaded, no requests are in flight and the DOM and network have been quiet for quiet_ms.
+
+    In-flight requests come from `network` (CDP events) when given, otherwise from the injected probe's fetch/XHR count.
+    """
+    while True:
+        state = driver.execute_script(READINESS_STATE_JS) or {}
+        if network is not None:
+            entries = read_performance_log(driver)
+            if entries is None:
+                network = None
+            else:
+                network.update(entries)
+                state["inflight"] = len(network.inflight)
+                if state.get("quietMs") is not None:
+                    state["quietMs"] = min(state["quietMs"], (time.monotonic() - network.last_activity) * 1000)
+        if state.get("quietMs") is None:
+            # Probe missing (CDP unavailable); start observing from now.
+            driver.execute_script(READINESS_PROBE_JS)
+        elif state.get("readyState") == "complete" and state.get("inflight", 0) <= 0 and state["quietMs"] >= quiet_ms:
+            return True, state
+        if time.monotonic() >= deadline:
+            return False, state
+        time.sleep(poll_interval)
+
+
+def wait_for_page_ready(driver, max_wait=page_ready_max_wait, quiet_ms=page_quiet_ms):
+    """Wait until the page is stable, scrolling to pull in lazy content.
+
+    Returns (seconds taken, settled); settled is False when max_wait was reached first.
+    """
+    started = time.monotonic()
+    deadline = started + max_wait
+    network = NetworkActivity()
+
+    settled, state = wait_for_quiet(driver, deadline, quiet_ms, network=network)
+    for _ in range(lazy_scroll_rounds):
+        if not settled:
+            break
+        height = state.get("height", 0)
+        driver.execute_script(SCROLL_JS)
+        settled, state = wait_for_quiet(driver, deadline, quiet_ms, network=network)
+        if state.get("height", 0) <= height:
+            break
+
+    elapsed = time.monotonic() - started
+    with stats_lock:
+        settle_stats["pages"] += 1
+        settle_stats["total_seconds"] += elapsed
+        settle_stats["max_seconds"] = max(settle_stats["max_seconds"], elapsed)
+        if not settled:
+            settle_stats["ceiling_hits"] += 1
+    return elapsed, settled
+
+
+def readiness_stats():
+    with stats_lock:
+        pages = settle_stats["pages"]
+        return {
+            "pages": pages,
+            "avg_settle_seconds": round(settle_stats["total_seconds"] / pages, 3) if pages else 0.0,
+            "max_settle_seconds": round(settle_stats["max_seconds"], 3),
+            "ceiling_hits": settle_stats["ceiling_hits"],
+        }
@@ -0,0 +1,167 @@
+import os
+import json
+import logging
+from threading import Lock
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# URL patterns (Network.setBlockedURLs wildcard syntax) for each resource type we can skip.
+BLOCK_PATTERNS = {
+    "image": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico", "*.bmp"],
+    "font": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "media": ["*.mp4", "*.webm", "*.mov", "*.m4v", "*.mp3", "*.m4a", "*.ogg", "*.wav", "*.m3u8"],
+    "stylesheet": ["*.css"],
+    "tracker": [
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+        "*adservice.google.*", "*facebook.net*", "*connect.facebook.com*", "*hotjar.com*", "*clarity.ms*",
+        "*segment.io*", "*segment.com/analytics*", "*mixpanel.com*", "*fullstory.com*", "*adsrvr.org*",
+        "*taboola.com*", "*outbrain.com*", "*criteo.com*", "*quantserve.com*", "*scorecardresearch.com*",
+        "*analytics.tiktok.com*", "*bat.bing.com*", "*snap.licdn.com*",
+    ],
+}
+
+# Rough average transfer size per blocked request, used only to estimate bytes saved.
+TYPICAL_BYTES = {"image": 60_000, "font": 35_000, "media": 500_000, "stylesheet": 40_000, "tracker": 45_000, "other": 20_000}
+
+# CDP resource types reported by Network.requestWillBeSent, mapped onto the types above.
+CDP_TYPES = {"Image": "image", "Font": "font", "Media": "media", "Stylesheet": "stylesheet"}
+
+
+def env_list(name, default=""):
+    return [item.strip() for item in os.environ.get(name, default).split(",") if item.strip()]
+
+
+blocked_types = env_list("BLOCK_RESOURCE_TYPES", "image,font,media,tracker")
+allowed_patterns = set(env_list("BLOCK_ALLOW_PATTERNS"))
+extra_patterns = env_list("BLOCK_EXTRA_PATTERNS")
+bypass_domains = env_list("BLOCK_BYPASS_DOMAINS")
+load_reports_enabled = os.environ.get("BLOCK_REPORT", "1") != "0"
+
+blocking_totals = {"pages": 0, "blocked_requests": 0, "bytes_transferred": 0, "est_bytes_saved": 0, "load_ms_total": 0.0}
+stats_lock = Lock()
+
+
+def blocked_url_patterns():
+    patterns = [pattern for kind in blocked_types for pattern in BLOCK_PATTERNS.get(kind, [])]
+    return [pattern for pattern in patterns + extra_patterns if pattern not in allowed_patterns]
+
+
+def is_bypassed(url):
+    host = urlparse(url).netloc.lower()
+    return any(host == domain or host.endswith("." + domain) for domain in bypass_domains)
+
+
+def enable_performance_log(options):
+    """Ask Chrome for the DevTools performance log so blocked requests can be counted."""
+    if load_reports_enabled:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def enable_network_domain(driver):
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+    except Exception as e:
+        logger.warning(f"Could not enable CDP Network domain: {e}")
+
+
+def apply_resource_blocking(driver, url):
+    """Set the blocked URL list for the next navigation; sites in BLOCK_BYPASS_DOMAINS load everything."""
+    if load_reports_enabled:
+        drain_performance_log(driver)  # start the next page report from a clean log
+    patterns = [] if is_bypassed(url) else blocked_url_patterns()
+    if getattr(driver, "blocked_url_patterns", None) == patterns:
+        return
+    try:
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        driver.blocked_url_patterns = patterns
+    except Exception as e:
+        logger.warning(f"Could not set blocked URLs: {e}")
+
+
+def read_performance_log(driver):
+    """New performance log entries, kept on the driver for page_load_report too. None when the log is unavailable."""
+    if not load_reports_enabled:
+        return None
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return None
+    driver.performance_entries = getattr(driver, "performance_entries", []) + entries
+    return entries
+
+
+def drain_performance_log(driver):
+    """Every entry since the last drain, including those read_performance_log already saw."""
+    entries = getattr(driver, "performance_entries", [])
+    driver.performance_entries = []
+    try:
+        return entries + driver.get_log("performance")
+    except Exception:
+        return entries
+
+
+def cdp_events(entries):
+    """(method, params) of the DevTools events in performance log entries."""
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError, TypeError):
+            continue
+        yield message.get("method"), message.get("params", {})
+
+
+def resource_kind(request_url, cdp_type):
+    lower_url = request_url.lower()
+    if any(pattern.strip("*") in lower_url for pattern in BLOCK_PATTERNS["tracker"]):
+        return "tracker"
+    return CDP_TYPES.get(cdp_type, "other")
+
+
+def page_load_report(driver):
+    """Blocked requests, bytes transferred, estimated bytes saved and load time for the page just loaded."""
+    report = {"blocked_requests": 0, "blocked_by_type": {}, "bytes_transferred": 0, "est_bytes_saved": 0, "load_ms": None}
+    try:
+        report["load_ms"] = driver.execute_script(
+            "var n = performance.getEntriesByType('navigation')[0];"
+            "return n ? Math.round((n.loadEventEnd || performance.now()) - n.startTime) : null;"
+        )
+    except Exception:
+        pass
+    if not load_reports_enabled:
+        return report
+
+    requests_by_id = {}
+    for method, params in cdp_events(drain_performance_log(driver)):
+        if method == "Network.requestWillBeSent":
+            requests_by_id[params.get("requestId")] = (params.get("request", {}).get("url", ""), params.get("type"))
+        elif method == "Network.loadingFinished":
+            report["bytes_transferred"] += int(params.get("encodedDataLength", 0))
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            request_url, cdp_type = requests_by_id.get(params.get("requestId"), ("", params.get("type")))
+            kind = resource_kind(request_url, cdp_type)
+            report["blocked_requests"] += 1
+            report["blocked_by_type"][kind] = report["blocked_by_type"].get(kind, 0) + 1
+            report["est_bytes_saved"] += TYPICAL_BYTES.get(kind, TYPICAL_BYTES["other"])
+
+    with stats_lock:
+        blocking_totals["pages"] += 1
+        blocking_totals["blocked_requests"] += report["blocked_requests"]
+        blocking_totals["bytes_transferred"] += report["bytes_transferred"]
+        blocking_totals["est_bytes_saved"] += report["est_bytes_saved"]
+        blocking_totals["load_ms_total"] += report["load_ms"] or 0
+    return report
+
+
+def blocking_stats():
+    with stats_lock:
+        pages = blocking_totals["pages"]
+        return {
+            "blocked_types": blocked_types,
+            "bypass_domains": bypass_domains,
+            "pages": pages,
+            "blocked_requests": blocking_totals["blocked_requests"],
+            "bytes_transferred": blocking_totals["bytes_transferred"],
+            "est_bytes_saved": blocking_totals["est_bytes_saved"],
+            "avg_load_ms": round(blocking_totals["load_ms_total"] / pages, 1) if pages else 0.0,
+        }
@@ -0,0 +1,99 @@
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+from threading import Lock
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def hash_page_texts(source_urls):
+    """Stable hash of the extracted page texts, independent of crawl order."""
+    digest = hashlib.sha256()
+    for url in sorted(source_urls):
+        digest.update(url.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(source_urls[url].encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ComplianceCache:
+    """Two-tier (in-memory LRU + SQLite) cache of compliance verdicts keyed by canonical site URL.
+
+    An entry younger than `ttl` is served without crawling. An older entry, up to
+    `content_ttl`, is still reused when a fresh crawl produced the same content hash.
+    """
+
+    def __init__(self, path, ttl=6 * 3600, content_ttl=30 * 86400, memory_size=256):
+        self.ttl = ttl
+        self.content_ttl = content_ttl
+        self.memory_size = memory_size
+        self.memory = OrderedDict()
+        self.lock = Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "content_hits": 0, "misses": 0, "writes": 0}
+
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS compliance_cache ("
+            "key TEXT PRIMARY KEY, content_hash TEXT NOT NULL, result TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self.db.commit()
+
+    def get_fresh(self, key):
+        entry, tier = self._load(key)
+        fresh = entry is not None and time.time() - entry["created_at"] < self.ttl
+        with self.lock:
+            self.counters[f"{tier}_hits" if fresh else "misses"] += 1
+        return entry["result"] if fresh else None
+
+    def get_by_content(self, key, content_hash):
+        entry, _ = self._load(key)
+        if entry and entry["content_hash"] == content_hash and time.time() - entry["created_at"] < self.content_ttl:
+            with self.lock:
+                self.counters["content_hits"] += 1
+            return entry["result"]
+        return None
+
+    def put(self, key, result, content_hash):
+        entry = {"result": result, "content_hash": content_hash, "created_at": time.time()}
+        with self.lock:
+            self._remember(key, entry)
+            self.db.execute(
+                "INSERT OR REPLACE INTO compliance_cache (key, content_hash, result, created_at) VALUES (?, ?, ?, ?)",
+                (key, content_hash, json.dumps(result), entry["created_at"]),
+            )
+            self.db.commit()
+            self.counters["writes"] += 1
+
+    def stats(self):
+        with self.lock:
+            return {"memory_entries": len(self.memory), **self.counters}
+
+    def _load(self, key):
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+                return entry, "memory"
+
+            row = self.db.execute(
+                "SELECT content_hash, result, created_at FROM compliance_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None, None
+            try:
+                entry = {"content_hash": row[0], "result": json.loads(row[1]), "created_at": row[2]}
+            except json.JSONDecodeError:
+                logger.warning(f"Dropping unreadable cache entry for {key}")
+                return None, None
+            self._remember(key, entry)
+            return entry, "disk"
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
@@ -0,0 +1,300 @@
+import re
+import itertools
+import logging
+from threading import Lock
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Phrase groups. "{a|b}" expands into every combination, so each template covers its common wordings.
+PHRASE_GROUPS = {
+    "no_share": [
+        "{will|shall|do|does|would} not {share|sell|rent|disclose|transfer}",
+        "{wont|won t|don t|doesn t|never} {share|sell|rent|disclose|transfer}",
+        "{will|shall} not be {shared|sold|rented|disclosed|transferred}",
+        "{is|are} not {shared|sold|rented|disclosed|transferred}",
+        "{is|are} never {shared|sold|rented|disclosed|transferred}",
+        "{will|shall} never be {shared|sold|rented|disclosed|transferred}",
+        "{will remain|remains|remain|will be kept|are kept|is kept} confidential",
+        "not use your {data|information|phone number} for {promotional|marketing} purposes",
+        "excludes text messaging originator opt in data and consent",
+    ],
+    # Affirmative sharing ("we may share your phone number with partners") contradicts a no-share statement.
+    "share_affirmative": [
+        "we {share|sell|rent|disclose|transfer}",
+        "we {will|may|might|can|could|also|do|sometimes|routinely} {share|sell|rent|disclose|transfer}",
+        "{may|will|can|might} be {shared|sold|rented|disclosed|transferred}",
+        "{is|are} {shared|sold|rented|disclosed|transferred} with",
+    ],
+    "sms_context": [
+        "{sms|text message|text messages|text messaging|mobile number|mobile numbers|phone number|phone numbers|mobile information}",
+        "{sms consent|opt in data|opt in|originator opt in|consent data}",
+    ],
+    "collect": [
+        "{we|may} collect",
+        "{information|data} we collect",
+        "collection of {information|data|personal information}",
+        "{information|data} {is|are} collected",
+    ],
+    "use": [
+        "{we|may} use {your|the|this|such} {information|data|personal information}",
+        "how we use",
+        "use of {your|personal} {information|data}",
+        "{information|data} {is|are} used",
+    ],
+    "store": [
+        "{we|may} {store|retain} {your|the|this|such} {information|data|personal information}",
+        "data retention",
+        "{stored|retained} {securely|for as long as}",
+    ],
+    "receive_messages": [
+        "you {will|may|might|agree to} receive",
+        "{messages|texts|sms|notifications} {may include|include|regarding|related to|about|concerning}",
+        "{appointment|payment|order|account|delivery|service} {reminders|updates|notifications|alerts|confirmations}",
+        "{promotional|marketing|transactional|informational|recurring} {messages|texts|text messages|sms|alerts}",
+    ],
+    "frequency": [
+        "{message|msg|messaging|messages|msgs|text} frequency {varies|may vary|will vary}",
+        "frequency {varies|may vary|will vary}",
+        "{may|will} send {multiple|recurring} {messages|texts}",
+        "{recurring|up to} {messages|msgs|texts}",
+        "{messages|msgs|texts} per {day|week|month}",
+    ],
+    "rates": [
+        "{message|msg|messaging|text} and data rates {may|will} apply",
+        "data rates {may|will} apply",
+        "{standard|carrier} {message|msg|messaging|text|data} {and data|} rates",
+        "{message|msg|messaging|text} {rates|charges|fees} {may|will} apply",
+    ],
+    "stop": [
+        "{reply|text|txt|send|respond|respond with|reply with|texting|replying} stop",
+        "stop to {cancel|opt out|unsubscribe|end|stop|quit}",
+    ],
+    "help": [
+        "{reply|text|txt|send|respond|respond with|reply with|texting|replying} help",
+        "help for {help|assistance|support|more information|info}",
+    ],
+}
+
+# How each category in the compliance schema is matched.
+#   anchor: a sentence hitting any of these groups is a candidate statement.
+#   strong: groups that must all be hit for a high-confidence match.
+#   scope:  "sentence" requires the strong groups in one sentence, "category" across all candidates.
+#   exclude: any sentence hitting these groups caps the category at low confidence and joins its candidates.
+CATEGORY_RULES = {
+    ("privacy_policy", "sms_consent_statement"): {
+        "anchor": ["no_share"],
+        "strong": ["no_share", "sms_context"],
+        "scope": "sentence",
+        "exclude": ["share_affirmative"],
+    },
+    ("privacy_policy", "data_usage_explanation"): {
+        "anchor": ["collect", "use", "store"],
+        "strong": ["collect", "use"],
+        "scope": "category",
+    },
+    ("terms_conditions", "message_types_specified"): {
+        "anchor": ["receive_messages"],
+        "strong": ["receive_messages", "sms_context"],
+        "scope": "sentence",
+    },
+    ("terms_conditions", "mandatory_disclosures"): {
+        "anchor": ["frequency", "rates", "stop", "help"],
+        "strong": ["frequency", "rates", "stop", "help"],
+        "scope": "category",
+    },
+}
+
+outcome_counts = {"short_circuit": 0, "snippets": 0, "full": 0}
+stats_lock = Lock()
+
+MAX_CANDIDATES = 10
+MAX_STATEMENT_CHARS = 500
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text):
+    text = text.lower().replace("&", " and ")
+    return " " + NON_WORD.sub(" ", text).strip() + " "
+
+
+def expand_template(template):
+    parts = re.split(r"(\{[^}]*\})", template)
+    choices = [part[1:-1].split("|") if part.startswith("{") else [part] for part in parts]
+    for combination in itertools.product(*choices):
+        phrase = normalize("".join(combination))
+        if phrase.strip():
+            yield phrase
+
+
+class PhraseAutomaton:
+    """Aho-Corasick automaton over normalized text; reports which phrase groups occur."""
+
+    def __init__(self, groups):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [set()]
+        for group, templates in groups.items():
+            for template in templates:
+                for phrase in expand_template(template):
+                    self._add(phrase, group)
+        self._build()
+
+    def _add(self, phrase, group):
+        state = 0
+        for char in phrase:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(set())
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        self.output[state].add(group)
+
+    def _build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, target in self.goto[state].items():
+                queue.append(target)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[target] = self.goto[fallback].get(char, 0)
+                self.output[target] |= self.output[self.fail[target]]
+
+    def search(self, normalized_text):
+        groups = set()
+        state = 0
+        for char in normalized_text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            if self.output[state]:
+                groups |= self.output[state]
+        return groups
+
+
+automaton = PhraseAutomaton(PHRASE_GROUPS)
+
+
+def iter_sentences(source_urls):
+    for url, page_text in source_urls.items():
+        for line in page_text.splitlines():
+            for sentence in SENTENCE_SPLIT.split(line.strip()):
+                if sentence:
+                    yield url, sentence
+
+
+def screen_compliance(source_urls):
+    """Find candidate statements per compliance category.
+
+    Returns {(section, category): {"confidence": "high"|"low"|"none", "candidates": [...], "statement", "url"}}.
+    """
+    matches = {key: [] for key in CATEGORY_RULES}
+    contradictions = {key: [] for key in CATEGORY_RULES}
+    seen = {key: set() for key in CATEGORY_RULES}
+    for url, sentence in iter_sentences(source_urls):
+        groups = automaton.search(normalize(sentence))
+        if not groups:
+            continue
+        for key, rule in CATEGORY_RULES.items():
+            excluded = bool(groups & set(rule.get("exclude", ())))
+            if (excluded or groups & set(rule["anchor"])) and sentence not in seen[key]:
+                seen[key].add(sentence)
+                match = {"statement": sentence[:MAX_STATEMENT_CHARS], "url": url, "groups": groups}
+                matches[key].append(match)
+                if excluded:
+                    contradictions[key].append(match)
+
+    screen = {}
+    for key, rule in CATEGORY_RULES.items():
+        # Contradicting sentences go first so they survive the MAX_CANDIDATES cut into the LLM prompt.
+        candidates = contradictions[key] + [c for c in matches[key] if c not in contradictions[key]]
+        strong = set(rule["strong"])
+        chosen = []
+        if rule["scope"] == "sentence":
+            chosen = [next((c for c in candidates if strong <= c["groups"]), None)]
+            chosen = [c for c in chosen if c]
+        elif strong <= set().union(*(c["groups"] for c in candidates)):
+            for group in rule["strong"]:
+                match = next(c for c in candidates if group in c["groups"])
+                if match not in chosen:
+                    chosen.append(match)
+        if contradictions[key]:
+            chosen = []  # never high confidence: the LLM weighs the statements against each other
+
+        screen[key] = {
+            "confidence": "high" if chosen else ("low" if candidates else "none"),
+            "statement": " ".join(c["statement"] for c in chosen),
+            "url": chosen[0]["url"] if chosen else "",
+            "candidates": [{"statement": c["statement"], "url": c["url"]} for c in candidates[:MAX_CANDIDATES]],
+        }
+    return screen
+
+
+def all_high_confidence(screen):
+    return all(entry["confidence"] == "high" for entry in screen.values())
+
+
+def build_rule_result(screen):
+    """Build the same response shape as the LLM analysis from a fully matched screen."""
+    analysis = {"privacy_policy": {}, "terms_conditions": {}}
+    for (section, category), entry in screen.items():
+        analysis[section][category] = {
+            "status": "found",
+            "statement": entry["statement"],
+            "url": entry["url"],
+            "detected_candidates": [c["statement"] for c in entry["candidates"]],
+            "rejection_reason": "",
+        }
+    analysis["overall_compliance"] = "compliant"
+    analysis["recommendations"] = []
+    return {"json": {"compliance_analysis": analysis}, "analysis_source": "rules"}
+
+
+def screen_findings(screen):
+    """Preliminary per-category findings from a screen, for progress updates before the LLM answers."""
+    return {
+        category: {
+            "section": section,
+            "confidence": entry["confidence"],
+            "statement": entry["statement"],
+            "url": entry["url"],
+            "candidates": len(entry["candidates"]),
+        }
+        for (section, category), entry in screen.items()
+    }
+
+
+def build_snippet_corpus(screen):
+    """Only the matched candidate sentences, grouped by page, for a reduced LLM prompt."""
+    by_url = {}
+    for entry in screen.values():
+        for candidate in entry["candidates"]:
+            statements = by_url.setdefault(candidate["url"], [])
+            if candidate["statement"] not in statements:
+                statements.append(candidate["statement"])
+    return "\n\n".join(f"=== PAGE: {url} ===\n" + "\n".join(statements) for url, statements in by_url.items())
+
+
+def build_hint_block(screen):
+    """The rule engine's candidate sentences per category, appended to the full corpus as hints for the LLM."""
+    lines = []
+    for (section, category), entry in screen.items():
+        for candidate in entry["candidates"]:
+            lines.append(f"- {category} ({entry['confidence']}): {candidate['statement']} [{candidate['url']}]")
+    if not lines:
+        return ""
+    return "=== RULE ENGINE CANDIDATES (hints only; the full text above is authoritative) ===\n" + "\n".join(lines)
+
+
+def record_outcome(outcome):
+    with stats_lock:
+        outcome_counts[outcome] += 1
+
+
+def rule_stats():
+    with stats_lock:
+        return dict(outcome_counts)
@@ -0,0 +1,85 @@
+import logging
+from threading import Lock
+from concurrent.futures import Future
+
+from progress import progress_listener, current_listener
+
+logger = logging.getLogger(__name__)
+
+
+class Flight:
+    """One in-flight call: its future and the progress events it has emitted so far."""
+
+    def __init__(self):
+        self.future = Future()
+        self.lock = Lock()
+        self.events = []
+        self.listeners = []
+
+    def join(self, listener):
+        """Replay the events so far to `listener` and forward every later one."""
+        with self.lock:
+            history = list(self.events)
+            self.listeners.append(listener)
+        for event, data in history:
+            self._deliver(listener, event, data)
+
+    def publish(self, event, data):
+        with self.lock:
+            self.events.append((event, data))
+            listeners = list(self.listeners)
+        for listener in listeners:
+            self._deliver(listener, event, data)
+
+    def _deliver(self, listener, event, data):
+        try:
+            listener(event, data)
+        except Exception as e:
+            logger.warning(f"Progress listener failed on {event}: {e}")
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key: the first caller runs, the rest wait for its result.
+
+    Progress events emitted by the running call reach the leader's and every follower's listener.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.calls = {}
+        self.counters = {"executed": 0, "coalesced": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self.lock:
+            flight = self.calls.get(key)
+            leader = flight is None
+            if leader:
+                flight = Flight()
+                self.calls[key] = flight
+                self.counters["executed"] += 1
+            else:
+                self.counters["coalesced"] += 1
+
+        future = flight.future
+        listener = current_listener()
+        if listener is not None:
+            flight.join(listener)
+        if not leader:
+            logger.info(f"Joining in-flight check for {key}")
+            return future.result()
+
+        try:
+            with progress_listener(flight.publish):
+                result = fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+    def stats(self):
+        with self.lock:
+            return {"in_flight": len(self.calls), **self.counters}
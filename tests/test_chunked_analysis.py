@@ -0,0 +1,81 @@
+import json
+
+import chunked_analysis
+from chunked_analysis import analyse_in_chunks
+
+RATES = "Message frequency varies. Message and data rates may apply."
+STOP_HELP = "Reply STOP to cancel. Reply HELP for help."
+
+
+class FakeLLM:
+    """Map calls report the disclosure parts in their excerpt; the decision finds them only if all are present."""
+
+    max_concurrency = 2
+
+    def __init__(self, fail_chunk=None, failures_per_call=1):
+        self.fail_chunk = fail_chunk
+        self.failures_per_call = failures_per_call
+        self.failed = {}
+        self.map_requirements = []
+        self.decide_prompts = []
+
+    def chat_completion(self, payload, api_key, tokens):
+        prompt = payload["messages"][1]["content"]
+        requirement = prompt.split("**Requirement:** **", 1)[1].split("**", 1)[0]
+        if "**Candidate statements:**" in prompt:
+            self.decide_prompts.append(prompt)
+            complete = RATES in prompt and STOP_HELP in prompt
+            body = {"finding": {
+                "status": "found" if complete else "not_found",
+                "statement": f"{RATES} {STOP_HELP}" if complete else "",
+                "url": "https://www.example.com/terms" if complete else "",
+            }}
+        else:
+            self.map_requirements.append(requirement)
+            if self.fail_chunk and self.fail_chunk in prompt:
+                self.failed[prompt] = self.failed.get(prompt, 0) + 1
+                if self.failed[prompt] <= self.failures_per_call:
+                    raise RuntimeError("rate limited")
+            found = [text for text in (RATES, STOP_HELP) if text in prompt] if requirement == "mandatory_disclosures" else []
+            body = {"candidates": [{"statement": text, "url": "https://www.example.com/terms", "covers": []} for text in found]}
+        return {"choices": [{"message": {"content": json.dumps({"json": body})}}]}, None
+
+
+def sources():
+    filler = "\n".join(f"Line {i} about our products and services." for i in range(400))
+    return {"https://www.example.com/terms": f"{RATES}\n{filler}\n{STOP_HELP}"}
+
+
+def disclosures(result):
+    return result["json"]["compliance_analysis"]["terms_conditions"]["mandatory_disclosures"]
+
+
+def test_requirement_split_across_chunks_is_found(monkeypatch):
+    monkeypatch.setattr(chunked_analysis, "chunk_max_tokens", 2000)
+    chunks = chunked_analysis.split_into_chunks(sources())
+    assert len(chunks) > 1
+    llm = FakeLLM()
+    result = analyse_in_chunks(sources(), llm, "key", "model")
+    assert sorted(llm.map_requirements) == sorted(list(chunked_analysis.CATEGORIES) * len(chunks))
+    assert len(llm.decide_prompts) == 1  # only requirements with candidates need a decision
+    assert disclosures(result)["status"] == "found"
+    assert set(disclosures(result)["detected_candidates"]) == {RATES, STOP_HELP}
+    assert "failed_steps" not in result
+
+
+def test_failed_chunk_call_is_retried(monkeypatch):
+    monkeypatch.setattr(chunked_analysis, "chunk_max_tokens", 2000)
+    result = analyse_in_chunks(sources(), FakeLLM(fail_chunk=STOP_HELP), "key", "model")
+    assert disclosures(result)["status"] == "found"
+    assert "failed_steps" not in result
+
+
+def test_chunk_that_keeps_failing_is_skipped_and_recorded(monkeypatch):
+    monkeypatch.setattr(chunked_analysis, "chunk_max_tokens", 2000)
+    result = analyse_in_chunks(sources(), FakeLLM(fail_chunk=STOP_HELP, failures_per_call=99), "key", "model")
+    assert "error" not in result
+    assert disclosures(result)["status"] == "not_found"
+    assert disclosures(result)["detected_candidates"] == [RATES]
+    assert "Not fully analysed" in disclosures(result)["rejection_reason"]
+    assert {step["category"] for step in result["failed_steps"]} == set(chunked_analysis.CATEGORIES)
+    assert all(step["step"] == "extract" for step in result["failed_steps"])
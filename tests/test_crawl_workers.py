@@ -0,0 +1,72 @@
+import sys
+import multiprocessing
+
+import psutil
+
+import crawl_workers
+from crawl_workers import plan_workers
+
+
+def test_in_process_by_default():
+    assert plan_workers("0", 5, 2) == (0, 0)
+
+
+def test_workers_share_the_browser_cap(monkeypatch):
+    monkeypatch.setattr(crawl_workers, "usable_cpus", lambda: 16)
+    processes, drivers = plan_workers("auto", 5, 2)
+    assert processes * drivers <= 5
+    assert plan_workers("2", 5, 2) == (2, 2)
+    assert plan_workers("8", 4, 3) == (4, 1)
+
+
+def hold_browser(ready):
+    import subprocess
+    import time
+    subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    ready.set()
+    time.sleep(60)
+
+
+def test_killing_a_hung_worker_kills_its_browsers():
+    context = multiprocessing.get_context("fork")
+    ready = context.Event()
+    worker = context.Process(target=hold_browser, args=(ready,), daemon=True)
+    worker.start()
+    assert ready.wait(10)
+    children = psutil.Process(worker.pid).children(recursive=True)
+    assert children
+
+    crawl_workers.CrawlWorkerPool(1)._kill_worker(worker)
+
+    assert not worker.is_alive()
+    assert not any(child.is_running() for child in children)
+
+
+class DeadProcess:
+    pid = None
+    exitcode = 1
+
+    def is_alive(self):
+        return False
+
+
+def test_backoff_does_not_stall_the_other_workers(monkeypatch):
+    pool = crawl_workers.CrawlWorkerPool(2)
+    now = crawl_workers.time.monotonic()
+    pool.workers = {0: DeadProcess(), 1: DeadProcess()}
+    pool.spawned_at = {0: now, 1: now - 100}  # worker 0 keeps crashing on start, worker 1 ran for a while
+    pool.fast_failures = {0: 5}
+    spawned, sleeps = [], []
+    monkeypatch.setattr(pool, "_spawn", spawned.append)
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        pool.running = len(sleeps) < 2
+
+    monkeypatch.setattr(crawl_workers.time, "sleep", sleep)
+    pool.running = True
+    pool._monitor()
+
+    assert sleeps == [1, 1]
+    assert spawned == [1]
+    assert pool.respawn_at[0] > now + 30
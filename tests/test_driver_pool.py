@@ -0,0 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from driver_pool import DriverPool
+
+
+class FakeDriver:
+    def execute_script(self, script):
+        return 1
+
+    def quit(self):
+        pass
+
+
+def test_counters_stay_consistent_under_concurrent_use():
+    pool = DriverPool(FakeDriver, size=4, max_page_loads=1)
+
+    def use(_):
+        pool.release(pool.acquire(timeout=10))
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(use, range(2000)))
+
+    stats = pool.stats()
+    assert stats["acquired"] == 2000
+    assert stats["recycled"] == 2000  # every lease hit max_page_loads
+    assert stats["created"] == stats["recycled"] + stats["total"]
+    assert stats["leased"] == 0
+    pool.close()
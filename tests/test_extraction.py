@@ -0,0 +1,46 @@
+import pytest
+
+from extraction import extract_page
+
+DISCLOSURE = "Message and data rates may apply. Reply STOP to cancel."
+POLICY = "We will not share your phone number."
+BACKENDS = ["lxml", "html.parser"]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_cookie_classes_on_body_keep_the_page(backend):
+    html = f'<html><body class="home cookies-not-set"><main><p>{DISCLOSURE}</p></main></body></html>'
+    assert extract_page(html, backend=backend).text == DISCLOSURE
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_cookie_policy_section_is_kept(backend):
+    html = f'<html><body><section id="cookie-policy"><h2>Cookies</h2><p>{POLICY}</p></section></body></html>'
+    assert POLICY in extract_page(html, backend=backend).text
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("banner", [
+    '<div id="onetrust-banner-sdk"><p>We use cookies.</p><a href="/privacy">Privacy Policy</a></div>',
+    '<div id="cookie-notice" class="cn-position-bottom"><p>We use cookies.</p><a href="/privacy">Privacy Policy</a></div>',
+    '<div class="site-cookies" style="position: fixed; bottom: 0"><p>We use cookies.</p><a href="/privacy">Privacy Policy</a></div>',
+])
+def test_consent_banners_are_dropped_but_their_links_kept(backend, banner):
+    page = extract_page(f"<html><body>{banner}<main><p>{POLICY}</p></main></body></html>", backend=backend)
+    assert page.text == POLICY
+    assert ("/privacy", "Privacy Policy") in page.links
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_sidebars_and_opt_in_dialogs_are_kept_by_default(backend):
+    html = (
+        f'<html><body><nav><a href="/">Home</a></nav><aside><p>{DISCLOSURE}</p></aside>'
+        f'<dialog open><label>{POLICY}</label><button>Agree</button></dialog></body></html>'
+    )
+    assert extract_page(html, backend=backend, main_content=False).text.split("\n") == [DISCLOSURE, POLICY, "Agree"]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_main_content_mode_drops_asides(backend):
+    html = f'<html><body><aside><p>Related posts</p></aside><main><p>{DISCLOSURE}</p></main></body></html>'
+    assert extract_page(html, backend=backend, main_content=True).text == DISCLOSURE
@@ -0,0 +1,11 @@
+from frontier import canonicalize_url
+
+
+def test_tracking_parameters_are_dropped():
+    url = "https://WWW.X.com:443/page/?utm_source=a&utm_medium=b&gclid=1&fbclid=2&ref=nav&source=mail&_ga=3&_gl=4&id=7"
+    assert canonicalize_url(url) == "https://www.x.com/page?id=7"
+
+
+def test_lookalike_parameters_are_kept():
+    url = "https://www.x.com/page?referrer_id=5&sourceId=2&region=us&_gallery=1"
+    assert canonicalize_url(url) == "https://www.x.com/page?_gallery=1&referrer_id=5&region=us&sourceId=2"
@@ -0,0 +1,37 @@
+from chunked_analysis import merge_findings
+from monitoring import ComplianceMonitor, flatten_findings
+
+URL = "https://www.example.com/privacy"
+NO_SHARING = "We will not share your phone number with third parties for marketing purposes."
+SHARING = "We may share your phone number with marketing partners."
+
+
+def verdict(status, statement=""):
+    return merge_findings([{"sms_consent_statement": {"status": status, "statement": statement, "url": URL if statement else ""}}])
+
+
+def test_added_contradiction_triggers_full_reanalysis():
+    calls = []
+
+    def analyse(text, source_urls):
+        calls.append(text)
+        if NO_SHARING in text:  # the whole site: the sharing sentence overrides the old one
+            return verdict("not_found")
+        return merge_findings([{"sms_consent_statement": {"status": "not_found", "detected_candidates": [SHARING]}}])
+
+    monitor = ComplianceMonitor(store=None, crawl=None, analyse=analyse, render=None, normalize=str)
+    current = {URL: f"{NO_SHARING}\n{SHARING}"}
+    result, source, _ = monitor._reanalyse(verdict("found", NO_SHARING), current, {URL: (NO_SHARING, current[URL])})
+
+    assert source == "full"
+    assert calls == [SHARING, current[URL]]
+    assert flatten_findings(result)["sms_consent_statement"]["status"] == "not_found"
+
+
+def test_unrelated_addition_stays_incremental():
+    monitor = ComplianceMonitor(store=None, crawl=None, analyse=lambda text, urls: verdict("not_found"), render=None, normalize=str)
+    current = {URL: f"{NO_SHARING}\nOur office moved to Main Street."}
+    result, source, _ = monitor._reanalyse(verdict("found", NO_SHARING), current, {URL: (NO_SHARING, current[URL])})
+
+    assert source == "diff"
+    assert flatten_findings(result)["sms_consent_statement"]["status"] == "found"
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+import time
+
+from progress import ProgressLog, progress_listener, emit
+from singleflight import SingleFlight
+
+
+def test_async_read_wakes_on_publish_from_another_thread():
+    log = ProgressLog()
+
+    async def reader():
+        started = time.monotonic()
+        threading.Timer(0.05, log.publish, ("page_loaded", {"url": "u"})).start()
+        events, closed = await log.read_async(0, 5)
+        return events, closed, time.monotonic() - started
+
+    events, closed, waited = asyncio.run(reader())
+    assert [item["event"] for item in events] == ["page_loaded"]
+    assert not closed and waited < 1
+    assert log.waiters == []
+
+
+def test_coalesced_followers_receive_the_leaders_events():
+    flight = SingleFlight()
+    leader_running, release = threading.Event(), threading.Event()
+    received = {"leader": [], "follower": []}
+
+    def check():
+        emit("homepage_loaded")
+        leader_running.set()
+        release.wait(5)
+        emit("crawl_finished")
+        return "verdict"
+
+    def call(name):
+        with progress_listener(lambda event, data: received[name].append(event)):
+            return flight.do("site", check)
+
+    leader = threading.Thread(target=call, args=("leader",))
+    leader.start()
+    leader_running.wait(5)
+    follower = threading.Thread(target=call, args=("follower",))
+    follower.start()
+    while flight.stats()["coalesced"] == 0:
+        time.sleep(0.01)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert received["leader"] == received["follower"] == ["homepage_loaded", "crawl_finished"]
@@ -0,0 +1,33 @@
+import json
+
+from readiness import NetworkActivity, wait_for_quiet
+from resource_blocking import drain_performance_log
+
+LOADED = {"readyState": "complete", "quietMs": 10_000, "inflight": 0, "height": 0}
+
+
+def network_event(method, request_id):
+    return {"message": json.dumps({"message": {"method": method, "params": {"requestId": request_id}}})}
+
+
+class FakeDriver:
+    """A loaded page whose probe sees nothing in flight, while CDP reports a request that finishes on the third poll."""
+
+    def __init__(self):
+        self.logs = [[network_event("Network.requestWillBeSent", "1")], [], [network_event("Network.loadingFinished", "1")]]
+        self.polls = 0
+
+    def execute_script(self, script):
+        return dict(LOADED)
+
+    def get_log(self, kind):
+        self.polls += 1
+        return self.logs.pop(0) if self.logs else []
+
+
+def test_waits_for_requests_seen_only_over_cdp():
+    driver = FakeDriver()
+    settled, state = wait_for_quiet(driver, deadline=float("inf"), quiet_ms=0, poll_interval=0, network=NetworkActivity())
+    assert settled
+    assert driver.polls == 3
+    assert len(drain_performance_log(driver)) == 2  # still there for the page load report
@@ -0,0 +1,41 @@
+import pytest
+
+from rules import screen_compliance, all_high_confidence, build_hint_block
+
+TERMS = (
+    "By opting in you agree to receive order updates by text message. Message frequency varies. "
+    "Message and data rates may apply. Reply STOP to cancel. Reply HELP for help."
+)
+USAGE = "We collect your phone number when you order. We use your information to send order updates."
+SMS_CONSENT = "We will not share your phone number or SMS opt-in data with third parties for marketing purposes."
+
+
+def screen_for(privacy):
+    return screen_compliance({"https://www.example.com/privacy": privacy, "https://www.example.com/terms": TERMS})
+
+
+def test_compliant_policy_is_high_confidence():
+    assert all_high_confidence(screen_for(f"{SMS_CONSENT} {USAGE}"))
+
+
+@pytest.mark.parametrize("contradiction", [
+    "We will share SMS opt-in data with affiliates.",
+    "We may share your phone number with marketing partners.",
+])
+def test_affirmative_sharing_is_never_high_confidence(contradiction):
+    screen = screen_for(f"{SMS_CONSENT} {USAGE} {contradiction}")
+    entry = screen[("privacy_policy", "sms_consent_statement")]
+    assert entry["confidence"] == "low"
+    assert not all_high_confidence(screen)
+    assert entry["candidates"][0]["statement"] == contradiction
+
+
+def test_negated_policy_alone_is_not_a_match():
+    screen = screen_for(f"We may share your phone number with marketing partners. {USAGE}")
+    assert screen[("privacy_policy", "sms_consent_statement")]["confidence"] == "low"
+
+
+def test_hint_block_lists_candidates_with_confidence():
+    hints = build_hint_block(screen_for(f"{SMS_CONSENT} {USAGE}"))
+    assert "RULE ENGINE CANDIDATES" in hints
+    assert f"sms_consent_statement (high): {SMS_CONSENT}" in hints
@@ -0,0 +1,293 @@
+"""Offline WebSocket load benchmark for the agent socket path.
+
+Starts ws_standin.py in a child process (or uses --target) and opens many concurrent
+sessions through testws.open_websocket / testws.send_test_udp_packets, the same connect
+and send path connectivity probes use.
+
+Measures:
+- connect rate;
+- round-trip message throughput;
+- RTT distribution;
+- client and server resident memory per open connection.
+
+    python ws_benchmark.py --connections 2000 --messages 20 --output before.json
+    python ws_benchmark.py --connections 2000 --no-compression --tls --compare before.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import subprocess
+
+import psutil
+
+import testws
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def distribution(values):
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3) if values else 0.0,
+        "p50": round(percentile(values, 0.50), 3),
+        "p90": round(percentile(values, 0.90), 3),
+        "p99": round(percentile(values, 0.99), 3),
+        "p999": round(percentile(values, 0.999), 3),
+        "max": round(max(values, default=0.0), 3),
+    }
+
+
+def raise_file_limit(needed):
+    """Each session is a socket; lift the soft fd limit towards the hard one."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = needed + 256 if hard == resource.RLIM_INFINITY else min(hard, needed + 256)
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+    return resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+
+def rss_mb(process):
+    try:
+        return process.memory_info().rss / (1024 * 1024)
+    except (psutil.Error, AttributeError):
+        return 0.0
+
+
+class StandInProcess:
+    """ws_standin.py in a child process, so the server does not share the load generator's loop or GIL."""
+
+    def __init__(self, args):
+        command = [sys.executable, os.path.join(REPO_DIR, "ws_standin.py"), "--port", str(args.port)]
+        if args.tls:
+            command.append("--tls")
+        if args.no_compression:
+            command.append("--no-compression")
+        if args.script:
+            command += ["--script", args.script]
+        self.child = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        line = self.child.stdout.readline()
+        if not line.startswith("listening on "):
+            self.child.kill()
+            sys.exit(f"ws_standin.py did not start: {line!r}")
+        self.url = line.split("listening on ", 1)[1].strip()
+        self.process = psutil.Process(self.child.pid)
+
+    def stop(self):
+        self.child.terminate()
+        self.child.wait(10)
+
+
+async def open_sessions(args, url_for, compression):
+    """Phase 1: connect every session, at most --connect-concurrency handshakes in flight."""
+    semaphore = asyncio.Semaphore(args.connect_concurrency)
+    sessions, connect_ms, errors = [], [], {}
+
+    async def connect(index):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                ws = await testws.open_websocket(url_for(index), compression, insecure=True, open_timeout=args.timeout)
+            except Exception as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                return
+            connect_ms.append(testws.elapsed_ms(started))
+            sessions.append(ws)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(connect(index) for index in range(args.connections)))
+    return sessions, connect_ms, errors, time.perf_counter() - started
+
+
+def reply_sequence(reply):
+    try:
+        return json.loads(reply).get("seq")
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+async def exchange(ws, args, padding, rtts, counters):
+    """Phase 2 for one session: send a test packet, wait for its reply, repeat."""
+    for sequence in range(args.messages):
+        started = time.perf_counter()
+        try:
+            sent = await testws.send_test_udp_packets(ws, sequence, padding)
+            counters["sent"] += 1
+            counters["bytes_sent"] += len(sent)
+            while True:
+                reply = await asyncio.wait_for(ws.recv(), args.timeout)
+                if reply == sent or reply_sequence(reply) == sequence:
+                    break
+                counters["unsolicited"] += 1  # on_connect greetings and other unmatched messages
+        except asyncio.TimeoutError:
+            counters["timeouts"] += 1
+            continue
+        except Exception:
+            counters["errors"] += 1
+            return
+        rtts.append(testws.elapsed_ms(started))
+        counters["received"] += 1
+        if args.think_ms:
+            await asyncio.sleep(args.think_ms / 1000)
+
+
+async def server_stats(url, compression):
+    try:
+        async with testws.open_websocket(url, compression, insecure=True) as ws:
+            await ws.send("__stats__")
+            return json.loads(await asyncio.wait_for(ws.recv(), 10))
+    except Exception as e:
+        return {"error": str(e)}
+
+
+async def run(args, target, server_process):
+    compression = not args.no_compression
+    client = psutil.Process()
+    client_before, server_before = rss_mb(client), rss_mb(server_process)
+
+    def url_for(index):
+        return testws.build_ws_url(target, args.access_token, args.agent_id, f"EAG:bench-{index}")
+
+    sessions, connect_ms, connect_errors, connect_seconds = await open_sessions(args, url_for, compression)
+    await asyncio.sleep(0.5)  # let the server finish its side of the last handshakes before sampling
+    client_open, server_open = rss_mb(client), rss_mb(server_process)
+
+    rtts = []
+    counters = {"sent": 0, "received": 0, "timeouts": 0, "errors": 0, "unsolicited": 0, "bytes_sent": 0}
+    padding = "x" * args.payload_bytes
+    started = time.perf_counter()
+    await asyncio.gather(*(exchange(ws, args, padding, rtts, counters) for ws in sessions))
+    exchange_seconds = time.perf_counter() - started
+
+    stats = await server_stats(url_for(args.connections), compression)
+    close_started = time.perf_counter()
+    await asyncio.gather(*(ws.close() for ws in sessions), return_exceptions=True)
+    close_seconds = time.perf_counter() - close_started
+
+    connected = len(sessions)
+    return {
+        "connections": {
+            "attempted": args.connections,
+            "connected": connected,
+            "failed": args.connections - connected,
+            "errors": connect_errors,
+            "connect_seconds": round(connect_seconds, 3),
+            "connects_per_second": round(connected / connect_seconds, 1) if connect_seconds else 0.0,
+            "connect_ms": distribution(connect_ms),
+            "close_seconds": round(close_seconds, 3),
+        },
+        "messages": {
+            **counters,
+            "exchange_seconds": round(exchange_seconds, 3),
+            "round_trips_per_second": round(counters["received"] / exchange_seconds, 1) if exchange_seconds else 0.0,
+            "rtt_ms": distribution(rtts),
+        },
+        "memory": {
+            "client_rss_mb": {"before": round(client_before, 1), "open": round(client_open, 1), "after": round(rss_mb(client), 1)},
+            "server_rss_mb": {"before": round(server_before, 1), "open": round(server_open, 1)} if server_process else None,
+            "client_kb_per_connection": round((client_open - client_before) * 1024 / connected, 1) if connected else 0.0,
+            "server_kb_per_connection": round((server_open - server_before) * 1024 / connected, 1) if connected and server_process else None,
+        },
+        "server": stats,
+    }
+
+
+def summarize(args, target, result):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "config": {
+            "target": target, "connections": args.connections, "connect_concurrency": args.connect_concurrency,
+            "messages": args.messages, "payload_bytes": args.payload_bytes, "think_ms": args.think_ms,
+            "compression": not args.no_compression, "tls": target.startswith("wss://"), "script": args.script,
+        },
+        **result,
+    }
+
+
+COMPARED = [
+    (("connections", "connects_per_second"), True),
+    (("connections", "connect_ms", "p99"), False),
+    (("messages", "round_trips_per_second"), True),
+    (("messages", "rtt_ms", "p50"), False),
+    (("messages", "rtt_ms", "p99"), False),
+    (("memory", "client_kb_per_connection"), False),
+    (("memory", "server_kb_per_connection"), False),
+]
+
+
+def compare(report, baseline):
+    def lookup(data, path):
+        for key in path:
+            data = (data or {}).get(key)
+        return data or 0
+
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    for path, higher_is_better in COMPARED:
+        before, after = lookup(baseline, path), lookup(report, path)
+        change = (after - before) / before * 100 if before else 0.0
+        better = (change > 0) == higher_is_better if change else None
+        verdict = "" if better is None else (" better" if better else " worse")
+        print(f"  {'.'.join(path):34} {before:>12} -> {after:>12}  ({change:+.1f}%{verdict})")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline WebSocket load benchmark against ws_standin.py.")
+    parser.add_argument("--connections", type=int, default=1000, help="concurrent sessions to open and hold")
+    parser.add_argument("--connect-concurrency", type=int, default=200, help="handshakes in flight at once")
+    parser.add_argument("--messages", type=int, default=10, help="round trips per session")
+    parser.add_argument("--payload-bytes", type=int, default=0, help="padding added to each test packet")
+    parser.add_argument("--think-ms", type=float, default=0, help="pause between a session's round trips")
+    parser.add_argument("--timeout", type=float, default=30, help="connect and reply timeout")
+    parser.add_argument("--tls", action="store_true", help="stand-in serves wss:// with a self-signed certificate")
+    parser.add_argument("--no-compression", action="store_true", help="disable permessage-deflate on both ends")
+    parser.add_argument("--script", help="reply script for the stand-in (see ws_standin.py)")
+    parser.add_argument("--port", type=int, default=8799, help="stand-in port")
+    parser.add_argument("--target", help="benchmark this server instead of starting the stand-in")
+    parser.add_argument("--access-token", default="standin-token")
+    parser.add_argument("--agent-id", default="100000")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="previous JSON report to compare against")
+    return parser.parse_args(argv)
+
+
+def main_cli(argv=None):
+    args = parse_args(argv)
+    limit = raise_file_limit(args.connections * (1 if args.target else 2))
+    if limit < args.connections + 64:
+        print(f"Open file limit is {limit}; some of the {args.connections} connections will fail.", file=sys.stderr)
+
+    standin = None if args.target else StandInProcess(args)
+    target = args.target or standin.url
+    try:
+        result = asyncio.run(run(args, target, standin.process if standin else None))
+    finally:
+        if standin:
+            standin.stop()
+
+    report = summarize(args, target, result)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,186 @@
+"""Local stand-in for the Engage agent WebSocket endpoint.
+
+Accepts the same handshake query parameters as the live server (access_token, agent_id,
+x-engage-client-request-id), rejects upgrades that lack them, and then echoes every message
+or answers from a script. Used by ws_benchmark.py; also handy for running testws.py offline.
+
+    python ws_standin.py --port 8799
+    python ws_standin.py --port 8443 --tls --no-compression --script replies.json
+    python testws.py ws://127.0.0.1:8799 --access-token x --agent-id 1 --stun ""
+
+A script is a JSON object:
+
+    {"on_connect": [{"type": "hello"}],
+     "replies": {"PING": "PONG", "test": {"type": "ack"}},
+     "default": "echo",
+     "delay_ms": 0}
+
+Replies are keyed by a JSON message's "type", or by the raw text. Object replies get the
+request's "seq" copied in so clients can match them up. "default" is "echo" or null (no reply).
+The text message "__stats__" is answered with the server's counters.
+"""
+
+import os
+import ssl
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import subprocess
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+from websockets.asyncio.server import serve
+
+logger = logging.getLogger("ws_standin")
+
+REQUIRED_PARAMS = ("access_token", "agent_id", "x-engage-client-request-id")
+STATS_MESSAGE = "__stats__"
+
+
+def self_signed_context(cert_dir=None):
+    """A TLS context with a throwaway localhost certificate made by the openssl CLI."""
+    cert_dir = cert_dir or tempfile.mkdtemp(prefix="ws-standin-")
+    certfile, keyfile = os.path.join(cert_dir, "cert.pem"), os.path.join(cert_dir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "2", "-subj", "/CN=localhost",
+         "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1", "-keyout", keyfile, "-out", certfile],
+        check=True, capture_output=True,
+    )
+    return tls_context(certfile, keyfile)
+
+
+def tls_context(certfile, keyfile):
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(certfile, keyfile)
+    return context
+
+
+class StandInServer:
+    """Handshake validation, echo/scripted replies and connection counters for one listening socket."""
+
+    def __init__(self, script=None, expected_token=None):
+        self.script = script or {}
+        self.replies = self.script.get("replies", {})
+        self.default = self.script.get("default", "echo")
+        self.delay = self.script.get("delay_ms", 0) / 1000
+        self.expected_token = expected_token
+        self.started = time.time()
+        self.counters = {
+            "connections": 0, "active": 0, "peak_active": 0, "rejected": 0,
+            "messages_in": 0, "messages_out": 0, "bytes_in": 0, "bytes_out": 0,
+        }
+
+    def process_request(self, connection, request):
+        """Reject upgrades the live endpoint would refuse, before the WebSocket handshake completes."""
+        params = parse_qs(urlsplit(request.path).query)
+        missing = [name for name in REQUIRED_PARAMS if not params.get(name, [""])[0]]
+        if missing:
+            self.counters["rejected"] += 1
+            return connection.respond(HTTPStatus.BAD_REQUEST, f"missing {', '.join(missing)}\n")
+        if not params["agent_id"][0].isdigit():
+            self.counters["rejected"] += 1
+            return connection.respond(HTTPStatus.BAD_REQUEST, "agent_id must be numeric\n")
+        if self.expected_token and params["access_token"][0] != self.expected_token:
+            self.counters["rejected"] += 1
+            return connection.respond(HTTPStatus.UNAUTHORIZED, "invalid access_token\n")
+        return None
+
+    def reply_for(self, message):
+        if message == STATS_MESSAGE:
+            return json.dumps(self.stats())
+        key, seq = message, None
+        if isinstance(message, str) and message.startswith("{"):
+            try:
+                parsed = json.loads(message)
+                key, seq = parsed.get("type", message), parsed.get("seq")
+            except (ValueError, AttributeError):
+                pass
+        if isinstance(key, str) and key in self.replies:
+            reply = self.replies[key]
+            if isinstance(reply, dict):
+                return json.dumps({**reply, "seq": seq} if seq is not None else reply)
+            return reply
+        return message if self.default == "echo" else None
+
+    async def send(self, ws, message):
+        await ws.send(message)
+        self.counters["messages_out"] += 1
+        self.counters["bytes_out"] += len(message)
+
+    async def handler(self, ws):
+        self.counters["connections"] += 1
+        self.counters["active"] += 1
+        self.counters["peak_active"] = max(self.counters["peak_active"], self.counters["active"])
+        try:
+            for greeting in self.script.get("on_connect", []):
+                await self.send(ws, greeting if isinstance(greeting, str) else json.dumps(greeting))
+            async for message in ws:
+                self.counters["messages_in"] += 1
+                self.counters["bytes_in"] += len(message)
+                reply = self.reply_for(message)
+                if reply is None:
+                    continue
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                await self.send(ws, reply)
+        except Exception as e:
+            logger.debug(f"Connection ended: {e}")
+        finally:
+            self.counters["active"] -= 1
+
+    def stats(self):
+        return {"uptime_seconds": round(time.time() - self.started, 1), **self.counters}
+
+
+async def run_server(args):
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+    context = None
+    if args.tls:
+        context = tls_context(args.certfile, args.keyfile) if args.certfile else self_signed_context()
+    standin = StandInServer(script, args.token)
+    async with serve(
+        standin.handler,
+        args.host,
+        args.port,
+        ssl=context,
+        process_request=standin.process_request,
+        compression=None if args.no_compression else "deflate",
+        max_size=None,
+        backlog=args.backlog,
+    ):
+        scheme = "wss" if context else "ws"
+        # ws_benchmark.py waits for this line before connecting.
+        print(f"listening on {scheme}://{args.host}:{args.port}", flush=True)
+        await asyncio.Future()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the Engage agent WebSocket endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--tls", action="store_true", help="serve wss:// (self-signed unless --certfile/--keyfile)")
+    parser.add_argument("--certfile")
+    parser.add_argument("--keyfile")
+    parser.add_argument("--no-compression", action="store_true", help="refuse permessage-deflate")
+    parser.add_argument("--script", help="JSON reply script (default: echo everything)")
+    parser.add_argument("--token", help="only accept this access_token (default: any non-empty one)")
+    parser.add_argument("--backlog", type=int, default=4096, help="listen() backlog for connection bursts")
+    parser.add_argument("--verbose", action="store_true", help="log at INFO, including websockets' per-connection lines")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    # Quiet by default: websockets logs every connection open and close at INFO, which skews ws_benchmark runs.
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    try:
+        asyncio.run(run_server(args))
+    except KeyboardInterrupt:
+        sys.exit(0)